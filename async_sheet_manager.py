@@ -0,0 +1,248 @@
+import asyncio
+import contextlib
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from sheet_manager import SheetManager
+from storage import WORKSHEET_NAMES, data_to_rows
+
+# Requests sent at the same time by all AsyncSheetManagers of the process.
+# This matches the connections requests keeps per host, so all requests
+# reuse the connections of the client's connection pool
+MAX_CONCURRENT_REQUESTS = 10
+# Threads that send the requests. gspread and requests only have a
+# blocking API, so the requests wait for their responses here instead of
+# on the event loop. The threads only send a request and return its
+# response, they never touch the caches of a manager
+REQUEST_EXECUTOR = ThreadPoolExecutor(
+    MAX_CONCURRENT_REQUESTS, thread_name_prefix="sheets-request"
+    )
+
+
+class AsyncSheetManager:
+    """
+    Asyncio variant of SheetManager, e.g. for a server that serves many
+    trips on one event loop.
+
+    Each method is a coroutine with the same arguments as the SheetManager
+    method of the same name. Independent operations run concurrently, e.g.
+    deleting the data of both worksheets (del_all_worksheet_data) or the
+    saves of many trips, each with its own AsyncSheetManager. All managers
+    share the authorized gspread client and its HTTP connection pool, and
+    at most MAX_CONCURRENT_REQUESTS requests are in flight at a time.
+
+    The manager keeps its state in a SheetManager that is only used on the
+    event loop, to build the requests and keep the last known worksheet
+    content. Operations on the same worksheet run one after another,
+    because each one builds its requests from the content written by the
+    one before.
+
+    Example:
+        manager = AsyncSheetManager("creds.json", "wander_wallet",
+                                    trip_id="paris-2026")
+        sheet_data = await manager.load_all()
+
+    Attributes:
+        manager (SheetManager): Worksheet content and request builder
+        locks (dict): Worksheet name -> lock held by the operations on the
+                      worksheet
+    """
+    def __init__(self, creds_file: str, sheet_name: str,
+                 sheet_key: str = None, trip_id: str = None):
+        self.creds_file = creds_file
+        self.manager = SheetManager(creds_file, sheet_name, sheet_key, trip_id)
+        self.trip_id = self.manager.trip_id
+        self.locks = {name: asyncio.Lock() for name in WORKSHEET_NAMES}
+        self.load_lock = asyncio.Lock()
+
+    async def call(self, function, *args, **kwargs):
+        """
+        Run a blocking gspread call that sends a request in a request
+        thread and return its result.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            REQUEST_EXECUTOR, functools.partial(function, *args, **kwargs)
+            )
+
+    @contextlib.asynccontextmanager
+    async def locked(self, worksheet_names: list):
+        """
+        Hold the locks of the given worksheets, always taken in the same
+        order so that two operations never wait for each other.
+        """
+        async with contextlib.AsyncExitStack() as stack:
+            for name in WORKSHEET_NAMES:
+                if name in worksheet_names:
+                    await stack.enter_async_context(self.locks[name])
+            yield
+
+    async def load_trip_sheets(self):
+        """
+        Open the spreadsheet and load the trip's row in the trip index (a
+        new trip is created) and the worksheet objects of the trip, unless
+        they are known already.
+
+        They are loaded by a new SheetManager in a request thread, and
+        taken over once it is done, so the manager of the event loop never
+        changes while the requests are sent.
+        """
+        async with self.load_lock:
+            if self.manager.trip_sheets_loaded():
+                return
+            loader = SheetManager(
+                self.creds_file, self.manager.sheet_name,
+                self.manager.sheet_key, self.trip_id
+                )
+            await self.call(loader.load_trip_sheets)
+            self.manager.adopt_trip_sheets(loader)
+
+    async def batch_update(self, requests: list, worksheet_names: list):
+        """
+        Send spreadsheets.batchUpdate requests that change the given trip
+        worksheets. If they fail, the cached content of the worksheets is
+        forgotten (see SheetManager.forget_worksheets).
+        """
+        if not requests:
+            return
+        try:
+            await self.call(
+                self.manager.sheet.batch_update, {"requests": requests}
+                )
+        except Exception:
+            self.manager.forget_worksheets(worksheet_names)
+            raise
+
+    async def read_worksheets(self, worksheet_names: list) -> dict:
+        """
+        Retrieve the data of the given trip worksheets with a single
+        values:batchGet request.
+
+        Returns:
+            dict: Worksheet name -> dictionary as returned by
+            get_worksheet_dict
+        """
+        async with self.locked(worksheet_names):
+            await self.load_trip_sheets()
+            manager = self.manager
+            ranges = {
+                name: manager.read_ranges(name) for name in worksheet_names
+                }
+            response = await self.call(
+                manager.sheet.values_batch_get,
+                [a1_range for name in worksheet_names
+                 for a1_range in ranges[name]]
+                )
+            return manager.remember_value_ranges(
+                worksheet_names, ranges, response
+                )
+
+    async def get_worksheet_dict(self, worksheet_name: str,
+                                 refresh: bool = True) -> dict:
+        """
+        Retrieve all data from a worksheet and return it as a dictionary.
+
+        With refresh=False the dictionary is built from the last known
+        worksheet content instead, if there is one.
+        """
+        if not refresh:
+            async with self.locked([worksheet_name]):
+                if (worksheet_name in self.manager.headers
+                        and worksheet_name in self.manager.known_rows):
+                    return self.manager.get_worksheet_dict(
+                        worksheet_name, refresh=False
+                        )
+        sheet_dicts = await self.read_worksheets([worksheet_name])
+        return sheet_dicts[worksheet_name]
+
+    async def load_all(self) -> dict:
+        """
+        Retrieve the data of all trip worksheets with a single
+        values:batchGet request.
+        """
+        return await self.read_worksheets(WORKSHEET_NAMES)
+
+    async def write_rows(self, worksheet_name: str, row_list: list,
+                         incremental: bool = True):
+        """
+        Write the data rows of a worksheet with one spreadsheets.batchUpdate
+        request. If the current worksheet content is known and `incremental`
+        is True, only the changed rows are sent (see
+        SheetManager.worksheet_requests).
+        """
+        async with self.locked([worksheet_name]):
+            await self.load_trip_sheets()
+            if (not incremental
+                    and not self.manager.is_index_row(worksheet_name)):
+                self.manager.known_rows.pop(worksheet_name, None)
+            requests = self.manager.worksheet_requests(
+                row_list, worksheet_name
+                )
+            if worksheet_name == "expenses":
+                self.manager.synced = None
+            await self.batch_update(requests, [worksheet_name])
+            self.manager.remember_rows(worksheet_name, row_list)
+
+    async def del_worksheet_data(self, worksheet_name: str):
+        """
+        Delete all data from a worksheet, except the headings
+        """
+        print(f"⏳  Deleting data from {worksheet_name} worksheet...\n")
+        # Delete all data rows, whatever they hold
+        await self.write_rows(worksheet_name, [], incremental=False)
+        print(f"✅  {worksheet_name} worksheet updated successfully.\n")
+
+    async def update_worksheet(self, data: dict, worksheet_name: str,
+                               incremental: bool = True):
+        """
+        Update a worksheet with new data (see SheetManager.update_worksheet).
+        """
+        print(f"⏳  Updating {worksheet_name} worksheet...\n")
+        await self.write_rows(
+            worksheet_name, data_to_rows(data, worksheet_name), incremental
+            )
+        print(f"✅  {worksheet_name} worksheet updated successfully.\n")
+
+    async def del_all_worksheet_data(self):
+        """
+        Delete the data of all trip worksheets concurrently.
+        """
+        await asyncio.gather(*(
+            self.del_worksheet_data(worksheet_name)
+            for worksheet_name in WORKSHEET_NAMES
+            ))
+
+    async def update_worksheets(self, worksheet_data: dict):
+        """
+        Update several worksheets concurrently.
+
+        Args:
+            worksheet_data (dict): Worksheet name -> new data
+        """
+        await asyncio.gather(*(
+            self.update_worksheet(data, worksheet_name)
+            for worksheet_name, data in worksheet_data.items()
+            ))
+
+    async def commit(self, trip, quiet: bool = False):
+        """
+        Save trip info and expenses of a trip in a single batch request
+        (see SheetManager.commit).
+
+        With quiet=True, no progress messages are printed.
+        """
+        async with self.locked(WORKSHEET_NAMES):
+            manager = self.manager
+            state = manager.commit_state(trip)
+            if not quiet:
+                print("⏳  Saving trip data...\n")
+            await self.load_trip_sheets()
+            plan = manager.commit_requests(trip, state)
+            await self.batch_update(plan["requests"], WORKSHEET_NAMES)
+            manager.finish_commit(plan)
+        if not quiet:
+            print("✅  Trip data saved successfully.\n")
+
+    async def flush(self):
+        """
+        Wait until all changes are saved. Changes are sent right away.
+        """
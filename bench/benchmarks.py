@@ -0,0 +1,240 @@
+"""
+Benchmarks of the trip calculations and the worksheet handling.
+
+Every benchmark is a setup function that takes the number of expense rows
+and returns the function to time. Nothing is sent over the network:
+SheetManager reads from a fake spreadsheet that holds the rows in memory.
+"""
+import contextlib
+from datetime import date, timedelta
+import io
+import os
+import random
+import sys
+
+# Make the app modules importable when running from the bench folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.auth.credentials import AnonymousCredentials  # noqa: E402
+from gspread.http_client import HTTPClient  # noqa: E402
+import sheet_manager  # noqa: E402
+from storage import WORKSHEET_HEADERS, data_to_rows  # noqa: E402
+from trip import Trip  # noqa: E402
+
+# First day of every benchmark trip. Trips with a million expense rows
+# need a million days, so they start long ago
+TRIP_START = date(1000, 1, 1)
+# New expense dates bench_add_expense can add, more than it runs (up to
+# MAX_LOOPS runs for each of the repetitions in run_benchmarks.py)
+NEW_DATES = 600_000
+
+
+def make_trip_data(n_rows: int, stride: int = 1,
+                   free_days: int = 1) -> tuple:
+    """
+    Return trip_info and expenses dictionaries of a trip with an expense
+    every `stride` days (every day by default), as they are read from the
+    worksheets. The trip ends `free_days` days without an expense after
+    the last expense.
+    """
+    dates = [
+        (TRIP_START + timedelta(days=row * stride)).isoformat()
+        for row in range(n_rows)
+        ]
+    amounts = [str(row % 100 + 1) for row in range(n_rows)]
+    end_date = TRIP_START + timedelta(days=(n_rows - 1) * stride + free_days)
+    trip_info = dict.fromkeys(WORKSHEET_HEADERS["trip_info"], "")
+    trip_info.update({
+        "trip_name": "Benchmark",
+        "start_date": dates[0],
+        "end_date": end_date.isoformat(),
+        "total_budget": str(100 * n_rows),
+    })
+    return trip_info, {"date": dates, "amount": amounts}
+
+
+class FakeSpreadsheet:
+    """
+    Spreadsheet that serves the values of its worksheets from memory,
+    with the gspread methods used by SheetManager.
+    """
+    def __init__(self, values: dict):
+        self.id = "benchmark"
+        self.values = values
+        # Worksheet objects need an HTTP client, it never sends anything
+        self.client = HTTPClient(AnonymousCredentials())
+
+    def fetch_sheet_metadata(self, params: dict = None) -> dict:
+        return {
+            "sheets": [
+                {"properties": {
+                    "sheetId": i,
+                    "title": title,
+                    "index": i,
+                    "gridProperties": {
+                        "rowCount": len(rows), "columnCount": len(rows[0])
+                    },
+                }}
+                for i, (title, rows) in enumerate(self.values.items())
+                ]
+        }
+
+    def values_batch_get(self, ranges: list) -> dict:
+        # Ranges look like "'expenses'"
+        return {
+            "valueRanges": [
+                {"values": self.values[a1_range.strip("'")]}
+                for a1_range in ranges
+                ]
+        }
+
+    def batch_update(self, body: dict):
+        return {}
+
+
+class FakeClient:
+    """
+    gspread client that opens the fake spreadsheet.
+    """
+    def __init__(self, spreadsheet: FakeSpreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def open_by_key(self, key: str):
+        return self.spreadsheet
+
+
+def make_sheet_manager(n_rows: int, stride: int = 1, free_days: int = 1):
+    """
+    Return a SheetManager for a fake spreadsheet with `n_rows` expenses
+    (see make_trip_data for `stride` and `free_days`).
+    """
+    trip_info, expenses = make_trip_data(n_rows, stride, free_days)
+    values = {
+        "trip_info": [list(trip_info), list(trip_info.values())],
+        "expenses": [WORKSHEET_HEADERS["expenses"]] + [
+            [expense_date, amount]
+            for expense_date, amount in zip(
+                expenses["date"], expenses["amount"]
+                )
+            ],
+    }
+    # get_client() returns the cached client, so nothing is authorized
+    sheet_manager.CLIENTS["benchmark"] = FakeClient(FakeSpreadsheet(values))
+    return sheet_manager.SheetManager(
+        "benchmark", "benchmark", sheet_key="benchmark"
+        )
+
+
+def bench_trip_init(n_rows: int):
+    """
+    Create a Trip from the worksheet data (parses all dates and amounts).
+    """
+    trip_info, expenses = make_trip_data(n_rows)
+    return lambda: Trip(trip_info, expenses)
+
+
+def bench_trip_summary(n_rows: int):
+    """
+    Calculate the trip statistics and format the trip summary.
+    """
+    trip = Trip(*make_trip_data(n_rows))
+
+    def run():
+        trip.invalidate_stats()
+        # summary() prints its heading
+        with contextlib.redirect_stdout(io.StringIO()):
+            trip.summary()
+    return run
+
+
+def bench_update_trip_info(n_rows: int):
+    """
+    Calculate the trip statistics and update the trip_info dictionary.
+    """
+    trip = Trip(*make_trip_data(n_rows))
+
+    def run():
+        trip.invalidate_stats()
+        trip.update_trip_info()
+    return run
+
+
+def bench_add_expense(n_rows: int):
+    """
+    The work of add_expenses in run.py after the prompts: add an expense,
+    update the trip info and build the requests that save the change (this
+    replaced sorting and re-zipping all expenses, and then comparing all
+    rows with the worksheet content).
+
+    Every run adds an expense for a new date, alternately a random day in
+    the middle of the trip (a row is inserted) and the next day after the
+    last expense (a row is appended). The trip has enough days without an
+    expense for all runs.
+    """
+    # Spread the expenses, so there are NEW_DATES / 2 free days between
+    # them and as many after them
+    stride = 1 + -(-NEW_DATES // 2 // max(n_rows - 1, 1))
+    manager = make_sheet_manager(n_rows, stride, NEW_DATES // 2)
+    trip = Trip(*manager.load_all().values())
+    manager.fetch_sheet_metadata()
+    last_day = (n_rows - 1) * stride
+    middle_days = [day for day in range(1, last_day) if day % stride]
+    random.Random(n_rows).shuffle(middle_days)
+
+    def new_dates():
+        for n_added, middle_day in enumerate(middle_days):
+            yield TRIP_START + timedelta(days=middle_day)
+            yield TRIP_START + timedelta(days=last_day + n_added + 1)
+        raise RuntimeError("No new dates left, increase NEW_DATES")
+    dates = new_dates()
+
+    def run():
+        version = trip.ledger.version
+        trip.add_expense(next(dates), 10)
+        trip.update_trip_info()
+        return manager.change_requests(trip.ledger.changes_since(version))
+    return run
+
+
+def bench_get_worksheet_dict(n_rows: int):
+    """
+    Read the expenses worksheet and turn the rows into the column lists of
+    the expenses dictionary.
+    """
+    manager = make_sheet_manager(n_rows)
+    return lambda: manager.get_worksheet_dict("expenses")
+
+
+def bench_commit_requests(n_rows: int):
+    """
+    Compare the expenses with the worksheet content and build the batch
+    update requests after one expense was added, like the first save of a
+    trip after loading it does.
+    """
+    manager = make_sheet_manager(n_rows)
+    trip = Trip(*manager.load_all().values())
+    trip.add_expense(trip.end_date, 10)
+    trip.update_trip_info()
+    manager.fetch_sheet_metadata()
+
+    def run():
+        return (
+            manager.worksheet_requests(
+                data_to_rows(trip.trip_info, "trip_info"), "trip_info"
+                ) +
+            manager.worksheet_requests(
+                data_to_rows(trip.expenses, "expenses"), "expenses"
+                )
+            )
+    return run
+
+
+# Benchmark name -> setup function
+BENCHMARKS = {
+    "trip_init": bench_trip_init,
+    "trip_summary": bench_trip_summary,
+    "update_trip_info": bench_update_trip_info,
+    "add_expense": bench_add_expense,
+    "get_worksheet_dict": bench_get_worksheet_dict,
+    "commit_requests": bench_commit_requests,
+}
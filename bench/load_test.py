@@ -0,0 +1,570 @@
+"""
+Simulate many users of the terminal app at the same time.
+
+Usage:
+    python bench/load_test.py [--sessions 50] [--concurrency 10]
+                              [--storage memory|local|sheets]
+                              [--visits 2] [--expenses 3]
+                              [--server /tmp/wander_wallet.sock]
+                              [--async]
+                              [--output results.json]
+
+Every session is a scripted user: on the first visit it sets up a trip,
+on later visits it continues the trip. On every visit it adds some
+expenses and looks at the list of expenses. Each visit is a new app
+process (`python run.py` in fast mode), or a new connection to the
+session server with --server.
+
+With --async (only with --storage sheets), the sessions don't run the app
+but use the storage directly: all sessions run on one event loop in this
+process, each visit with its own AsyncSheetManager, which load the trip,
+set it up on the first visit and save it after every expense. All
+sessions then share the Sheets quota of this process, like the sessions of
+a server using one service account.
+
+The storage of the sessions:
+- memory: nothing is saved, so every visit starts a new trip
+- local: one JSON file per session in a temporary folder
+- sheets: one trip per session in a spreadsheet of the local Sheets API
+  stand-in (fake_sheets_server.py), started in this process unless
+  --api-url points to a running one. --latency and --error-rate are
+  passed to the stand-in
+
+For every step (the answer to a prompt), the time until the app shows the
+next prompt is measured. The report lists the 50th, 95th and 99th
+percentile of these times per step, the throughput and the peak memory
+(RSS) of the app processes. The RSS is not available with --server: the
+sessions run in processes forked by the server, whose process ids the
+load test doesn't know. With --async there are no app processes.
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import json
+import os
+import random
+import re
+import selectors
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from fake_sheets_server import FakeSheetsServer  # noqa: E402
+from storage import WORKSHEET_HEADERS  # noqa: E402
+from trip import Trip  # noqa: E402
+
+# Seconds to wait for the next prompt before a session counts as failed
+PROMPT_TIMEOUT = 60
+# Visits with more steps are stuck in a loop (e.g. rejected input)
+MAX_STEPS = 200
+# Colors and other terminal escape sequences in the app output
+ANSI_PATTERN = re.compile(r"\x1b(\[[0-9;?]*[A-Za-z]|c)")
+
+# Prompt at the end of the app output -> step answered at this prompt
+PROMPTS = {
+    "Enter your trip name here: ": "trip_name",
+    "Enter your trip dates here: ": "trip_dates",
+    "Enter your total trip budget here: ": "trip_budget",
+    "Enter your expense date here: ": "expense_date",
+    "Enter your expense here: ": "expense_amount",
+    "Press ENTER to continue\n": "press_enter",
+    "end the program\n": "press_enter",
+}
+DECISION_PROMPT = "Enter your decision here (yes/no): "
+# Question before a yes/no prompt -> step answered at this prompt
+DECISIONS = {
+    "continue working on this trip": "continue_trip",
+    "add another expense": "add_another",
+    "update it": "update_expense",
+    "list of all currently tracked expenses": "view_list",
+}
+
+
+def percentile(values: list, percent: float) -> float:
+    """
+    Return the percentile of a list of values (nearest rank).
+    """
+    ordered = sorted(values)
+    rank = max(1, round(percent / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def peak_rss(pid: int) -> int:
+    """
+    Return the peak memory (RSS) of a process in bytes, or None if it is
+    unknown (e.g. not on Linux).
+    """
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class ProcessConnection:
+    """
+    App process started by the load test, talking through pipes.
+    """
+    def __init__(self, env: dict):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(APP_DIR, "run.py")],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, cwd=APP_DIR, env=env
+            )
+        self.pid = self.process.pid
+
+    def fileno(self) -> int:
+        return self.process.stdout.fileno()
+
+    def read(self) -> bytes:
+        return os.read(self.fileno(), 65536)
+
+    def write(self, text: str):
+        self.process.stdin.write(text.encode("utf-8"))
+        self.process.stdin.flush()
+
+    def close(self) -> bool:
+        """
+        End the process. Returns True if it ended without an error.
+        """
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.stdin.close()
+        self.process.stdout.close()
+        return self.process.wait() == 0
+
+
+class SessionServerConnection:
+    """
+    Session of the session server (session_server.py), talking through
+    its Unix socket like the web terminal.
+    """
+    def __init__(self, address: str):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(address)
+        # The app runs in a process forked by the server, its pid (and so
+        # its memory) is unknown here
+        self.pid = None
+
+    def fileno(self) -> int:
+        return self.socket.fileno()
+
+    def read(self) -> bytes:
+        try:
+            return self.socket.recv(65536)
+        except ConnectionResetError:
+            return b""
+
+    def write(self, text: str):
+        # The terminal sends a carriage return for ENTER
+        self.socket.sendall(text.replace("\n", "\r").encode("utf-8"))
+
+    def close(self) -> bool:
+        self.socket.close()
+        return True
+
+
+class ScriptedUser:
+    """
+    Answers the prompts of the app like a user who tracks expenses of a
+    trip that started two weeks ago.
+
+    Args:
+        number (int): Number of the session, used in the trip name
+        expenses (int): Number of expenses added per visit
+        think_time (float): Seconds to wait before every answer
+    """
+    def __init__(self, number: int, expenses: int, think_time: float = 0.0):
+        self.number = number
+        self.expenses = expenses
+        self.think_time = think_time
+        self.today = date.today()
+        self.random = random.Random(number)
+        self.added = 0
+
+    def start_visit(self):
+        self.added = 0
+
+    def answer(self, step: str) -> str:
+        """
+        Return the answer to the prompt of a step.
+        """
+        if step == "trip_name":
+            return f"Load test {self.number}"
+        if step == "trip_dates":
+            start = self.today - timedelta(days=14)
+            end = self.today + timedelta(days=14)
+            return f"{start},{end}"
+        if step == "trip_budget":
+            return "2000"
+        if step == "expense_date":
+            day = self.today - timedelta(days=self.random.randint(0, 14))
+            return day.isoformat()
+        if step == "expense_amount":
+            self.added += 1
+            return str(self.random.randint(5, 120))
+        if step == "add_another":
+            return "yes" if self.added < self.expenses else "no"
+        if step in ("continue_trip", "update_expense", "view_list"):
+            return "yes"
+        return ""
+
+
+def find_prompt(screen: str):
+    """
+    Return the step of the prompt at the end of the app output, or None if
+    the app is not waiting for input yet.
+    """
+    for prompt, step in PROMPTS.items():
+        if screen.endswith(prompt):
+            return step
+    if screen.endswith(DECISION_PROMPT):
+        # The last question before the prompt tells which decision it is
+        for question, step in sorted(
+                DECISIONS.items(), key=lambda item: -screen.rfind(item[0])):
+            if question in screen:
+                return step
+        return "decision"
+    return None
+
+
+def run_visit(connect, user: ScriptedUser) -> dict:
+    """
+    Run one visit of a user: start the app and answer its prompts until
+    it ends.
+
+    Args:
+        connect (callable): Returns a connection to a new app session
+
+    Returns:
+        dict: "timings" (list of (step, seconds)), "ok" and "rss"
+    """
+    user.start_visit()
+    start = time.perf_counter()
+    connection = connect()
+    selector = selectors.DefaultSelector()
+    selector.register(connection, selectors.EVENT_READ)
+
+    timings = []
+    rss = None
+    screen = ""
+    # The step whose answer the app is working on, "start" at first
+    step, sent = "start", start
+    ok = False
+    try:
+        while len(timings) < MAX_STEPS:
+            if not selector.select(PROMPT_TIMEOUT):
+                break
+            data = connection.read()
+            if not data:
+                # The app ended
+                timings.append((step, time.perf_counter() - sent))
+                ok = True
+                break
+            screen += ANSI_PATTERN.sub("", data.decode("utf-8", "replace"))
+            screen = screen.replace("\r\n", "\n")[-4000:]
+            prompt_step = find_prompt(screen)
+            if prompt_step is None:
+                continue
+            timings.append((step, time.perf_counter() - sent))
+            if connection.pid is not None:
+                rss = peak_rss(connection.pid) or rss
+            if user.think_time:
+                time.sleep(user.think_time)
+            step, screen = prompt_step, ""
+            sent = time.perf_counter()
+            connection.write(user.answer(step) + "\n")
+    except OSError:
+        ok = False
+    finally:
+        selector.close()
+        ok = connection.close() and ok
+    return {"timings": timings, "ok": ok, "rss": rss}
+
+
+def run_session(number: int, options, connect) -> dict:
+    """
+    Run all visits of one scripted user.
+    """
+    user = ScriptedUser(number, options.expenses, options.think_time)
+    visits = [run_visit(connect, user) for _ in range(options.visits)]
+    return {"session": number, "visits": visits}
+
+
+async def run_async_visit(manager, user: ScriptedUser) -> dict:
+    """
+    Run one visit of a user with an AsyncSheetManager: load the trip, set
+    it up if it is new and add expenses, saving the trip after each one
+    like the app does.
+
+    Returns:
+        dict: "timings" (list of (step, seconds)), "ok" and "rss" (None)
+    """
+    user.start_visit()
+    timings = []
+
+    async def step(name: str, operation):
+        if user.think_time:
+            await asyncio.sleep(user.think_time)
+        start = time.perf_counter()
+        result = await operation
+        timings.append((name, time.perf_counter() - start))
+        return result
+
+    ok = False
+    try:
+        sheet_data = await step("load", manager.load_all())
+        trip_info = sheet_data["trip_info"]
+        new_trip = trip_info["trip_name"] == ""
+        if new_trip:
+            start, end = user.answer("trip_dates").split(",")
+            trip_info = {
+                "trip_name": user.answer("trip_name"),
+                "start_date": start,
+                "end_date": end,
+                "total_budget": user.answer("trip_budget"),
+            }
+        trip = Trip(trip_info, sheet_data["expenses"])
+        if new_trip:
+            trip.update_trip_info()
+            await step("setup_trip", manager.commit(trip, quiet=True))
+        while user.added < user.expenses:
+            expense_date = date.fromisoformat(user.answer("expense_date"))
+            trip.add_expense(expense_date, int(user.answer("expense_amount")))
+            trip.update_trip_info()
+            await step("save_expense", manager.commit(trip, quiet=True))
+        ok = True
+    except Exception as e:
+        print(f"Visit failed: {e!r}")
+    return {"timings": timings, "ok": ok, "rss": None}
+
+
+async def run_async_sessions(options) -> list:
+    """
+    Run all sessions on one event loop, at most options.concurrency at the
+    same time (see --async).
+    """
+    # Imported here, so gspread is only loaded when it is used
+    from async_sheet_manager import AsyncSheetManager
+    os.environ["WANDER_WALLET_API_URL"] = options.api_url
+    limit = asyncio.Semaphore(options.concurrency)
+
+    async def run_async_session(number: int) -> dict:
+        async with limit:
+            user = ScriptedUser(number, options.expenses, options.think_time)
+            visits = []
+            for _ in range(options.visits):
+                # Every visit starts with nothing cached, like a new app
+                # process
+                manager = AsyncSheetManager(
+                    "creds.json", "wander_wallet", trip_id=f"load-{number}"
+                    )
+                visits.append(await run_async_visit(manager, user))
+            return {"session": number, "visits": visits}
+
+    return await asyncio.gather(*(
+        run_async_session(number)
+        for number in range(1, options.sessions + 1)
+        ))
+
+
+def session_env(number: int, options, data_dir: str) -> dict:
+    """
+    Environment of the app processes of a session.
+    """
+    env = dict(os.environ, WANDER_WALLET_FAST="1")
+    if options.storage == "memory":
+        env["WANDER_WALLET_STORAGE"] = "memory"
+    elif options.storage == "local":
+        env["WANDER_WALLET_STORAGE"] = "local"
+        env["WANDER_WALLET_CACHE"] = os.path.join(
+            data_dir, f"session-{number}.json"
+            )
+    else:
+        env["WANDER_WALLET_STORAGE"] = "sheets"
+        env["WANDER_WALLET_API_URL"] = options.api_url
+        env["WANDER_WALLET_TRIP_ID"] = f"load-{number}"
+        env.pop("WANDER_WALLET_CACHE", None)
+    return env
+
+
+def start_fake_sheets(options) -> FakeSheetsServer:
+    """
+    Start the Sheets API stand-in with a spreadsheet for many trips.
+    """
+    server = FakeSheetsServer(
+        ("127.0.0.1", 0), latency=options.latency,
+        error_rate=options.error_rate
+        )
+    headers = {
+        name: [header] for name, header in WORKSHEET_HEADERS.items()
+        }
+    # Create the trip index up front, so the first sessions don't all try
+    # to create it at the same time
+    headers["trips"] = [["trip_id"] + WORKSHEET_HEADERS["trip_info"]]
+    server.create_spreadsheet("wander_wallet", headers)
+    server.start()
+    return server
+
+
+def summarize(sessions: list, elapsed: float) -> dict:
+    """
+    Return the step percentiles, throughput and memory of a load test.
+    """
+    visits = [visit for session in sessions for visit in session["visits"]]
+    by_step = {}
+    for visit in visits:
+        for step, seconds in visit["timings"]:
+            by_step.setdefault(step, []).append(seconds)
+    steps = {
+        step: {
+            "count": len(times),
+            "p50_ms": percentile(times, 50) * 1000,
+            "p95_ms": percentile(times, 95) * 1000,
+            "p99_ms": percentile(times, 99) * 1000,
+            "max_ms": max(times) * 1000,
+        }
+        for step, times in by_step.items()
+        }
+    rss = [visit["rss"] for visit in visits if visit["rss"]]
+    n_steps = sum(len(times) for times in by_step.values())
+    return {
+        "elapsed_s": elapsed,
+        "sessions": len(sessions),
+        "visits": len(visits),
+        "failed_visits": sum(not visit["ok"] for visit in visits),
+        "visits_per_s": len(visits) / elapsed,
+        "steps_per_s": n_steps / elapsed,
+        "rss_mb": {
+            "p50": percentile(rss, 50) / 2 ** 20,
+            "max": max(rss) / 2 ** 20,
+        } if rss else None,
+        "steps": steps,
+    }
+
+
+def print_summary(summary: dict):
+    print(
+        f"{summary['visits']} visits of {summary['sessions']} sessions in "
+        f"{summary['elapsed_s']:.1f} s "
+        f"({summary['failed_visits']} failed)"
+        )
+    print(
+        f"Throughput: {summary['visits_per_s']:.2f} visits/s, "
+        f"{summary['steps_per_s']:.1f} steps/s"
+        )
+    if summary["rss_mb"]:
+        print(
+            f"Peak RSS per session: median {summary['rss_mb']['p50']:.1f} MB"
+            f", max {summary['rss_mb']['max']:.1f} MB"
+            )
+    else:
+        print(
+            "Peak RSS per session: not available (only measured for app "
+            "processes started by the load test on Linux, not with --server "
+            "or --async)"
+            )
+    print(
+        f"\n{'step':16} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'p99 ms':>9} {'max ms':>9}"
+        )
+    for step, times in sorted(
+            summary["steps"].items(), key=lambda item: -item[1]["p95_ms"]):
+        print(
+            f"{step:16} {times['count']:>6} {times['p50_ms']:9.1f} "
+            f"{times['p95_ms']:9.1f} {times['p99_ms']:9.1f} "
+            f"{times['max_ms']:9.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument(
+        "--concurrency", type=int, default=5,
+        help="Number of sessions running at the same time"
+        )
+    parser.add_argument(
+        "--storage", choices=("memory", "local", "sheets"), default="memory"
+        )
+    parser.add_argument(
+        "--visits", type=int, default=2, help="App runs per session"
+        )
+    parser.add_argument(
+        "--expenses", type=int, default=3, help="Expenses added per visit"
+        )
+    parser.add_argument(
+        "--think-time", type=float, default=0.0,
+        help="Seconds a user waits before answering a prompt"
+        )
+    parser.add_argument(
+        "--server",
+        help="Socket of a running session server to connect to, instead of "
+             "starting app processes (the server's storage is used)"
+        )
+    parser.add_argument(
+        "--async", dest="use_async", action="store_true",
+        help="Run the sessions on one event loop with AsyncSheetManager "
+             "instead of app processes (only with --storage sheets)"
+        )
+    parser.add_argument(
+        "--api-url", help="URL of a running Sheets API stand-in"
+        )
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="File to write the JSON results to")
+    options = parser.parse_args()
+    if options.use_async and (options.storage != "sheets" or options.server):
+        parser.error("--async only works with --storage sheets")
+
+    fake_sheets = None
+    if options.storage == "sheets" and not options.api_url:
+        fake_sheets = start_fake_sheets(options)
+        options.api_url = fake_sheets.url
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        def connector(number: int):
+            if options.server:
+                return lambda: SessionServerConnection(options.server)
+            env = session_env(number, options, data_dir)
+            return lambda: ProcessConnection(env)
+
+        start = time.perf_counter()
+        if options.use_async:
+            sessions = asyncio.run(run_async_sessions(options))
+        else:
+            with ThreadPoolExecutor(options.concurrency) as executor:
+                sessions = list(executor.map(
+                    lambda number: run_session(
+                        number, options, connector(number)
+                        ),
+                    range(1, options.sessions + 1)
+                    ))
+        elapsed = time.perf_counter() - start
+
+    if fake_sheets is not None:
+        fake_sheets.stop()
+
+    summary = summarize(sessions, elapsed)
+    print_summary(summary)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as file:
+            json.dump(
+                {"options": vars(options), "summary": summary,
+                 "sessions": sessions},
+                file, indent=2
+                )
+        print(f"\nResults written to {options.output}")
+
+
+if __name__ == "__main__":
+    main()
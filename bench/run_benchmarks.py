@@ -0,0 +1,158 @@
+"""
+Run the benchmarks and write the results as JSON.
+
+Usage:
+    python bench/run_benchmarks.py [--sizes 10,1000] [--only trip_init]
+                                   [--output results.json]
+                                   [--compare old_results.json]
+
+Every benchmark runs at every size (number of expense rows). The timings
+of a size are repeated several times and the best and median time per
+run are reported, so results of two versions of the app can be compared
+with --compare.
+"""
+import argparse
+from datetime import datetime, timezone
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from benchmarks import BENCHMARKS
+
+DEFAULT_SIZES = [10, 1_000, 100_000, 1_000_000]
+# Runs of a benchmark are repeated until they take at least this long,
+# so fast benchmarks are timed precisely
+MIN_TIME = 0.2
+MAX_LOOPS = 100_000
+
+
+def git_commit() -> str:
+    """
+    Return the current git commit of the app, or "" if it is unknown.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+            ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def time_benchmark(run, repeat: int) -> dict:
+    """
+    Time a benchmark function.
+
+    Returns:
+        dict: Number of loops per repetition and the best, median and mean
+              time of one run in seconds
+    """
+    # Find out how many loops take at least MIN_TIME
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    loops = max(1, min(MAX_LOOPS, int(MIN_TIME / max(elapsed, 1e-9))))
+
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        timings.append((time.perf_counter() - start) / loops)
+
+    return {
+        "loops": loops,
+        "best_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.mean(timings),
+    }
+
+
+def run_benchmarks(names: list, sizes: list, repeat: int) -> list:
+    """
+    Run the given benchmarks at every size and print the results.
+
+    Returns:
+        list: One result dictionary per benchmark and size
+    """
+    results = []
+    for name in names:
+        for n_rows in sizes:
+            run = BENCHMARKS[name](n_rows)
+            result = {"benchmark": name, "rows": n_rows, "repeat": repeat}
+            result.update(time_benchmark(run, repeat))
+            results.append(result)
+            print(
+                f"{name:20} {n_rows:>9} rows  "
+                f"best {result['best_s'] * 1000:12.4f} ms  "
+                f"median {result['median_s'] * 1000:12.4f} ms"
+                )
+            # Free the data of this size before setting up the next one
+            del run
+    return results
+
+
+def compare(results: list, old_results: list):
+    """
+    Print how much faster (or slower) the results are than older ones.
+    """
+    old = {
+        (result["benchmark"], result["rows"]): result["best_s"]
+        for result in old_results
+        }
+    print("\nComparison with the older results (best times):")
+    for result in results:
+        key = (result["benchmark"], result["rows"])
+        if key in old:
+            ratio = old[key] / result["best_s"]
+            print(
+                f"{key[0]:20} {key[1]:>9} rows  "
+                f"{ratio:8.2f}x {'faster' if ratio >= 1 else 'slower'}"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="Comma separated numbers of expense rows"
+        )
+    parser.add_argument(
+        "--only", default=",".join(BENCHMARKS),
+        help="Comma separated names of the benchmarks to run"
+        )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="File to write the JSON results to")
+    parser.add_argument("--compare", help="JSON results to compare with")
+    options = parser.parse_args()
+
+    names = options.only.split(",")
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+    sizes = [int(size) for size in options.sizes.split(",")]
+
+    report = {
+        "git_commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": run_benchmarks(names, sizes, options.repeat),
+    }
+
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nResults written to {options.output}")
+    if options.compare:
+        with open(options.compare, encoding="utf-8") as file:
+            compare(report["results"], json.load(file)["results"])
+
+
+if __name__ == "__main__":
+    main()
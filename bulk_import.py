@@ -0,0 +1,155 @@
+import argparse
+import csv
+import json
+import sys
+from trip import Trip
+from validation import validate_expense_rows
+from colorama import Fore, Style, init
+
+# Initialize Colorama (colors reset automatically after each print)
+init(autoreset=True)
+
+
+def read_expense_rows(source: str) -> list:
+    """
+    Read expenses from a CSV or JSON file, or from stdin if source is "-".
+
+    Supported formats:
+    - CSV with a date and an amount column, optionally with the header row
+      "date,amount"
+    - JSON list of objects, e.g. [{"date": "2025-08-01", "amount": 24}]
+    - JSON object with a list of dates and a list of amounts, like the
+      expenses worksheet, e.g. {"date": ["2025-08-01"], "amount": [24]}
+
+    Returns:
+        list: (row label, date, amount) for every expense, date and amount
+              as strings
+    """
+    # Files saved by Excel & co. often start with a byte order mark,
+    # which must not end up in the first date
+    if source == "-":
+        text = sys.stdin.read().lstrip("\ufeff")
+    else:
+        with open(source, encoding="utf-8-sig", newline="") as file:
+            text = file.read()
+
+    # JSON input starts with a list or an object, anything else is CSV
+    if text.lstrip().startswith(("[", "{")):
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = [
+                {"date": date, "amount": amount}
+                for date, amount in zip(data["date"], data["amount"])
+                ]
+        return [
+            (f"Entry {i}", str(item["date"]), str(item["amount"]))
+            for i, item in enumerate(data, start=1)
+            ]
+
+    rows = []
+    for line_no, row in enumerate(csv.reader(text.splitlines()), start=1):
+        # Skip empty lines and the header row
+        if not row or (line_no == 1 and row[0].strip().lower() == "date"):
+            continue
+        if len(row) != 2:
+            raise ValueError(
+                f"Line {line_no}: expected a date and an amount, "
+                f"got {len(row)} values"
+                )
+        rows.append((f"Line {line_no}", row[0].strip(), row[1].strip()))
+    return rows
+
+
+def import_expenses(rows: list, sheet_manager) -> bool:
+    """
+    Import expenses into the current trip.
+
+    All expenses are checked with the same rules as expenses entered in
+    the app. Only if all of them are valid, they are added to the trip
+    (updating the expense of a date that already has one) and saved
+    together in one batch request.
+
+    Args:
+        rows (list): (row label, date, amount) for every expense, as
+                     returned by `read_expense_rows()`
+        sheet_manager (StorageBackend): Storage of the trip data
+
+    Returns:
+        bool: True if the expenses were imported, False if nothing was
+              imported
+    """
+    sheet_data = sheet_manager.load_all()
+    if sheet_data["trip_info"]["trip_name"] == "":
+        print(
+            Fore.RED + Style.NORMAL +
+            "No trip found. Please set up a trip in the app first."
+            )
+        return False
+    trip = Trip(sheet_data["trip_info"], sheet_data["expenses"])
+
+    # Check all rows before changing anything
+    expenses, errors = validate_expense_rows(
+        [(date_input, amount_input) for _, date_input, amount_input in rows],
+        trip
+        )
+    if errors:
+        for error in errors:
+            print(
+                Fore.RED + Style.NORMAL +
+                f"{rows[error['row']][0]}: Invalid {error['field']}: "
+                f"{error['message']}"
+                )
+        n_invalid = len({error["row"] for error in errors})
+        print(
+            Fore.RED + Style.NORMAL +
+            f"\n{n_invalid} of {len(rows)} expenses are invalid, "
+            f"nothing was imported."
+            )
+        return False
+
+    n_updated = 0
+    for expense_date, amount in expenses:
+        if trip.add_expense(expense_date, amount):
+            n_updated += 1
+
+    # Save all expenses in one batch request
+    trip.update_trip_info()
+    sheet_manager.commit(trip)
+    sheet_manager.flush()
+
+    print(
+        f"🎉  Imported {len(rows)} expenses into '{trip.trip_name}' "
+        f"({len(rows) - n_updated} new, {n_updated} updated).\n"
+        )
+    print(trip.summary())
+    return True
+
+
+def import_main(args: list, create_storage) -> int:
+    """
+    Command line entry point: python run.py import <file>
+
+    Args:
+        args (list): Command line arguments after "import"
+        create_storage (callable): Returns the storage of the trip data
+
+    Returns:
+        int: Exit code (0 if the expenses were imported)
+    """
+    parser = argparse.ArgumentParser(
+        prog="python run.py import",
+        description="Import expenses into the current trip.",
+        )
+    parser.add_argument(
+        "file", help="CSV or JSON file with expenses, or - for stdin"
+        )
+    options = parser.parse_args(args)
+
+    try:
+        rows = read_expense_rows(options.file)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(Fore.RED + Style.NORMAL + f"Could not read expenses: {e}")
+        return 1
+
+    imported = import_expenses(rows, create_storage())
+    return 0 if imported else 1
@@ -0,0 +1,68 @@
+class SessionCheckpoint:
+    """
+    Remembers how far a session of the app has come, so it can pick up
+    where it left off after an unexpected error instead of starting over.
+
+    The steps of a session are:
+    - "start": Load the trip data and ask whether to continue the trip
+    - "new_trip": Set up a new trip (the old data is already deleted)
+    - "expenses": Add expenses to the trip
+    - "summary": Show the final summary and end the program
+
+    The storage is kept as well, so a resumed session doesn't have to
+    connect to Google Sheets again, and so is the trip data once it has
+    been loaded. If saving the trip failed, the save is retried first when
+    the session is resumed.
+
+    Attributes:
+        step (str): The step the session resumes at
+        storage (StorageBackend): The storage of the session, once set up
+        sheet_data (dict): The trip data loaded at the start, or None
+        trip (Trip): The current trip, once it is set up
+        pending_write (bool): True if the trip has changes that could not
+                              be saved
+    """
+    def __init__(self):
+        self.step = "start"
+        self.storage = None
+        self.sheet_data = None
+        self.trip = None
+        self.pending_write = False
+
+    @property
+    def resumed(self) -> bool:
+        """
+        True if the session already got past the start, i.e. it is
+        resumed after an error.
+        """
+        return self.step != "start" or self.storage is not None
+
+    def reach(self, step: str, trip=None):
+        """
+        Record that the session has reached a step.
+        """
+        self.step = step
+        if trip is not None:
+            self.trip = trip
+
+    def save_trip(self, storage, trip):
+        """
+        Save a trip. If saving fails, the trip is kept, so the save can be
+        retried when the session is resumed.
+        """
+        self.trip = trip
+        self.pending_write = True
+        storage.commit(trip)
+        self.pending_write = False
+
+    def retry_pending_write(self):
+        """
+        Save the trip again if the last save failed.
+
+        Returns:
+            bool: True if the trip had to be saved again
+        """
+        if not self.pending_write:
+            return False
+        self.save_trip(self.storage, self.trip)
+        return True
@@ -1,5 +1,15 @@
 const Pty = require('node-pty');
 const fs = require('fs');
+const net = require('net');
+const childProcess = require('child_process');
+
+// Unix socket of the Python session server (see session_server.py). If it
+// is not set, every connection spawns its own `python3 run.py` process.
+const SESSION_SERVER = process.env.WANDER_WALLET_SERVER;
+
+// Milliseconds a closed session gets to save pending changes before its
+// process is killed
+const EXIT_GRACE_PERIOD = 15000;
 
 exports.install = function () {
 
@@ -15,32 +25,19 @@ function socket() {
 
     this.on('open', function (client) {
 
-        // Spawn terminal
-        client.tty = Pty.spawn('python3', ['run.py'], {
-            name: 'xterm-color',
-            cols: 80,
-            rows: 24,
-            cwd: process.env.PWD,
-            env: process.env
-        });
-
-        client.tty.on('exit', function (code, signal) {
-            client.tty = null;
-            client.close();
-            console.log("Process killed");
-        });
-
-        client.tty.on('data', function (data) {
-            client.send(data);
-        });
+        if (SESSION_SERVER) {
+            connectSession(client);
+        } else {
+            spawnTerminal(client);
+        }
 
     });
 
     this.on('close', function (client) {
         if (client.tty) {
-            client.tty.kill(9);
+            endTerminal(client.tty);
             client.tty = null;
-            console.log("Process killed and terminal unloaded");
+            console.log("Terminal unloaded");
         }
     });
 
@@ -49,6 +46,101 @@ function socket() {
     });
 }
 
+// End the app with SIGHUP, so it can still save pending changes, and
+// kill it only if it has not ended after the grace period
+function endTerminal(tty) {
+
+    var timer = setTimeout(function () {
+        tty.kill('SIGKILL');
+        console.log("Process killed");
+    }, EXIT_GRACE_PERIOD);
+
+    tty.on('exit', function () {
+        clearTimeout(timer);
+    });
+    tty.kill('SIGHUP');
+}
+
+// Spawn terminal
+function spawnTerminal(client) {
+
+    client.tty = Pty.spawn('python3', ['run.py'], {
+        name: 'xterm-color',
+        cols: 80,
+        rows: 24,
+        cwd: process.env.PWD,
+        env: process.env
+    });
+
+    client.tty.on('exit', function (code, signal) {
+        client.tty = null;
+        client.close();
+        console.log("Process ended");
+    });
+
+    client.tty.on('data', function (data) {
+        client.send(data);
+    });
+}
+
+// Open a session on the session server, which runs the app in a terminal
+// of its own. Falls back to spawning a terminal if the server is not
+// reachable (e.g. while it is still starting).
+function connectSession(client) {
+
+    var conn = net.connect(SESSION_SERVER);
+    var connected = false;
+
+    // Same interface as the node-pty terminal. Any kill closes the
+    // connection, the session server then ends the session gracefully
+    client.tty = {
+        write: function (data) { conn.write(data); },
+        kill: function () { conn.destroy(); },
+        on: function (event, callback) { conn.on('close', callback); }
+    };
+
+    conn.on('connect', function () {
+        connected = true;
+    });
+
+    conn.on('data', function (data) {
+        client.send(data);
+    });
+
+    conn.on('error', function (err) {
+        if (!connected) {
+            console.log("Session server not available: ", err.message);
+            spawnTerminal(client);
+        }
+    });
+
+    conn.on('close', function () {
+        if (connected && client.tty) {
+            client.tty = null;
+            client.close();
+            console.log("Session ended");
+        }
+    });
+}
+
+// Start the session server once, after the credentials are available
+function startSessionServer() {
+
+    if (!SESSION_SERVER) {
+        return;
+    }
+
+    var server = childProcess.spawn('python3', ['session_server.py', SESSION_SERVER], {
+        cwd: process.env.PWD,
+        env: process.env,
+        stdio: 'inherit'
+    });
+
+    server.on('exit', function (code) {
+        console.log("Session server stopped with code ", code);
+    });
+}
+
 if (process.env.CREDS != null) {
     console.log("Creating creds.json file.");
     fs.writeFile('creds.json', process.env.CREDS, 'utf8', function (err) {
@@ -56,5 +148,8 @@ if (process.env.CREDS != null) {
             console.log('Error writing file: ', err);
             socket.emit("console_output", "Error saving credentials: " + err);
         }
+        startSessionServer();
     });
+} else {
+    startSessionServer();
 }
\ No newline at end of file
@@ -0,0 +1,29 @@
+from datetime import date, datetime
+from functools import lru_cache
+import re
+
+# Date format used everywhere in the app and in the worksheets
+DATE_FORMAT = "%Y-%m-%d"
+# Strict YYYY-MM-DD, which date.fromisoformat parses much faster than
+# datetime.strptime
+ISO_DATE_PATTERN = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+
+
+@lru_cache(maxsize=4096)
+def parse_date(date_str: str) -> date:
+    """
+    Parse a date in the format YYYY-MM-DD.
+
+    Accepts exactly the same input as
+    `datetime.strptime(date_str, "%Y-%m-%d").date()`, but dates with
+    zero-padded month and day are parsed with the much faster
+    `date.fromisoformat`, and recently parsed dates are cached (a trip only
+    has a few hundred distinct dates, which are parsed again and again).
+
+    Raises:
+        ValueError: If the string is not a valid date in this format
+    """
+    if ISO_DATE_PATTERN.fullmatch(date_str):
+        return date.fromisoformat(date_str)
+    # Rarely used formats that strptime accepts as well, e.g. "2025-8-1"
+    return datetime.strptime(date_str, DATE_FORMAT).date()
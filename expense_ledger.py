@@ -0,0 +1,228 @@
+from array import array
+from datetime import timedelta
+from storage import expense_records
+
+
+class ExpenseLedger:
+    """
+    Stores the expenses of a trip, one amount per date, ordered by date.
+
+    Every expense date is identified by its day offset from the trip start
+    date, so the amounts are stored in a compact integer array with one
+    slot per trip day, and a second array marks the days that have an
+    expense. Dates and amounts only have to be parsed once when the
+    expenses are loaded, looking up or changing the expense of a day is
+    direct, the days are naturally ordered and the total of all expenses is
+    updated with every change.
+
+    Dates outside the trip period (e.g. edited manually in the worksheet)
+    extend the stored period instead of being dropped.
+
+    Every change after the expenses were loaded is logged with the row it
+    affects when the expenses are stored one row per date in date order
+    (like in the expenses worksheet), so a storage can save only the
+    changed rows (see `changes_since()`). The row of a day is the number of
+    earlier days with an expense, which a Fenwick tree over the days
+    returns in O(log n) steps.
+
+    Attributes:
+        start_date (date): First day stored in the arrays
+        amounts (array): Expense amount by day offset (0 if no expense)
+        present (bytearray): 1 for every day offset that has an expense
+        count (int): Number of days that have an expense
+        total (int): Sum of all expense amounts
+        version (int): Incremented on every change, so cached values that
+                       depend on the expenses know when to recalculate
+        changes (list): (row, date, amount, new, n_rows) of every change
+                        since the expenses were loaded, see
+                        `changes_since()`
+        first_change (int): Version before the first logged change
+    """
+    def __init__(self, start_date, end_date, expenses: dict = None):
+        self.start_date = start_date
+        n_days = (end_date - start_date).days + 1
+        self.amounts = array("q", bytes(8 * n_days))
+        self.present = bytearray(n_days)
+        self.count = 0
+        self.total = 0
+        self.version = 0
+        # Fenwick tree of the present days, built on first use
+        self.index = None
+        self.changes = []
+        self.first_change = 0
+
+        if expenses is None:
+            return
+
+        dates = expenses.get("date", [])
+        amounts = expenses.get("amount", [])
+        # If max. 1 expense is tracked, date and amount can be single
+        # values instead of lists
+        if not isinstance(amounts, list):
+            dates, amounts = [dates], [amounts]
+
+        self.add_records(expense_records(zip(dates, amounts)))
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, expense_date):
+        return self.get(expense_date) is not None
+
+    def offset(self, expense_date) -> int:
+        """
+        Return the day offset of a date from the first stored day.
+        """
+        return (expense_date - self.start_date).days
+
+    def extend_to(self, expense_date):
+        """
+        Grow the arrays so they include the given date.
+        """
+        day = self.offset(expense_date)
+        if day < 0:
+            # Add the missing days in front and move the start date
+            self.amounts[0:0] = array("q", bytes(8 * -day))
+            self.present[0:0] = bytes(-day)
+            self.start_date = expense_date
+        elif day >= len(self.amounts):
+            n_new = day - len(self.amounts) + 1
+            self.amounts.extend(array("q", bytes(8 * n_new)))
+            self.present.extend(bytes(n_new))
+        else:
+            return
+        # The days have moved or grown, rebuild the index when needed
+        self.index = None
+
+    def build_index(self):
+        """
+        Build the Fenwick tree of the present days: slot i holds the number
+        of expenses in the (i & -i) days up to day i - 1.
+        """
+        n_days = len(self.present)
+        index = array("q", bytes(8 * (n_days + 1)))
+        for i in range(1, n_days + 1):
+            index[i] += self.present[i - 1]
+            parent = i + (i & -i)
+            if parent <= n_days:
+                index[parent] += index[i]
+        self.index = index
+
+    def row(self, day: int) -> int:
+        """
+        Return the number of expenses before a day offset, i.e. the row
+        (0-based) of the day's expense when stored in date order.
+        """
+        if self.index is None:
+            self.build_index()
+        n_before = 0
+        while day > 0:
+            n_before += self.index[day]
+            day -= day & -day
+        return n_before
+
+    def get(self, expense_date, default=None):
+        """
+        Return the expense amount of a date, or `default` if there is none.
+        """
+        day = self.offset(expense_date)
+        if 0 <= day < len(self.present) and self.present[day]:
+            return self.amounts[day]
+        return default
+
+    def add(self, expense_date, amount: int) -> bool:
+        """
+        Add an expense, or update it if the date already has an expense.
+
+        Returns:
+            bool: True if an existing expense was updated,
+                  False if a new expense was added
+        """
+        self.extend_to(expense_date)
+        day = self.offset(expense_date)
+        updated = bool(self.present[day])
+        if self.changes is not None:
+            self.changes.append(
+                (self.row(day), expense_date, amount, not updated, self.count)
+                )
+        if not updated:
+            self.present[day] = 1
+            self.count += 1
+            if self.index is not None:
+                # Update the Fenwick tree slots that include the day
+                i = day + 1
+                while i < len(self.index):
+                    self.index[i] += 1
+                    i += i & -i
+        self.total += amount - self.amounts[day]
+        self.amounts[day] = amount
+        self.version += 1
+
+        return updated
+
+    def add_records(self, records) -> int:
+        """
+        Load expenses from an iterable of (date, amount) records, e.g. the
+        expenses read from the worksheet.
+
+        Loading the expenses is not a change that has to be saved, so the
+        records are not logged (the change log starts after them), and the
+        Fenwick tree is built once when it is needed instead of being
+        updated for every record.
+
+        Returns:
+            int: Number of records added
+        """
+        self.changes = None
+        self.index = None
+        n_records = 0
+        for expense_date, amount in records:
+            self.add(expense_date, amount)
+            n_records += 1
+        self.changes = []
+        self.first_change = self.version
+        return n_records
+
+    def changes_since(self, version: int, until: int = None) -> list:
+        """
+        Return the changes after a version (up to version `until`, or all),
+        e.g. the changes since the expenses were last saved.
+
+        Each change is a tuple (row, date, amount, new, n_rows):
+        - row (int): Row of the expense (0-based) in date order
+        - date (date), amount (int): The expense
+        - new (bool): True if a row was inserted at `row`, False if the
+          amount of the existing row was changed
+        - n_rows (int): Number of rows before the change, so a new row
+          with row == n_rows is appended after the last row
+
+        Applying the changes in order to rows that held the expenses of
+        `version` gives the rows of the newer version.
+        """
+        if version < self.first_change:
+            raise ValueError(
+                f"Changes before version {self.first_change} are not logged"
+                )
+        if until is None:
+            until = self.version
+        return self.changes[version - self.first_change:
+                            until - self.first_change]
+
+    def items(self):
+        """
+        Iterate over all (date, amount) pairs, ordered by date.
+        """
+        for day, is_present in enumerate(self.present):
+            if is_present:
+                yield self.start_date + timedelta(days=day), self.amounts[day]
+
+    def to_dict(self) -> dict:
+        """
+        Return the expenses in the format of the expenses worksheet:
+        a list of dates (YYYY-MM-DD) and a list of amounts, both as strings.
+        """
+        expenses = {"date": [], "amount": []}
+        for expense_date, amount in self.items():
+            expenses["date"].append(expense_date.isoformat())
+            expenses["amount"].append(str(amount))
+        return expenses
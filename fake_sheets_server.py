@@ -0,0 +1,795 @@
+"""
+Local stand-in for the Google Sheets and Drive APIs.
+
+Serves the part of the Sheets v4 and Drive v3 APIs that gspread uses for
+Wander Wallet, from spreadsheets held in memory. Point the app at it with
+WANDER_WALLET_API_URL to run it (or load tests) without credentials,
+network access or using up the real quota:
+
+    python fake_sheets_server.py --port 8080 --latency 0.1 --error-rate 0.05
+    WANDER_WALLET_API_URL=http://127.0.0.1:8080 python run.py
+
+Supported requests:
+- Drive: list spreadsheet files by name (gspread's `client.open()`)
+- Sheets: spreadsheet metadata (optionally only of the worksheets given
+  as `ranges`, or without worksheets if `fields` doesn't include them),
+  values get/batchGet, update, append and clear, and batchUpdate with
+  addSheet, deleteSheet, insertDimension, deleteDimension, updateCells
+  and appendCells requests
+
+All values are stored and returned as strings, like the formatted values
+gspread reads by default. It is a stand-in, not an emulator: limits of the
+real API (e.g. grid size or request size) are not enforced.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from storage import WORKSHEET_HEADERS
+
+# Default grid size of a new worksheet
+DEFAULT_ROWS = 1000
+DEFAULT_COLUMNS = 26
+
+# A1 notation of a range without the sheet name, e.g. "A2:B5", "A:A", "1:1"
+A1_RANGE_PATTERN = re.compile(r"([A-Z]*)([0-9]*)(?::([A-Z]*)([0-9]*))?")
+# Name filter of a Drive files query, e.g. 'name = "wander_wallet"'
+DRIVE_NAME_PATTERN = re.compile(r'name = "((?:[^"\\]|\\.)*)"')
+
+SHEETS_PATH = "/v4/spreadsheets/"
+DRIVE_PATH = "/drive/v3/files"
+
+
+class FakeAPIError(Exception):
+    """
+    Error returned to the client as an API error response.
+    """
+    def __init__(self, code: int, status: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+        self.message = message
+
+
+def column_index(letters: str) -> int:
+    """
+    Return the 1-based index of a column, e.g. "A" -> 1, "AB" -> 28.
+    """
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index
+
+
+def column_letters(index: int) -> str:
+    """
+    Return the letters of a 1-based column index, e.g. 28 -> "AB".
+    """
+    letters = ""
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def cell_value(value) -> str:
+    """
+    Return a written value as the formatted string the API reads back.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class FakeWorksheet:
+    """
+    Worksheet of a fake spreadsheet: grid properties and cell values.
+
+    Attributes:
+        properties (dict): Sheet properties as returned by the API
+        rows (list): One list of cell strings per grid row (rows may be
+                     shorter than the grid, missing cells are empty)
+    """
+    def __init__(self, sheet_id: int, title: str, index: int,
+                 rows: int = DEFAULT_ROWS, columns: int = DEFAULT_COLUMNS):
+        self.properties = {
+            "sheetId": sheet_id,
+            "title": title,
+            "index": index,
+            "sheetType": "GRID",
+            "gridProperties": {"rowCount": rows, "columnCount": columns},
+        }
+        self.rows = [[] for _ in range(rows)]
+
+    @property
+    def title(self) -> str:
+        return self.properties["title"]
+
+    @property
+    def grid(self) -> dict:
+        return self.properties["gridProperties"]
+
+    def resize(self, rows: int = None, columns: int = None):
+        """
+        Grow the grid to at least the given size.
+        """
+        if rows is not None and rows > len(self.rows):
+            self.rows += [[] for _ in range(rows - len(self.rows))]
+        self.grid["rowCount"] = len(self.rows)
+        if columns is not None:
+            self.grid["columnCount"] = max(self.grid["columnCount"], columns)
+
+    def bounds(self, a1_range: str) -> tuple:
+        """
+        Return the 1-based (first row, first column, last row, last column)
+        of a range in A1 notation without the sheet name. Open ends of the
+        range (e.g. "A:A") extend to the end of the grid.
+        """
+        if not a1_range:
+            return 1, 1, len(self.rows), self.grid["columnCount"]
+        match = A1_RANGE_PATTERN.fullmatch(a1_range.upper())
+        if match is None:
+            raise FakeAPIError(
+                400, "INVALID_ARGUMENT", f"Unable to parse range: {a1_range}"
+                )
+        col1, row1, col2, row2 = match.groups()
+        if ":" not in a1_range:
+            # Single cell, e.g. "A2"
+            col2, row2 = col1, row1
+        return (
+            int(row1) if row1 else 1,
+            column_index(col1) if col1 else 1,
+            int(row2) if row2 else len(self.rows),
+            column_index(col2) if col2 else self.grid["columnCount"],
+            )
+
+    def a1(self, first_row: int, first_col: int, last_row: int,
+           last_col: int) -> str:
+        """
+        Return a range of this worksheet in A1 notation, e.g. "trips!A2:B3".
+        """
+        title = self.title
+        if not re.fullmatch(r"\w+", title):
+            title = "'" + title.replace("'", "''") + "'"
+        return (
+            f"{title}!{column_letters(first_col)}{first_row}:"
+            f"{column_letters(last_col)}{last_row}"
+            )
+
+    def get_values(self, a1_range: str) -> dict:
+        """
+        Return the values of a range, without trailing empty cells and rows
+        (like the API).
+        """
+        first_row, first_col, last_row, last_col = self.bounds(a1_range)
+        values = []
+        for row in self.rows[first_row - 1:last_row]:
+            cells = row[first_col - 1:last_col]
+            while cells and cells[-1] == "":
+                cells = cells[:-1]
+            values.append(list(cells))
+        while values and not values[-1]:
+            values.pop()
+        result = {
+            "range": self.a1(first_row, first_col, last_row, last_col),
+            "majorDimension": "ROWS",
+        }
+        if values:
+            result["values"] = values
+        return result
+
+    def set_values(self, first_row: int, first_col: int,
+                   values: list) -> dict:
+        """
+        Write rows of values starting at a cell, growing the grid if
+        needed.
+
+        Returns:
+            dict: Update response of the values API
+        """
+        width = max((len(row) for row in values), default=0)
+        self.resize(first_row + len(values) - 1, first_col + width - 1)
+        for i, new_cells in enumerate(values):
+            row = self.rows[first_row - 1 + i]
+            end = first_col - 1 + len(new_cells)
+            if len(row) < end:
+                row += [""] * (end - len(row))
+            row[first_col - 1:end] = [cell_value(v) for v in new_cells]
+        last_row = first_row + max(len(values), 1) - 1
+        last_col = first_col + max(width, 1) - 1
+        return {
+            "updatedRange": self.a1(first_row, first_col, last_row, last_col),
+            "updatedRows": len(values),
+            "updatedColumns": width,
+            "updatedCells": sum(len(row) for row in values),
+        }
+
+    def last_data_row(self, first_row: int, first_col: int,
+                      last_col: int) -> int:
+        """
+        Return the last row from `first_row` on that has a value in the
+        given columns, or first_row - 1 if there is none.
+        """
+        for i in range(len(self.rows), first_row - 1, -1):
+            if any(self.rows[i - 1][first_col - 1:last_col]):
+                return i
+        return first_row - 1
+
+    def append_values(self, a1_range: str, values: list,
+                      insert_rows: bool = False) -> dict:
+        """
+        Write rows after the last row with data in a range (values
+        append). With `insert_rows`, new rows are inserted instead of
+        overwriting the empty rows below the data.
+        """
+        first_row, first_col, _, last_col = self.bounds(a1_range)
+        start = self.last_data_row(first_row, first_col, last_col) + 1
+        if insert_rows:
+            self.insert_rows(start, len(values))
+        updates = self.set_values(start, first_col, values)
+        return {
+            "tableRange": self.a1(first_row, first_col, start - 1, last_col),
+            "updates": updates,
+        }
+
+    def insert_rows(self, start: int, n_rows: int):
+        """
+        Insert empty rows before the 1-based row `start`.
+        """
+        self.rows[start - 1:start - 1] = [[] for _ in range(n_rows)]
+        self.resize()
+
+    def insert_dimension(self, start_index: int, end_index: int):
+        """
+        Insert empty rows at the 0-based indexes from start_index to
+        end_index (exclusive), like an insertDimension request.
+        """
+        if not 0 <= start_index < end_index or start_index > len(self.rows):
+            raise FakeAPIError(
+                400, "INVALID_ARGUMENT",
+                f"Invalid row range {start_index}:{end_index}"
+                )
+        self.rows[start_index:start_index] = [
+            [] for _ in range(end_index - start_index)
+            ]
+        self.resize()
+
+    def delete_rows(self, start_index: int, end_index: int):
+        """
+        Delete the rows with 0-based indexes from start_index to end_index
+        (exclusive).
+        """
+        if not 0 <= start_index < end_index <= len(self.rows):
+            raise FakeAPIError(
+                400, "INVALID_ARGUMENT",
+                f"Invalid row range {start_index}:{end_index}"
+                )
+        del self.rows[start_index:end_index]
+        self.resize()
+
+    def clear(self, a1_range: str):
+        """
+        Empty all cells of a range.
+        """
+        first_row, first_col, last_row, last_col = self.bounds(a1_range)
+        for row in self.rows[first_row - 1:last_row]:
+            for col in range(first_col - 1, min(last_col, len(row))):
+                row[col] = ""
+
+
+class FakeSpreadsheet:
+    """
+    Spreadsheet held in memory.
+    """
+    def __init__(self, spreadsheet_id: str, title: str):
+        self.id = spreadsheet_id
+        self.title = title
+        self.worksheets = []
+        self.next_sheet_id = 0
+
+    def metadata(self, ranges: list = None) -> dict:
+        """
+        Return the spreadsheet metadata (GET spreadsheets/<id>), with all
+        worksheets or only those of the given ranges. Like the API, a
+        range of a missing worksheet fails the whole request.
+        """
+        worksheets = self.worksheets
+        if ranges:
+            selected = [self.resolve(a1_range)[0] for a1_range in ranges]
+            worksheets = [
+                worksheet for worksheet in self.worksheets
+                if worksheet in selected
+                ]
+        return {
+            "spreadsheetId": self.id,
+            "properties": {"title": self.title, "locale": "en_US"},
+            "sheets": [
+                {"properties": worksheet.properties}
+                for worksheet in worksheets
+                ],
+        }
+
+    def add_worksheet(self, title: str, rows: int = DEFAULT_ROWS,
+                      columns: int = DEFAULT_COLUMNS) -> FakeWorksheet:
+        if any(worksheet.title == title for worksheet in self.worksheets):
+            raise FakeAPIError(
+                400, "INVALID_ARGUMENT",
+                f'A sheet with the name "{title}" already exists.'
+                )
+        worksheet = FakeWorksheet(
+            self.next_sheet_id, title, len(self.worksheets), rows, columns
+            )
+        self.next_sheet_id += 1
+        self.worksheets.append(worksheet)
+        return worksheet
+
+    def worksheet(self, title: str = None,
+                  sheet_id: int = None) -> FakeWorksheet:
+        """
+        Return a worksheet by title or by sheet id.
+        """
+        for worksheet in self.worksheets:
+            if title is not None and worksheet.title == title:
+                return worksheet
+            if sheet_id is not None and worksheet.properties["sheetId"] == (
+                    sheet_id):
+                return worksheet
+        raise FakeAPIError(
+            400, "INVALID_ARGUMENT",
+            f"No grid with title {title!r} or id {sheet_id!r}"
+            )
+
+    def resolve(self, a1_range: str) -> tuple:
+        """
+        Split a range like "'trip_info'!A1:B2" into the worksheet and the
+        range within the worksheet. A range without a sheet name refers
+        to the first worksheet.
+        """
+        if "!" in a1_range:
+            title, cells = a1_range.rsplit("!", 1)
+        elif A1_RANGE_PATTERN.fullmatch(a1_range.upper()) and (
+                a1_range not in [ws.title for ws in self.worksheets]):
+            title, cells = self.worksheets[0].title, a1_range
+        else:
+            title, cells = a1_range, ""
+        if title.startswith("'") and title.endswith("'"):
+            title = title[1:-1].replace("''", "'")
+        try:
+            return self.worksheet(title), cells
+        except FakeAPIError:
+            raise FakeAPIError(
+                400, "INVALID_ARGUMENT", f"Unable to parse range: {a1_range}"
+                ) from None
+
+    def batch_update(self, requests: list) -> dict:
+        """
+        Apply the requests of a spreadsheets.batchUpdate call. Like the
+        API, either all requests are applied or none (the worksheets are
+        restored if one of them fails).
+        """
+        backup = [
+            (worksheet, json.loads(json.dumps(worksheet.properties)),
+             [list(row) for row in worksheet.rows])
+            for worksheet in self.worksheets
+            ]
+        worksheets = list(self.worksheets)
+        try:
+            replies = [self.apply_request(request) for request in requests]
+        except Exception:
+            self.worksheets = worksheets
+            for worksheet, properties, rows in backup:
+                worksheet.properties, worksheet.rows = properties, rows
+            raise
+        return {"spreadsheetId": self.id, "replies": replies}
+
+    def apply_request(self, request: dict) -> dict:
+        """
+        Apply one request of a batchUpdate call and return its reply.
+        """
+        if "addSheet" in request:
+            properties = request["addSheet"].get("properties", {})
+            grid = properties.get("gridProperties", {})
+            worksheet = self.add_worksheet(
+                properties.get("title", f"Sheet{self.next_sheet_id + 1}"),
+                grid.get("rowCount", DEFAULT_ROWS),
+                grid.get("columnCount", DEFAULT_COLUMNS),
+                )
+            return {"addSheet": {"properties": worksheet.properties}}
+        if "deleteSheet" in request:
+            worksheet = self.worksheet(
+                sheet_id=request["deleteSheet"]["sheetId"]
+                )
+            self.worksheets.remove(worksheet)
+            return {}
+        if "insertDimension" in request:
+            dimension_range = request["insertDimension"]["range"]
+            if dimension_range.get("dimension") != "ROWS":
+                raise FakeAPIError(
+                    400, "INVALID_ARGUMENT", "Only rows can be inserted"
+                    )
+            worksheet = self.worksheet(sheet_id=dimension_range["sheetId"])
+            worksheet.insert_dimension(
+                dimension_range["startIndex"], dimension_range["endIndex"]
+                )
+            return {}
+        if "deleteDimension" in request:
+            dimension_range = request["deleteDimension"]["range"]
+            if dimension_range.get("dimension") != "ROWS":
+                raise FakeAPIError(
+                    400, "INVALID_ARGUMENT", "Only rows can be deleted"
+                    )
+            worksheet = self.worksheet(sheet_id=dimension_range["sheetId"])
+            worksheet.delete_rows(
+                dimension_range.get("startIndex", 0),
+                dimension_range.get("endIndex", len(worksheet.rows))
+                )
+            return {}
+        if "updateCells" in request:
+            update = request["updateCells"]
+            start = update["start"]
+            worksheet = self.worksheet(sheet_id=start["sheetId"])
+            worksheet.set_values(
+                start.get("rowIndex", 0) + 1,
+                start.get("columnIndex", 0) + 1,
+                row_data_values(update.get("rows", [])),
+                )
+            return {}
+        if "appendCells" in request:
+            append = request["appendCells"]
+            worksheet = self.worksheet(sheet_id=append["sheetId"])
+            start = worksheet.last_data_row(
+                1, 1, worksheet.grid["columnCount"]
+                ) + 1
+            worksheet.set_values(
+                start, 1, row_data_values(append.get("rows", []))
+                )
+            return {}
+        raise FakeAPIError(
+            400, "INVALID_ARGUMENT",
+            f"Request not supported by the stand-in: {list(request)}"
+            )
+
+
+def row_data_values(rows: list) -> list:
+    """
+    Return the values of RowData objects (of updateCells/appendCells) as
+    lists of values.
+    """
+    values = []
+    for row in rows:
+        cells = []
+        for cell in row.get("values", []):
+            entered = cell.get("userEnteredValue", {})
+            cells.append(next(iter(entered.values()), ""))
+        values.append(cells)
+    return values
+
+
+class FakeSheetsServer(ThreadingHTTPServer):
+    """
+    HTTP server of the stand-in APIs.
+
+    Args:
+        address (tuple): (host, port) to listen on, port 0 for any free
+                         port
+        latency (float): Seconds every request is delayed
+        jitter (float): Additional random delay of up to this many seconds
+        error_rate (float): Share of Sheets requests rejected with 429
+                            (quota exceeded), from 0 to 1
+        quota_per_minute (int): If set, Sheets read and write requests
+                                above this many per minute are rejected
+                                with 429, like the real quota
+        retry_after (int): If set, 429 responses ask the client to retry
+                           after this many seconds
+    """
+    daemon_threads = True
+
+    def __init__(self, address: tuple, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0,
+                 quota_per_minute: int = None, retry_after: int = None,
+                 verbose: bool = False):
+        super().__init__(address, FakeSheetsHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota_per_minute = quota_per_minute
+        self.retry_after = retry_after
+        self.verbose = verbose
+        self.spreadsheets = {}
+        # Requests per quota type in the current minute
+        self.quota_minute = None
+        self.quota_used = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        """
+        Base URL of the server, for WANDER_WALLET_API_URL.
+        """
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def create_spreadsheet(self, title: str,
+                           worksheets: dict = None) -> FakeSpreadsheet:
+        """
+        Add a spreadsheet with worksheets holding the given rows
+        (worksheet title -> list of rows).
+        """
+        with self.lock:
+            spreadsheet = FakeSpreadsheet(
+                f"fake-{len(self.spreadsheets) + 1}", title
+                )
+            for worksheet_title, rows in (worksheets or {}).items():
+                worksheet = spreadsheet.add_worksheet(
+                    worksheet_title, rows=max(len(rows), 1),
+                    columns=max([len(row) for row in rows] + [1])
+                    )
+                worksheet.set_values(1, 1, rows)
+            self.spreadsheets[spreadsheet.id] = spreadsheet
+        return spreadsheet
+
+    def create_app_spreadsheet(self, title: str = "wander_wallet"):
+        """
+        Add an empty Wander Wallet spreadsheet: the trip_info and expenses
+        worksheets with their header rows.
+        """
+        return self.create_spreadsheet(title, {
+            name: [header] for name, header in WORKSHEET_HEADERS.items()
+            })
+
+    def start(self):
+        """
+        Serve requests in a background thread.
+        """
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def check_quota(self, quota_type: str):
+        """
+        Raise a 429 error if the request is rejected by the injected
+        errors or the simulated per-minute quota.
+        """
+        if self.error_rate and random.random() < self.error_rate:
+            raise FakeAPIError(
+                429, "RESOURCE_EXHAUSTED", "Quota exceeded (injected error)"
+                )
+        if self.quota_per_minute is None:
+            return
+        with self.lock:
+            minute = int(time.time() // 60)
+            if minute != self.quota_minute:
+                self.quota_minute = minute
+                self.quota_used = {}
+            used = self.quota_used.get(quota_type, 0)
+            if used >= self.quota_per_minute:
+                raise FakeAPIError(
+                    429, "RESOURCE_EXHAUSTED",
+                    f"Quota exceeded for quota metric '{quota_type} "
+                    f"requests' per minute per user"
+                    )
+            self.quota_used[quota_type] = used + 1
+
+
+class FakeSheetsHandler(BaseHTTPRequestHandler):
+    """
+    Handles one request of the stand-in APIs.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.handle_api_request("GET")
+
+    def do_POST(self):
+        self.handle_api_request("POST")
+
+    def do_PUT(self):
+        self.handle_api_request("PUT")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def handle_api_request(self, method: str):
+        """
+        Read the request, wait for the simulated latency and send the
+        response (or the API error).
+        """
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+        server = self.server
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        headers = {}
+        try:
+            if url.path.startswith(DRIVE_PATH):
+                status, response = 200, self.list_files(params)
+            elif url.path.startswith(SHEETS_PATH):
+                server.check_quota("read" if method == "GET" else "write")
+                with server.lock:
+                    status, response = 200, self.sheets_request(
+                        method, url.path[len(SHEETS_PATH):], params, body
+                        )
+            else:
+                raise FakeAPIError(404, "NOT_FOUND", f"Unknown URL {url.path}")
+        except FakeAPIError as e:
+            status = e.code
+            response = {
+                "error": {
+                    "code": e.code, "message": e.message, "status": e.status
+                }
+            }
+            if e.code == 429 and server.retry_after is not None:
+                headers["Retry-After"] = str(server.retry_after)
+
+        data = json.dumps(response).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def list_files(self, params: dict) -> dict:
+        """
+        Drive files.list: the spreadsheets, filtered by name.
+        """
+        match = DRIVE_NAME_PATTERN.search(params.get("q", [""])[0])
+        name = match.group(1).replace('\\"', '"') if match else None
+        with self.server.lock:
+            files = [
+                {
+                    "id": spreadsheet.id,
+                    "name": spreadsheet.title,
+                    "createdTime": "2025-01-01T00:00:00.000Z",
+                    "modifiedTime": "2025-01-01T00:00:00.000Z",
+                }
+                for spreadsheet in self.server.spreadsheets.values()
+                if name is None or spreadsheet.title == name
+                ]
+        return {"kind": "drive#fileList", "files": files}
+
+    def sheets_request(self, method: str, path: str, params: dict,
+                       body: dict) -> dict:
+        """
+        Carry out a Sheets API request. Call with the server lock.
+
+        Args:
+            path (str): URL path after /v4/spreadsheets/, e.g.
+                        "<id>/values/trips!A:A:append"
+        """
+        spreadsheet_id, _, rest = path.partition("/")
+        spreadsheet_id, _, action = spreadsheet_id.partition(":")
+        spreadsheet = self.server.spreadsheets.get(spreadsheet_id)
+        if spreadsheet is None:
+            raise FakeAPIError(
+                404, "NOT_FOUND", "Requested entity was not found."
+                )
+
+        if not rest:
+            if method == "GET" and not action:
+                metadata = spreadsheet.metadata(params.get("ranges"))
+                # Only the top-level fields are filtered
+                fields = params.get("fields", [""])[0]
+                if fields and "sheets" not in fields:
+                    metadata.pop("sheets")
+                return metadata
+            if method == "POST" and action == "batchUpdate":
+                return spreadsheet.batch_update(body.get("requests", []))
+        elif rest == "values:batchGet" and method == "GET":
+            value_ranges = []
+            for a1_range in params.get("ranges", []):
+                worksheet, cells = spreadsheet.resolve(a1_range)
+                value_ranges.append(worksheet.get_values(cells))
+            return {"spreadsheetId": spreadsheet.id,
+                    "valueRanges": value_ranges}
+        elif rest == "values:batchClear" and method == "POST":
+            for a1_range in body.get("ranges", []):
+                worksheet, cells = spreadsheet.resolve(a1_range)
+                worksheet.clear(cells)
+            return {"spreadsheetId": spreadsheet.id}
+        elif rest.startswith("values/"):
+            a1_range = unquote(rest[len("values/"):])
+            for suffix in (":append", ":clear"):
+                if method == "POST" and a1_range.endswith(suffix):
+                    worksheet, cells = spreadsheet.resolve(
+                        a1_range[:-len(suffix)]
+                        )
+                    if suffix == ":clear":
+                        worksheet.clear(cells)
+                        return {"spreadsheetId": spreadsheet.id}
+                    insert = params.get("insertDataOption") == ["INSERT_ROWS"]
+                    response = worksheet.append_values(
+                        cells, body.get("values", []), insert_rows=insert
+                        )
+                    response["spreadsheetId"] = spreadsheet.id
+                    response["updates"]["spreadsheetId"] = spreadsheet.id
+                    return response
+            worksheet, cells = spreadsheet.resolve(a1_range)
+            if method == "GET":
+                return worksheet.get_values(cells)
+            if method == "PUT":
+                first_row, first_col, _, _ = worksheet.bounds(cells)
+                response = worksheet.set_values(
+                    first_row, first_col, body.get("values", [])
+                    )
+                response["spreadsheetId"] = spreadsheet.id
+                return response
+
+        raise FakeAPIError(
+            404, "NOT_FOUND",
+            f"Request not supported by the stand-in: {method} {path}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for the Google Sheets and Drive APIs."
+        )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--latency", type=float, default=0.0,
+        help="Seconds every request is delayed"
+        )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0,
+        help="Additional random delay of up to this many seconds"
+        )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0,
+        help="Share of Sheets requests rejected with 429, from 0 to 1"
+        )
+    parser.add_argument(
+        "--quota", type=int,
+        help="Sheets read and write requests allowed per minute"
+        )
+    parser.add_argument(
+        "--retry-after", type=int,
+        help="Retry-After seconds sent with 429 responses"
+        )
+    parser.add_argument(
+        "--sheet-name", default="wander_wallet",
+        help="Name of the empty Wander Wallet spreadsheet to create"
+        )
+    parser.add_argument("--verbose", action="store_true")
+    options = parser.parse_args()
+
+    server = FakeSheetsServer(
+        (options.host, options.port), latency=options.latency,
+        jitter=options.jitter, error_rate=options.error_rate,
+        quota_per_minute=options.quota, retry_after=options.retry_after,
+        verbose=options.verbose
+        )
+    spreadsheet = server.create_app_spreadsheet(options.sheet_name)
+    print(f"Serving the Sheets API stand-in on {server.url}")
+    print(f"Spreadsheet '{spreadsheet.title}' has the key {spreadsheet.id}")
+    print(f"Run the app with WANDER_WALLET_API_URL={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+import atexit
+import json
+import os
+from storage import (
+    WORKSHEET_HEADERS,
+    WORKSHEET_NAMES,
+    MemoryStore,
+    check_trip_id,
+    data_to_rows,
+    expense_records,
+    sheet_list_to_dict
+)
+from trip import Trip
+
+# trip_info fields entered by the user. The other fields are calculated
+# from them and the expenses (and change every day), so they are not
+# compared when checking for changes made elsewhere
+TRIP_INPUT_FIELDS = 4
+
+
+class LocalStore(MemoryStore):
+    """
+    Stores trip data in a local JSON file and syncs it to Google Sheets.
+
+    The class provides the same methods as SheetManager, so it can be used
+    in its place:
+    - Reads are served from the local file. When the trip is loaded and
+      the file holds no unsynced changes, it is refreshed from Google
+      Sheets first, so changes made on other devices are not missed. The
+      local data is only used as it is if Google Sheets can't be reached
+      (or if there is no connection to Google Sheets at all)
+    - Writes are saved to the local file right away and synced to Google
+      Sheets by `sync()`, which runs automatically when the program exits
+
+    Worksheets that still have to be synced are marked as "dirty" in the
+    file, so changes are not lost if the program is killed before syncing.
+    Several trips can share one file (see `MemoryStore`), but only the
+    trip of this store is synced by it.
+
+    The file also records the trip data as it was last read from or
+    written to Google Sheets. If the trip was changed in Google Sheets
+    since then (e.g. in another session), `sync()` doesn't overwrite those
+    changes, see `merge()`.
+
+    Attributes:
+        cache_file (str): Path of the local JSON file
+        connect (callable): Returns the SheetManager used for syncing,
+                            or None to keep the data local only
+        worksheets (dict): Worksheet key -> values (header + data rows)
+        dirty (list): Keys of the worksheets that have to be synced
+        synced (dict): Worksheet key -> trip data last read from or
+                       written to Google Sheets (see `sync_state()`)
+    """
+    def __init__(self, cache_file: str, connect=None, trip_id: str = None):
+        super().__init__(worksheets={}, trip_id=trip_id)
+        self.cache_file = cache_file
+        self.connect = connect
+        self.remote = None
+        self.dirty = []
+        self.synced = {}
+
+        if os.path.exists(cache_file):
+            with open(cache_file, encoding="utf-8") as file:
+                cache = json.load(file)
+            self.worksheets = cache["worksheets"]
+            self.dirty = cache["dirty"]
+            self.synced = cache.get("synced", {})
+
+        # Sync pending changes to Google Sheets when the program ends
+        if connect is not None:
+            atexit.register(self.sync)
+
+    def get_remote(self):
+        """
+        Return the SheetManager, connecting to Google Sheets on first use.
+        """
+        if self.remote is None:
+            self.remote = self.connect()
+        if self.remote.trip_id != self.trip_id:
+            self.remote.select_trip(self.trip_id)
+        return self.remote
+
+    def save(self):
+        """
+        Write all worksheets to the local file.
+        A temporary file is used, so the file is never half written.
+        """
+        temp_file = f"{self.cache_file}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as file:
+            json.dump({
+                "worksheets": self.worksheets,
+                "dirty": self.dirty,
+                "synced": self.synced,
+                }, file)
+        os.replace(temp_file, self.cache_file)
+
+    def list_trips(self) -> dict:
+        """
+        Return the trips as trip_id -> trip name: the trips in Google
+        Sheets (if connected), followed by trips only stored locally.
+        """
+        trips = {}
+        if self.connect is not None:
+            try:
+                trips = self.get_remote().list_trips()
+            except Exception as e:
+                print(f"⚠️  Could not load the trips from Google Sheets, "
+                      f"showing the local ones: {e}\n")
+        for trip_id, trip_name in super().list_trips().items():
+            trips.setdefault(trip_id, trip_name)
+        return trips
+
+    def select_trip(self, trip_id: str):
+        """
+        Work on the trip with the given id. Its data is loaded by
+        `load_all()` like the data of the trip the store was created for.
+        """
+        self.trip_id = check_trip_id(trip_id)
+
+    def is_loaded(self, worksheet_name: str = None) -> bool:
+        """
+        True if the worksheet (or all worksheets if no name is given) of
+        this trip is stored locally.
+        """
+        names = WORKSHEET_NAMES if worksheet_name is None else [worksheet_name]
+        return all(
+            self.worksheet_key(name) in self.worksheets for name in names
+            )
+
+    def is_dirty(self) -> bool:
+        """
+        True if the trip of this store has changes that aren't synced yet.
+        """
+        return any(
+            self.worksheet_key(name) in self.dirty for name in WORKSHEET_NAMES
+            )
+
+    def load_all(self) -> dict:
+        """
+        Retrieve the data of all trip worksheets as dictionaries.
+        """
+        if self.connect is None:
+            if not self.is_loaded():
+                # Local only: start with empty worksheets
+                for worksheet_name, header in WORKSHEET_HEADERS.items():
+                    self.worksheets.setdefault(
+                        self.worksheet_key(worksheet_name), [header]
+                        )
+                self.save()
+        elif not self.is_dirty():
+            # Nothing to sync: the trip may have been changed elsewhere
+            try:
+                self.store_synced(self.read_remote())
+            except Exception as e:
+                if not self.is_loaded():
+                    raise
+                print(f"⚠️  Could not load the trip data from Google "
+                      f"Sheets, using the local copy: {e}\n")
+
+        return super().load_all()
+
+    def read_remote(self) -> dict:
+        """
+        Read the trip worksheets from Google Sheets.
+
+        Returns:
+            dict: Worksheet name -> values (header + data rows)
+        """
+        remote = self.get_remote()
+        remote.load_all()
+        return {
+            worksheet_name: (
+                [remote.headers[worksheet_name]] +
+                remote.known_rows[worksheet_name]
+                )
+            for worksheet_name in WORKSHEET_NAMES
+            }
+
+    def store_synced(self, worksheets: dict):
+        """
+        Store the trip worksheets as they are in Google Sheets (read from
+        it or just written to it) and save the file.
+
+        Args:
+            worksheets (dict): Worksheet name -> values (header + data rows)
+        """
+        for worksheet_name, values in worksheets.items():
+            key = self.worksheet_key(worksheet_name)
+            self.worksheets[key] = values
+            self.synced[key] = self.sync_state(values, worksheet_name)
+            if key in self.dirty:
+                self.dirty.remove(key)
+        self.save()
+
+    @staticmethod
+    def sync_state(values: list, worksheet_name: str) -> list:
+        """
+        Return the part of a worksheet that is compared to find changes
+        made elsewhere: the fields of trip_info entered by the user and the
+        expenses as (date, amount) pairs. Values are normalized, because
+        Google Sheets returns all of them as strings.
+        """
+        if worksheet_name == "trip_info":
+            return [
+                [str(value) for value in row[:TRIP_INPUT_FIELDS]]
+                for row in values[1:]
+                ]
+        return [
+            [expense_date.isoformat(), amount]
+            for expense_date, amount in expense_records(values[1:])
+            ]
+
+    def merge(self, local: dict, remote: dict):
+        """
+        Combine the local changes of the trip with changes made to it in
+        Google Sheets since the last sync (e.g. in another session).
+
+        If both only changed expenses of the same trip, the amounts the
+        local changes added (or removed) are applied to the amounts in
+        Google Sheets. Otherwise (e.g. a new trip was set up on one side),
+        the changes can't be combined.
+
+        Args:
+            local (dict): Worksheet name -> local values
+            remote (dict): Worksheet name -> values in Google Sheets
+
+        Returns:
+            dict: Worksheet name -> merged values, or None if the changes
+            can't be combined
+        """
+        base = {
+            name: self.synced.get(self.worksheet_key(name))
+            for name in WORKSHEET_NAMES
+            }
+        local_state, remote_state = (
+            {name: self.sync_state(values[name], name)
+             for name in WORKSHEET_NAMES}
+            for values in (local, remote)
+            )
+        # Only a trip that is the same on both sides can be merged
+        trip_rows = base["trip_info"]
+        if not trip_rows or not (
+                trip_rows == local_state["trip_info"] ==
+                remote_state["trip_info"]):
+            return None
+
+        # Amount per date: Google Sheets plus the local changes
+        amounts = dict(remote_state["expenses"])
+        local_amounts = dict(local_state["expenses"])
+        base_amounts = dict(base["expenses"])
+        for expense_date in local_amounts.keys() | base_amounts.keys():
+            change = (
+                local_amounts.get(expense_date, 0) -
+                base_amounts.get(expense_date, 0)
+                )
+            if change:
+                amounts[expense_date] = amounts.get(expense_date, 0) + change
+
+        trip = Trip(
+            sheet_list_to_dict(remote["trip_info"], "trip_info"),
+            {"date": list(amounts),
+             "amount": [str(amount) for amount in amounts.values()]}
+            )
+        trip.update_trip_info()
+        # Values as strings, like the worksheets return them
+        return {
+            name: [WORKSHEET_HEADERS[name]] + [
+                [str(value) for value in row]
+                for row in data_to_rows(getattr(trip, name), name)
+                ]
+            for name in WORKSHEET_NAMES
+            }
+
+    def save_conflict(self, local: dict) -> str:
+        """
+        Write local trip data that could not be synced to a file next to
+        the local file, so it is not lost.
+
+        Returns:
+            str: Path of the file
+        """
+        conflict_file = f"{self.cache_file}.conflict"
+        with open(conflict_file, "w", encoding="utf-8") as file:
+            json.dump({"trip_id": self.trip_id, "worksheets": local}, file)
+        return conflict_file
+
+    def get_worksheet_dict(self, worksheet_name: str,
+                           refresh: bool = True) -> dict:
+        """
+        Retrieve all data from a worksheet and return it as a dictionary.
+        The data is always read locally, so `refresh` has no effect.
+        """
+        if not self.is_loaded(worksheet_name):
+            self.load_all()
+        return super().get_worksheet_dict(worksheet_name)
+
+    def set_rows(self, rows: list, worksheet_name: str):
+        """
+        Replace the data rows of a worksheet and mark it for syncing.
+        """
+        if not self.is_loaded(worksheet_name):
+            self.load_all()
+        super().set_rows(rows, worksheet_name)
+        key = self.worksheet_key(worksheet_name)
+        if key not in self.dirty:
+            self.dirty.append(key)
+
+    def sync(self):
+        """
+        Send all local changes to Google Sheets in one batch request.
+
+        The trip is read from Google Sheets first. If it was changed there
+        since the last sync, the changes are merged (see `merge()`) instead
+        of overwritten. If they can't be merged, the data in Google Sheets
+        is kept and the local changes are written to a conflict file.
+        """
+        if self.connect is None or not self.is_dirty():
+            return
+
+        print("⏳  Syncing trip data with Google Sheets...\n")
+        local = {
+            name: self.worksheets[self.worksheet_key(name)]
+            for name in WORKSHEET_NAMES
+            }
+        remote = self.read_remote()
+        changed_elsewhere = any(
+            self.sync_state(remote[name], name) not in (
+                self.synced.get(self.worksheet_key(name)),
+                self.sync_state(local[name], name)
+                )
+            for name in WORKSHEET_NAMES
+            )
+        if changed_elsewhere:
+            merged = self.merge(local, remote)
+            if merged is None:
+                conflict_file = self.save_conflict(local)
+                print(f"⚠️  The trip was changed on another device. Your "
+                      f"changes were not synced, they are saved in "
+                      f"{conflict_file}.\n")
+                self.store_synced(remote)
+                return
+            local = merged
+
+        sheet_dicts = {
+            name: sheet_list_to_dict(values, name)
+            for name, values in local.items()
+            }
+        self.get_remote().commit(LocalTrip(sheet_dicts["trip_info"],
+                                           sheet_dicts["expenses"]))
+        self.store_synced(local)
+
+
+class LocalTrip:
+    """
+    Minimal stand-in for a Trip, holding the trip_info and expenses
+    dictionaries that SheetManager.commit() saves.
+
+    It can also hold the ledger of a trip and the ledger version the data
+    belongs to. SheetManager.commit() then only saves the changes since its
+    last save, and `expenses` can be None if it is known that the storage
+    doesn't need them.
+    """
+    def __init__(self, trip_info: dict, expenses: dict, ledger=None,
+                 ledger_version: int = None):
+        self.trip_info = trip_info
+        self.expenses = expenses
+        self.ledger = ledger
+        self.ledger_version = ledger_version
@@ -0,0 +1,264 @@
+import atexit
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+# Histogram-free summary of every span: count, total and max. duration
+SPAN_FIELDS = ("count", "total_s", "max_s")
+# Span field -> Prometheus metric name and type
+SPAN_METRICS = (
+    ("count", "wander_wallet_span_calls_total", "counter"),
+    ("total_s", "wander_wallet_span_seconds_total", "counter"),
+    ("max_s", "wander_wallet_span_max_seconds", "gauge"),
+)
+
+
+class Metrics:
+    """
+    Opt-in instrumentation of a session: timing spans and counters.
+
+    Set WANDER_WALLET_METRICS to a file path to enable it:
+    - "*.prom": Prometheus text format, written when the session ends
+      (e.g. for the textfile collector of the node exporter)
+    - anything else: JSON lines, one line per finished span while the
+      session runs and a summary line with all totals at the end
+
+    "{pid}" in the path is replaced by the process id, so every session
+    can write its own file. Without the variable, spans and counters do
+    nothing and cost almost no time.
+
+    Recorded data:
+    - Spans: calls of SheetManager methods, the steps of run.py, waiting
+      for user input, pauses and waiting for the Sheets API quota
+    - Counters: HTTP requests by method, quota and status code, retries,
+      and the number of cells read and written
+
+    Attributes:
+        enabled (bool): True if metrics are recorded
+        path_pattern (str): File the metrics are written to
+        session (str): ID of the session, in every JSON line
+        spans (dict): Span name -> {"count", "total_s", "max_s"}
+        counters (dict): (counter name, labels) -> value
+    """
+    def __init__(self, path: str = None):
+        self.enabled = bool(path)
+        self.path_pattern = path
+        self.lock = threading.Lock()
+        self.log_file = None
+        self.reset()
+        if self.enabled:
+            atexit.register(self.export)
+
+    def reset(self):
+        """
+        Start a new session: clear all spans and counters. Used by the
+        session server in every forked session.
+        """
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+        self.session = f"{os.getpid()}-{int(time.time())}"
+        self.spans = {}
+        self.counters = {}
+
+    @property
+    def path(self) -> str:
+        """
+        File the metrics of the current process are written to.
+        """
+        return self.path_pattern.replace("{pid}", str(os.getpid()))
+
+    @property
+    def prometheus(self) -> bool:
+        """
+        True if the metrics are exported in the Prometheus text format.
+        """
+        return self.path.endswith(".prom")
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        """
+        Time the code in a with block as a span with the given name.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(name, time.perf_counter() - start)
+
+    def record_span(self, name: str, duration: float):
+        """
+        Add a finished span to the totals (and to the JSON lines log).
+        """
+        with self.lock:
+            totals = self.spans.setdefault(name, dict.fromkeys(SPAN_FIELDS, 0))
+            totals["count"] += 1
+            totals["total_s"] += duration
+            totals["max_s"] = max(totals["max_s"], duration)
+            if not self.prometheus:
+                self.write_line({
+                    "type": "span",
+                    "session": self.session,
+                    "name": name,
+                    "time": time.time(),
+                    "duration_s": duration,
+                })
+
+    def count(self, name: str, value: int = 1, **labels):
+        """
+        Increase a counter, e.g. count("http_requests", method="GET").
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def record_http(self, method: str, endpoint: str, quota: str,
+                    body: dict, response):
+        """
+        Count an HTTP request and the cells it read or wrote.
+        """
+        if not self.enabled:
+            return
+        status = getattr(response, "status_code", "error")
+        self.count(
+            "http_requests", method=method.upper(), quota=quota or "other",
+            status=str(status)
+            )
+        if body:
+            self.count("cells_written", count_written_cells(body))
+        if quota == "read" and status == 200:
+            self.count("cells_read", count_read_cells(response.json()))
+
+    def write_line(self, record: dict):
+        """
+        Append a record to the JSON lines log. Call with the lock.
+        """
+        if self.log_file is None:
+            self.log_file = open(self.path, "a", encoding="utf-8")
+        self.log_file.write(json.dumps(record) + "\n")
+        self.log_file.flush()
+
+    def export(self):
+        """
+        Write the totals of the session, when the session ends.
+        """
+        with self.lock:
+            if self.prometheus:
+                with open(self.path, "w", encoding="utf-8") as file:
+                    file.write(self.prometheus_text())
+            else:
+                self.write_line({
+                    "type": "session",
+                    "session": self.session,
+                    "time": time.time(),
+                    "spans": self.spans,
+                    "counters": [
+                        {"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in self.counters.items()
+                        ],
+                })
+                self.log_file.close()
+                self.log_file = None
+
+    def prometheus_text(self) -> str:
+        """
+        Return the totals in the Prometheus text format.
+        """
+        lines = []
+        for field, metric, kind in SPAN_METRICS:
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, totals in sorted(self.spans.items()):
+                lines.append(f'{metric}{{span="{name}"}} {totals[field]}')
+        names = sorted({name for name, _ in self.counters})
+        for name in names:
+            metric = f"wander_wallet_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (counter, labels), value in sorted(self.counters.items()):
+                if counter == name:
+                    label_text = ",".join(
+                        f'{key}="{label}"' for key, label in labels
+                        )
+                    if label_text:
+                        label_text = f"{{{label_text}}}"
+                    lines.append(f"{metric}{label_text} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def count_written_cells(body: dict) -> int:
+    """
+    Count the cells written by the JSON body of a Sheets API request
+    (values update/append or spreadsheets.batchUpdate).
+    """
+    if "values" in body:
+        return sum(len(row) for row in body["values"])
+    cells = 0
+    for request in body.get("requests", []):
+        for kind in ("updateCells", "appendCells"):
+            if kind in request:
+                cells += sum(
+                    len(row.get("values", []))
+                    for row in request[kind].get("rows", [])
+                    )
+    return cells
+
+
+def count_read_cells(response: dict) -> int:
+    """
+    Count the cells in the response of a values get/batchGet request.
+    """
+    value_ranges = response.get("valueRanges", [response])
+    return sum(
+        len(row)
+        for value_range in value_ranges
+        for row in value_range.get("values", [])
+        )
+
+
+def timed(name: str):
+    """
+    Decorator that records every call of a function as a span.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return function(*args, **kwargs)
+            with METRICS.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument_class(cls, prefix: str):
+    """
+    Record every call of the public methods of a class as a span named
+    "<prefix>.<method>". Does nothing if metrics are disabled.
+    """
+    if not METRICS.enabled:
+        return
+    for name, attribute in list(vars(cls).items()):
+        if callable(attribute) and not name.startswith("_"):
+            setattr(cls, name, timed(f"{prefix}.{name}")(attribute))
+
+
+def timed_input(prompt: str = "") -> str:
+    """
+    input() that records the time spent waiting for the user as an "input"
+    span. Used for the prompts of run.py instead of input().
+    """
+    with METRICS.span("input"):
+        return input(prompt)
+
+
+# Metrics of this process (disabled unless WANDER_WALLET_METRICS is set)
+METRICS = Metrics(os.environ.get("WANDER_WALLET_METRICS"))
+span = METRICS.span
+count = METRICS.count
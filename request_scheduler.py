@@ -0,0 +1,299 @@
+import contextlib
+import multiprocessing
+import random
+import threading
+import time
+import requests
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+from metrics import METRICS
+
+# Default Sheets API quota per user: 60 read and 60 write requests per
+# minute. Up to QUOTA_BURST requests can be sent at once, the rest is paced
+READ_QUOTA_PER_MINUTE = 60
+WRITE_QUOTA_PER_MINUTE = 60
+QUOTA_BURST = 10
+# Seconds to wait for the lock of a token bucket. It is only held for a
+# moment, so a longer wait means that the process holding the shared lock
+# was killed
+LOCK_TIMEOUT = 5.0
+
+# Retries of a failed request and their delays (seconds)
+MAX_RETRIES = 5
+BASE_DELAY = 1.0
+MAX_DELAY = 32.0
+
+# Server errors that are worth retrying (a 429 is always retried)
+RETRY_STATUS_CODES = (408, 500, 502, 503, 504)
+# Base URLs of the Google APIs used by gspread (Sheets and Drive)
+GOOGLE_API_URLS = (
+    "https://sheets.googleapis.com",
+    "https://www.googleapis.com",
+)
+# Requests sent with POST that only read or replace values, so sending
+# them twice has the same result as sending them once
+IDEMPOTENT_POST_ENDPOINTS = (
+    "/values:batchGet",
+    "/values:batchGetByDataFilter",
+    "/values:batchUpdate",
+    "/values:batchClear",
+    ":clear",
+)
+
+
+class TokenBucket:
+    """
+    Paces requests so they stay within a per-minute quota.
+
+    The bucket holds up to `burst` tokens and gains `per_minute` tokens per
+    minute. Every request takes a token and waits if there is none left.
+    The class is thread safe, e.g. for requests sent by the background
+    writer while the app reads data. After `share()`, it is shared by
+    processes forked afterwards as well.
+
+    Attributes:
+        state (list | RawArray): Number of tokens and the time (monotonic
+                                 clock) they were last counted
+    """
+    def __init__(self, per_minute: int, burst: int):
+        self.rate = per_minute / 60
+        self.capacity = burst
+        self.state = [burst, time.monotonic()]
+        self.lock = threading.Lock()
+
+    def share(self):
+        """
+        Move the state of the bucket into shared memory, so processes
+        forked afterwards (e.g. the sessions of session_server.py) take
+        their tokens from the same bucket instead of each one getting the
+        whole quota. The monotonic clock is the same in all processes.
+        """
+        with self.locked():
+            self.refill()
+            self.state = multiprocessing.RawArray("d", self.state)
+            self.lock = multiprocessing.Lock()
+
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        Hold the lock of the bucket. A session killed while holding the
+        shared lock never releases it, so after LOCK_TIMEOUT the lock is
+        taken over instead of blocking all other sessions for good.
+        """
+        if not self.lock.acquire(timeout=LOCK_TIMEOUT):
+            METRICS.count("quota_lock_timeouts")
+        try:
+            yield
+        finally:
+            try:
+                self.lock.release()
+            except ValueError:
+                # The lock was taken over, but its holder wasn't killed
+                # and released it in the meantime
+                pass
+
+    def refill(self):
+        """
+        Add the tokens gained since the last update. Call with the lock.
+        """
+        now = time.monotonic()
+        tokens, updated = self.state
+        self.state[0] = min(
+            self.capacity, tokens + (now - updated) * self.rate
+            )
+        self.state[1] = now
+
+    def acquire(self):
+        """
+        Take a token, waiting until one is available.
+        """
+        while True:
+            with self.locked():
+                self.refill()
+                if self.state[0] >= 1:
+                    self.state[0] -= 1
+                    return
+                wait = (1 - self.state[0]) / self.rate
+            with METRICS.span("quota_wait"):
+                time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """
+        Hold back all requests for the given time, e.g. after the API
+        reported that the quota is used up.
+        """
+        with self.locked():
+            self.refill()
+            self.state[0] = min(self.state[0], 1 - seconds * self.rate)
+
+
+class RequestScheduler:
+    """
+    Sends Sheets API requests within the quota and retries failed ones.
+
+    - Read and write requests are paced by one token bucket each, matching
+      the per-minute read and write quotas of the Sheets API
+    - A request rejected with 429 (quota exceeded) was not carried out, so
+      it is always retried. All other requests wait as well, so a throttle
+      isn't made worse by more requests
+    - Server errors and connection errors are only retried for idempotent
+      requests (reads and writes that replace values). Appending rows or a
+      spreadsheets.batchUpdate may already have been carried out, so they
+      are not sent again
+    - Retries wait with exponential backoff and random jitter, so many
+      sessions that were throttled at the same time don't retry at the same
+      time (or as long as the API asks for with a Retry-After header)
+    """
+    def __init__(self, read_per_minute: int = READ_QUOTA_PER_MINUTE,
+                 write_per_minute: int = WRITE_QUOTA_PER_MINUTE,
+                 burst: int = QUOTA_BURST, max_retries: int = MAX_RETRIES):
+        self.buckets = {
+            "read": TokenBucket(read_per_minute, burst),
+            "write": TokenBucket(write_per_minute, burst),
+        }
+        self.max_retries = max_retries
+
+    def share(self):
+        """
+        Share the quota with processes forked afterwards, see
+        TokenBucket.share().
+        """
+        for bucket in self.buckets.values():
+            bucket.share()
+
+    @staticmethod
+    def quota_type(method: str, endpoint: str):
+        """
+        Return the quota a request counts against ("read" or "write"), or
+        None for requests to other APIs (e.g. Google Drive).
+        """
+        # gspread sends the method in lower case
+        method = method.upper()
+        if "sheets.googleapis.com" not in endpoint:
+            return None
+        if method == "GET" or endpoint.endswith("/values:batchGet"):
+            return "read"
+        return "write"
+
+    @staticmethod
+    def is_idempotent(method: str, endpoint: str) -> bool:
+        """
+        True if sending the request twice has the same result as sending
+        it once.
+        """
+        if method.upper() in ("GET", "PUT", "DELETE"):
+            return True
+        return endpoint.endswith(IDEMPOTENT_POST_ENDPOINTS)
+
+    @staticmethod
+    def backoff_delay(attempt: int, error: APIError = None) -> float:
+        """
+        Return the delay before a retry: exponential backoff with full
+        jitter, or the delay requested by the API.
+        """
+        if error is not None:
+            retry_after = error.response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        return random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt))
+
+    def send(self, method: str, endpoint: str, send_request):
+        """
+        Send a request through `send_request()`, within the quota and with
+        retries.
+
+        Returns:
+            The response returned by `send_request()`
+        """
+        quota_type = self.quota_type(method, endpoint)
+        idempotent = self.is_idempotent(method, endpoint)
+        attempt = 0
+        while True:
+            if quota_type is not None:
+                self.buckets[quota_type].acquire()
+            try:
+                return send_request()
+            except APIError as e:
+                if attempt >= self.max_retries:
+                    raise
+                if e.code == 429:
+                    delay = self.backoff_delay(attempt, e)
+                    # Hold back all requests of this quota, not only this one
+                    if quota_type is not None:
+                        self.buckets[quota_type].pause(delay)
+                elif idempotent and e.code in RETRY_STATUS_CODES:
+                    delay = self.backoff_delay(attempt, e)
+                else:
+                    raise
+            except (requests.ConnectionError, requests.Timeout):
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+            METRICS.count("http_retries", quota=quota_type or "other")
+            with METRICS.span("retry_wait"):
+                time.sleep(delay)
+            attempt += 1
+
+
+class ScheduledHTTPClient(HTTPClient):
+    """
+    gspread HTTP client that sends all requests through the
+    RequestScheduler. All clients of the process share one scheduler, so
+    they share the quota as well. Forked processes get a copy of the
+    scheduler with a quota of their own, unless it was shared before
+    forking with `ScheduledHTTPClient.scheduler.share()`.
+
+    Use it with `gspread.authorize(creds, http_client=ScheduledHTTPClient)`.
+    """
+    scheduler = RequestScheduler()
+
+    def request(self, method: str, endpoint: str, *args, **kwargs):
+        return self.scheduler.send(
+            method, endpoint,
+            lambda: self.send_request(method, endpoint, *args, **kwargs)
+            )
+
+    def api_url(self, endpoint: str) -> str:
+        """
+        Return the URL a request is sent to (the endpoint itself).
+        """
+        return endpoint
+
+    def send_request(self, method: str, endpoint: str, *args, **kwargs):
+        """
+        Send one attempt of a request and count it (if metrics are enabled).
+        """
+        url = self.api_url(endpoint)
+        if not METRICS.enabled:
+            return super().request(method, url, *args, **kwargs)
+        quota_type = self.scheduler.quota_type(method, endpoint)
+        response = None
+        try:
+            with METRICS.span("http_request"):
+                response = super().request(method, url, *args, **kwargs)
+            return response
+        except APIError as e:
+            response = e.response
+            raise
+        finally:
+            METRICS.record_http(
+                method, endpoint, quota_type, kwargs.get("json"), response
+                )
+
+
+class LocalAPIHTTPClient(ScheduledHTTPClient):
+    """
+    ScheduledHTTPClient that sends the requests for the Google APIs to
+    another server, e.g. the local stand-in in fake_sheets_server.py.
+    Requests are still paced and retried like requests to Google.
+
+    Set `base_url` (e.g. "http://127.0.0.1:8080") before using it with
+    `gspread.Client(AnonymousCredentials(), http_client=LocalAPIHTTPClient)`.
+    """
+    base_url = None
+
+    def api_url(self, endpoint: str) -> str:
+        for google_url in GOOGLE_API_URLS:
+            if endpoint.startswith(google_url):
+                return self.base_url + endpoint[len(google_url):]
+        return endpoint
@@ -1,18 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import atexit
+import os
+import signal
+import sys
+import threading
 import time
 from trip import Trip
-from sheet_manager import SheetManager
+from dates import parse_date
+from metrics import span, timed, timed_input
+from local_store import LocalStore
+from storage import MemoryStore
+from checkpoint import SessionCheckpoint
+from write_behind import WriteBehindStore
 from validation import (
     new_trip_info_valid,
     int_input_valid,
     yes_no_input_valid,
-    expense_date_valid
+    expense_date_valid,
+    trip_choice_valid
 )
 from colorama import Fore, Style, init
 
 # Initialize Colorama (colors reset automatically after each print)
 init(autoreset=True)
 
+# Fast mode (WANDER_WALLET_FAST=1): no pauses between screens, and the
+# storage is set up in the background while the welcome screen is shown
+FAST_MODE = os.environ.get("WANDER_WALLET_FAST", "") not in ("", "0")
+# The storage holds many trips (WANDER_WALLET_MULTI_TRIP=1): every session
+# asks which trip to work on, unless WANDER_WALLET_TRIP_ID is set
+MULTI_TRIP = os.environ.get("WANDER_WALLET_MULTI_TRIP", "") not in ("", "0")
+# Factor applied to all pauses between screens (WANDER_WALLET_PAUSE),
+# e.g. 0.5 for half as long pauses or 0 for no pauses
+PAUSE_FACTOR = float(
+    os.environ.get("WANDER_WALLET_PAUSE", "0" if FAST_MODE else "1")
+    )
+# After an unexpected error the app picks up where it left off, waiting
+# RESTART_DELAY seconds first (doubled after every further error). After
+# MAX_RESTARTS errors in a row without progress, the user is asked whether
+# to try again
+MAX_RESTARTS = 3
+RESTART_DELAY = 1.0
+# Signals that end a session, e.g. the web terminal sends SIGHUP when the
+# browser tab is closed
+EXIT_SIGNALS = {signal.SIGHUP, signal.SIGTERM}
+
 
 # From https://stackoverflow.com/questions/2084508/clear-the-terminal-in-python
 def clear():
@@ -22,6 +55,152 @@ def clear():
     print("\033c")
 
 
+@timed("run.pause")
+def pause(seconds: float):
+    """
+    Pause before the next screen for better UX. The pause is scaled by
+    WANDER_WALLET_PAUSE and skipped in fast mode.
+    """
+    if PAUSE_FACTOR > 0:
+        time.sleep(seconds * PAUSE_FACTOR)
+
+
+def create_storage():
+    """
+    Set up the storage for the trip data, depending on the
+    WANDER_WALLET_STORAGE environment variable:
+    - "sheets" (default): Google Sheets. Trip data is saved in the
+      background, so the user doesn't have to wait for it. If
+      WANDER_WALLET_CACHE is set to a file path, reads are served from that
+      file and changes are synced to Google Sheets when the program ends
+    - "local": Local JSON file only (WANDER_WALLET_CACHE, default
+      "wander_wallet.json")
+    - "memory": In memory only, nothing is saved
+
+    The Google Spreadsheet is opened by its key or URL if
+    WANDER_WALLET_SHEET_KEY is set, otherwise it is searched by name.
+
+    If WANDER_WALLET_TRIP_ID is set, the storage holds many trips and only
+    the trip with this id is loaded and updated. With
+    WANDER_WALLET_MULTI_TRIP instead, the trip is chosen by the user (see
+    `choose_trip()`).
+
+    Returns:
+        StorageBackend: The storage used by the app
+    """
+    creds_file = "creds.json"
+    sheet_name = "wander_wallet"
+    storage_type = os.environ.get("WANDER_WALLET_STORAGE", "sheets")
+    cache_file = os.environ.get("WANDER_WALLET_CACHE")
+    sheet_key = os.environ.get("WANDER_WALLET_SHEET_KEY")
+    trip_id = os.environ.get("WANDER_WALLET_TRIP_ID")
+
+    if storage_type == "memory":
+        return MemoryStore(trip_id=trip_id)
+    if storage_type == "local":
+        return LocalStore(cache_file or "wander_wallet.json", trip_id=trip_id)
+
+    # Imported here, so gspread and google-auth are only loaded when
+    # Google Sheets is used
+    from sheet_manager import SheetManager
+    if cache_file:
+        return LocalStore(
+            cache_file,
+            connect=lambda: SheetManager(
+                creds_file, sheet_name, sheet_key, trip_id
+                ),
+            trip_id=trip_id
+            )
+    return WriteBehindStore(
+        SheetManager(creds_file, sheet_name, sheet_key, trip_id)
+        )
+
+
+def setup_storage():
+    """
+    Set up the storage and load the trip data from both worksheets.
+
+    Returns:
+        tuple: (StorageBackend, dictionary with the data of both worksheets)
+    """
+    storage = create_storage()
+    if trip_choice_needed(storage):
+        # The trip is loaded once the user has chosen it
+        return storage, None
+    return storage, storage.load_all()
+
+
+def setup_storage_in_background():
+    """
+    Run `setup_storage()` in a background thread, so the imports, the
+    authorization with Google and loading the trip data happen while the
+    welcome screen is shown (fast mode).
+
+    Returns:
+        Future: Provides the result of `setup_storage()`
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    storage_setup = executor.submit(setup_storage)
+    # The result is collected by main(), don't wait for it here
+    executor.shutdown(wait=False)
+    return storage_setup
+
+
+def trip_choice_needed(storage) -> bool:
+    """
+    True if the storage holds many trips and the user hasn't chosen the
+    trip to work on yet.
+    """
+    return MULTI_TRIP and storage.trip_id is None
+
+
+@timed("run.choose_trip")
+def choose_trip(storage):
+    """
+    Let the user choose the trip to work on in this session: one of the
+    trips in the storage, or a new trip with a new trip id.
+
+    Args:
+        storage (StorageBackend): Storage that holds many trips
+
+    No return value.
+    """
+    trips = storage.list_trips()
+    trip_ids = list(trips)
+
+    if trips:
+        print("\nThese trips are stored:")
+        for number, (trip_id, trip_name) in enumerate(trips.items(), 1):
+            print(f"  {number}. {trip_name or '(not set up yet)'} "
+                  f"[{trip_id}]")
+    else:
+        print("\nNo trips are stored yet.")
+    print(
+        "\nEnter the number of a trip to work on it, or a new trip id "
+        "(letters, numbers,\n'-' and '_') to set up a new trip."
+        )
+
+    # Trip Choice Input
+    while True:
+        trip_choice = timed_input(
+            Style.BRIGHT +
+            "\n✏️  Enter your trip here: "
+            ).strip()
+
+        # Validate trip choice
+        if trip_choice_valid(trip_choice, len(trip_ids)):
+            print(Fore.GREEN + Style.NORMAL + "Data is valid!\n")
+            break
+
+    if trip_choice.isdigit():
+        trip_choice = trip_ids[int(trip_choice) - 1]
+    storage.select_trip(trip_choice)
+
+    # Small pause + clear screen for better UX
+    pause(2)
+    clear()
+
+
 def trip_exists(trip_info_data):
     """
     Check if a trip already exists in the worksheet data.
@@ -41,6 +220,7 @@ def trip_exists(trip_info_data):
         return False
 
 
+@timed("run.get_new_trip_info")
 def get_new_trip_info():
     """
     Prompt the user for new trip details (trip name, dates, budget).
@@ -73,7 +253,7 @@ def get_new_trip_info():
             )
         print("Example: Italy Summer 2025")
 
-        trip_name_input = input(
+        trip_name_input = timed_input(
             Style.BRIGHT + "\n✏️  Enter your trip name here: "
             )
 
@@ -91,7 +271,7 @@ def get_new_trip_info():
         print("Please type in the start date first!")
         print("Example: 2025-08-01,2025-08-15")
 
-        trip_dates_input = input(
+        trip_dates_input = timed_input(
             Style.BRIGHT +
             "\n✏️  Enter your trip dates here: "
             )
@@ -111,7 +291,7 @@ def get_new_trip_info():
         print("Enter as a positive whole number in euros (no decimals).")
         print("Example: 2500")
 
-        trip_budget_input = input(
+        trip_budget_input = timed_input(
             Style.BRIGHT +
             "\n✏️  Enter your total trip budget here: "
             )
@@ -132,6 +312,7 @@ def get_new_trip_info():
     return new_trip_info_dict
 
 
+@timed("run.continue_trip")
 def continue_trip():
     """
     Ask the user whether to continue with the current trip or start a new one.
@@ -151,7 +332,7 @@ def continue_trip():
             "new trip in\nthe next step."
             )
 
-        yes_no_input = input(
+        yes_no_input = timed_input(
             Style.BRIGHT +
             "\n✏️  Enter your decision here (yes/no): "
             )
@@ -162,7 +343,7 @@ def continue_trip():
             break
 
     # Small pause + clear screen for better UX
-    time.sleep(2)
+    pause(2)
     clear()
 
     if yes_no_input == "yes":
@@ -171,7 +352,22 @@ def continue_trip():
         return False
 
 
-def start_new_trip(expenses, sheet_manager):
+@timed("run.save_trip")
+def save_trip(trip, sheet_manager, checkpoint=None):
+    """
+    Save trip info and expenses of a trip in one batch request.
+
+    If a checkpoint is given, the trip is recorded in it, so the save can
+    be retried if the session is resumed after an error.
+    """
+    if checkpoint is None:
+        sheet_manager.commit(trip)
+    else:
+        checkpoint.save_trip(sheet_manager, trip)
+
+
+@timed("run.start_new_trip")
+def start_new_trip(expenses, sheet_manager, checkpoint=None):
     """
     Initialize a new trip.
 
@@ -183,19 +379,20 @@ def start_new_trip(expenses, sheet_manager):
 
     Args:
         expenses (dict): A dictionary of expenses to initialize the trip with
-        sheet_manager (object): Handles worksheet updates
+        sheet_manager (StorageBackend): Handles worksheet updates
+        checkpoint (SessionCheckpoint): Records the trip until it is saved
 
     Returns:
         Trip: The initialized Trip object containing all trip details.
     """
     print("✅  No trip found. Let's set up a new trip.")
-    input(
+    timed_input(
         Style.BRIGHT +
         "\nPress ENTER to continue\n"
         )
 
     # Small pause + clear screen for better UX
-    time.sleep(1)
+    pause(1)
     clear()
 
     # Get basic info for new trip (name, dates, budget)
@@ -205,15 +402,21 @@ def start_new_trip(expenses, sheet_manager):
     trip = Trip(new_trip_info, expenses)
     trip.update_trip_info()
 
+    # Record the trip before saving it, so a session resumed after a failed
+    # save retries the save and continues with the expenses instead of
+    # asking for the trip details again
+    if checkpoint is not None:
+        checkpoint.reach("expenses", trip)
+
     # Save new trip info to worksheet
-    sheet_manager.update_worksheet(trip.trip_info, "trip_info")
-    input(
+    save_trip(trip, sheet_manager, checkpoint)
+    timed_input(
             Style.BRIGHT +
             "\nPress ENTER to continue\n"
             )
 
     # Small pause + clear screen for better UX
-    time.sleep(1)
+    pause(1)
     clear()
 
     # Show trip summary
@@ -222,7 +425,8 @@ def start_new_trip(expenses, sheet_manager):
     return trip
 
 
-def get_new_expense(trip, sheet_manager):
+@timed("run.get_new_expense")
+def get_new_expense(trip, sheet_manager, checkpoint=None):
     """
     Prompt the user to add one or more expenses to the current trip.
 
@@ -234,7 +438,8 @@ def get_new_expense(trip, sheet_manager):
 
     Args:
         trip (Trip): The current Trip object to which expenses will be added
-        sheet_manager (object): Handles worksheet updates
+        sheet_manager (StorageBackend): Handles worksheet updates
+        checkpoint (SessionCheckpoint): Records the trip until it is saved
 
     Returns:
         bool:
@@ -243,7 +448,7 @@ def get_new_expense(trip, sheet_manager):
     """
     while True:
         # Add a new expense and update the worksheet
-        add_expenses(trip, sheet_manager)
+        add_expenses(trip, sheet_manager, checkpoint)
 
         # Show the updated trip summary
         print(trip.summary())
@@ -251,7 +456,7 @@ def get_new_expense(trip, sheet_manager):
         # Check if user wants to add another expense
         while True:
             print(Style.BRIGHT + "Do you want to add another expense?\n")
-            yes_no_input = input(
+            yes_no_input = timed_input(
                 Style.BRIGHT +
                 "✏️  Enter your decision here (yes/no): "
                 )
@@ -260,7 +465,7 @@ def get_new_expense(trip, sheet_manager):
             if yes_no_input_valid(yes_no_input):
                 print(Fore.GREEN + Style.NORMAL + "Data is valid!\n")
                 # Small pause + clear screen for better UX
-                time.sleep(2)
+                pause(2)
                 clear()
                 break
 
@@ -268,7 +473,8 @@ def get_new_expense(trip, sheet_manager):
             break
 
 
-def add_expenses(trip, sheet_manager):
+@timed("run.add_expenses")
+def add_expenses(trip, sheet_manager, checkpoint=None):
     """
     Prompt the user to add or update an expense for a specific date in the
     trip.
@@ -278,14 +484,15 @@ def add_expenses(trip, sheet_manager):
     - Checks if an expense already exists for that date and optionally updates
     it.
     - Prompts the user to input the expense amount.
-    - Adds or updates the expense in the trip's expenses dictionary.
-    - Sorts expenses by date.
+    - Adds or updates the expense in the trip's expense ledger, which keeps
+    the expenses ordered by date.
     - Updates trip information and saves both trip info and expenses to the
     worksheet.
 
     Args:
         trip (Trip): The current Trip object containing trip info and expenses
-        sheet_manager (object): Handles worksheet updates
+        sheet_manager (StorageBackend): Handles worksheet updates
+        checkpoint (SessionCheckpoint): Records the trip until it is saved
     """
     # Get date input
     while True:
@@ -304,7 +511,7 @@ def add_expenses(trip, sheet_manager):
             "then you\nyou will be able to update the expense for this date."
             )
 
-        date_input = input(
+        date_input = timed_input(
             Style.BRIGHT +
             "\n✏️  Enter your expense date here: "
             )
@@ -316,9 +523,9 @@ def add_expenses(trip, sheet_manager):
             continue
 
         # Check if the date already exists in the database
-        if date_input in trip.expenses["date"]:
-            old_date_index = trip.expenses["date"].index(date_input)
-            old_amount = trip.expenses["amount"][old_date_index]
+        expense_date = parse_date(date_input)
+        old_amount = trip.ledger.get(expense_date)
+        if old_amount is not None:
             # Ask user if they want to update the existing expense
             while True:
                 print(
@@ -327,7 +534,7 @@ def add_expenses(trip, sheet_manager):
                     f"for {date_input}.\n"
                     )
                 print(Style.BRIGHT + "Do you want to update it?\n")
-                yes_no_input = input(
+                yes_no_input = timed_input(
                     Style.BRIGHT +
                     "✏️  Enter your decision here (yes/no): "
                     )
@@ -339,7 +546,7 @@ def add_expenses(trip, sheet_manager):
 
             if yes_no_input == "no":
                 # Small pause + clear screen for better UX
-                time.sleep(2)
+                pause(2)
                 clear()
                 # Exit without changing anything
                 print("Okay, we will keep the old expense for this date.\n")
@@ -353,47 +560,33 @@ def add_expenses(trip, sheet_manager):
         print("Enter as a positive whole number in euros (no decimals).")
         print("Example: 24")
 
-        amount_input = input(Style.BRIGHT + "\n✏️  Enter your expense here: ")
+        amount_input = timed_input(
+            Style.BRIGHT + "\n✏️  Enter your expense here: "
+            )
 
         # Validate amount input
         if int_input_valid(amount_input):
             print(Fore.GREEN + Style.NORMAL + "Data is valid!\n")
             break
 
-    # Add/update expense amount to/in expense dict
-    if date_input in trip.expenses["date"]:
-        # Update value in expenses dict if date already exists
-        date_index = trip.expenses["date"].index(date_input)
-        trip.expenses["amount"][date_index] = amount_input
-        update_amount = True
-    else:
-        # Add value in expenses dict if date doesn't exist yet
-        trip.expenses["date"].append(date_input)
-        trip.expenses["amount"].append(amount_input)
-        update_amount = False
-
-    # Sort dates, so that the expenses are saved and shown ordered by date
-    # Zip dates and amounts together
-    combined = list(zip(trip.expenses['date'], trip.expenses['amount']))
-    # Sort by date (convert string to datetime to be able to order the dates)
-    combined.sort(key=lambda x: datetime.strptime(x[0], "%Y-%m-%d"))
-    # Unzip data back into dict
-    trip.expenses['date'], trip.expenses['amount'] = map(list, zip(*combined))
-
-    # Update trip_info dict with new expense data
-    trip.update_trip_info()
+    with span("run.add_expenses.save"):
+        # Add/update expense amount (update if the date already exists),
+        # the ledger keeps the expenses ordered by date
+        update_amount = trip.add_expense(expense_date, int(amount_input))
 
-    # Save new trip info and expenses to worksheet
-    sheet_manager.update_worksheet(trip.trip_info, "trip_info")
-    sheet_manager.update_worksheet(trip.expenses, "expenses")
+        # Update trip_info dict with new expense data
+        trip.update_trip_info()
 
-    input(
+        # Save new trip info and expenses to worksheet in one batch request
+        save_trip(trip, sheet_manager, checkpoint)
+
+    timed_input(
             Style.BRIGHT +
             "\nPress ENTER to continue\n"
             )
 
     # Small pause + clear screen for better UX
-    time.sleep(1)
+    pause(1)
     clear()
 
     # Print confirmation to user
@@ -403,6 +596,7 @@ def add_expenses(trip, sheet_manager):
         print(f"🎉  Added new expense for {date_input} ({amount_input} €).\n")
 
 
+@timed("run.show_expenses_summary")
 def show_expenses_summary(trip):
     """
     Ask the user if they want to see a summary of all tracked expenses
@@ -422,7 +616,7 @@ def show_expenses_summary(trip):
             Style.BRIGHT +
             "Do you want to see a list of all currently tracked expenses?\n"
             )
-        yes_no_input = input(
+        yes_no_input = timed_input(
             Style.BRIGHT +
             "✏️  Enter your decision here (yes/no): "
             )
@@ -435,21 +629,21 @@ def show_expenses_summary(trip):
     # Display expenses
     if yes_no_input == "yes":
         print(Style.BRIGHT + "Here is a list of your current expenses:\n")
-        if len(trip.expenses["date"]) == 0:
+        if len(trip.ledger) == 0:
             print("⚠️  You haven't tracked any expenses yet.")
         else:
             print(f"{'Date':<15}{'Amount':>12}")
             print("-" * 27)
-            for date, amount in zip(trip.expenses["date"],
-                                    trip.expenses["amount"]):
-                print(f"{date:<15}{amount:>10} €")
+            for date, amount in trip.ledger.items():
+                print(f"{date.isoformat():<15}{amount:>10} €")
 
     else:
         # User chose not to view expenses
         print("Okay, let's move on.")
 
 
-def main():
+@timed("run.main")
+def main(sheet_manager=None, checkpoint=None, storage_setup=None):
     """
     Main function that runs the Wander Wallet application.
 
@@ -462,119 +656,177 @@ def main():
     - Ends the program with a summary and closing message if the trip hasn't
     started or after adding expenses.
 
-    No arguments or return values.
-    """
-    # Welcome Message
-    print(
-        "\nWelcome to Wander Wallet — Your Personal Travel Expense Tracker\n\n"
-        "This is a command-line app designed to help you manage your travel "
-        "budget\nwhile you're on your trip.\nYou can track expenses day by "
-        "day and get real-time updates on how your spending\naligns with "
-        "your budget.\n"
-        )
-    print(
-        "⏳  Checking if you have already started tracking "
-        "travel expenses with us ..."
-        )
+    The progress is recorded in `checkpoint`. If main is called again with
+    the same checkpoint after an error, it retries a failed save and picks
+    up at the step where the error happened, reusing the storage and the
+    data that was already loaded.
 
-    # Setup SheetManager
-    creds_file = "creds.json"
-    sheet_name = "wander_wallet"
-    sheet_manager = SheetManager(creds_file, sheet_name)
-
-    # Load trip data from worksheet
-    trip_info = sheet_manager.get_worksheet_dict("trip_info")
-    expenses = sheet_manager.get_worksheet_dict("expenses")
-
-    today = datetime.now().date()
+    Args:
+        sheet_manager (StorageBackend): Storage for the trip data. If not
+                                        given, it is set up by
+                                        `create_storage()`
+        checkpoint (SessionCheckpoint): Progress of the session, to resume
+                                        after an error
+        storage_setup (Future): Storage and trip data set up in the
+                                background by `setup_storage_in_background()`
+
+    No return value.
+    """
+    if checkpoint is None:
+        checkpoint = SessionCheckpoint()
 
-    # Check if a trip already exists
-    trip_exists_answer = trip_exists(trip_info)
-    if trip_exists_answer:
-        # Load existing trip
-        trip = Trip(trip_info, expenses)
+    if checkpoint.resumed:
+        print("⏳  Picking up where you left off ...\n")
+    else:
+        # Welcome Message
         print(
-            f"✅  Seems like you have been working on your trip "
-            f"'{trip.trip_name}' already."
+            "\nWelcome to Wander Wallet — Your Personal Travel Expense "
+            "Tracker\n\nThis is a command-line app designed to help you "
+            "manage your travel budget\nwhile you're on your trip.\nYou can "
+            "track expenses day by day and get real-time updates on how your "
+            "spending\naligns with your budget.\n"
             )
-        input(
-            Style.BRIGHT +
-            "\nPress ENTER to continue\n"
+        print(
+            "⏳  Checking if you have already started tracking "
+            "travel expenses with us ..."
             )
-        # Small pause + clear screen for better UX
-        time.sleep(1)
-        clear()
 
-        # Show trip summary
-        print(trip.summary())
-        # Check if user wants to see a list of all currently tracked expenses
-        show_expenses_summary(trip)
+    # Setup storage (Google Sheets unless configured otherwise), or keep
+    # the storage of the interrupted session
+    if sheet_manager is None:
+        with span("run.main.setup_storage"):
+            if checkpoint.storage is None and storage_setup is not None:
+                # Wait until the storage set up in the background is ready
+                sheet_manager, checkpoint.sheet_data = storage_setup.result()
+            else:
+                sheet_manager = checkpoint.storage or create_storage()
+    checkpoint.storage = sheet_manager
+
+    # Save the trip again if saving it failed before
+    checkpoint.retry_pending_write()
 
-        # Notify user if trip is already over
-        if trip.end_date < today:
-            print("\nSeems like your trip is already over!")
+    today = datetime.now().date()
+
+    if checkpoint.step == "start":
+        # Ask for the trip first if the storage holds many trips
+        if trip_choice_needed(sheet_manager):
+            choose_trip(sheet_manager)
+        # Load trip data from both worksheets in one request (only once)
+        if checkpoint.sheet_data is None:
+            with span("run.main.load_trip_data"):
+                checkpoint.sheet_data = sheet_manager.load_all()
+        trip_info = checkpoint.sheet_data["trip_info"]
+        expenses = checkpoint.sheet_data["expenses"]
+
+        # Check if a trip already exists
+        trip_exists_answer = trip_exists(trip_info)
+        if trip_exists_answer:
+            # Load existing trip
+            trip = Trip(trip_info, expenses)
             print(
-                "You can continue working on this trip, if you want to add "
-                "or update\ntrip expenses, or you can decide to start a new "
-                "trip."
+                f"✅  Seems like you have been working on your trip "
+                f"'{trip.trip_name}' already."
                 )
+            timed_input(
+                Style.BRIGHT +
+                "\nPress ENTER to continue\n"
+                )
+            # Small pause + clear screen for better UX
+            pause(1)
+            clear()
+
+            # Show trip summary
+            print(trip.summary())
+            # Check if user wants to see a list of all currently tracked
+            # expenses
+            show_expenses_summary(trip)
+
+            # Notify user if trip is already over
+            if trip.end_date < today:
+                print("\nSeems like your trip is already over!")
+                print(
+                    "You can continue working on this trip, if you want to "
+                    "add or update\ntrip expenses, or you can decide to start "
+                    "a new trip."
+                    )
 
-        # Ask if user wants to continue current trip
-        continue_trip_val = continue_trip()
-
-        # If user starts a new trip, delete old data and initialize new trip
-        if not continue_trip_val:
-            sheet_manager.del_worksheet_data("trip_info")
-            sheet_manager.del_worksheet_data("expenses")
-            # Set up new trip_info and expenses objects
-            trip_info = sheet_manager.get_worksheet_dict("trip_info")
-            expenses = sheet_manager.get_worksheet_dict("expenses")
-            # Start new trip
-            trip = start_new_trip(expenses, sheet_manager)
-    else:
-        # No existing trip, start a new one
-        trip = start_new_trip(expenses, sheet_manager)
-
-    # Check if the trip has already started,
-    # if not, end the program
-    # if the trip is already over, don't show anything
-    if trip.start_date > today:
-        print("🎉  Thank you for setting up your trip with Wander Wallet!\n")
-        print("Your trip hasn't started yet.")
-        print(
-            "Return to Wander Wallet once your trip starts and you want "
-            "to start\ntracking expenses!\n\n"
-            )
-        print("End of program")
-        return
-    elif trip.start_date <= today and today <= trip.end_date:
-        print(
-            f"Great! Your trip has already started "
-            f"({trip.start_date} - {trip.end_date})!\n"
-            f"Let's start adding some expenses.\n"
+            # Ask if user wants to continue current trip
+            if continue_trip():
+                checkpoint.reach("expenses", trip)
+            else:
+                # If user starts a new trip, delete old data
+                # Wait until earlier changes are saved before deleting
+                sheet_manager.flush()
+                sheet_manager.del_worksheet_data("trip_info")
+                sheet_manager.del_worksheet_data("expenses")
+                checkpoint.reach("new_trip")
+        else:
+            # No existing trip, start a new one
+            checkpoint.reach("new_trip")
+
+    if checkpoint.step == "new_trip":
+        # Set up new expenses object
+        # (only headers are left, so there is no need to read them again)
+        expenses = sheet_manager.get_worksheet_dict(
+            "expenses", refresh=False
             )
+        # Start new trip (continues with the expenses, see start_new_trip)
+        start_new_trip(expenses, sheet_manager, checkpoint)
+
+    trip = checkpoint.trip
+
+    if checkpoint.step == "expenses":
+        # Check if the trip has already started,
+        # if not, end the program
+        # if the trip is already over, don't show anything
+        if trip.start_date > today:
+            # Make sure the new trip is saved before the program ends
+            sheet_manager.flush()
+            print(
+                "🎉  Thank you for setting up your trip with Wander Wallet!\n"
+                )
+            print("Your trip hasn't started yet.")
+            print(
+                "Return to Wander Wallet once your trip starts and you want "
+                "to start\ntracking expenses!\n\n"
+                )
+            print("End of program")
+            return
+        elif trip.start_date <= today and today <= trip.end_date:
+            print(
+                f"Great! Your trip has already started "
+                f"({trip.start_date} - {trip.end_date})!\n"
+                f"Let's start adding some expenses.\n"
+                )
 
-    # Get new expense from user and check if they want to add another one
-    get_new_expense(trip, sheet_manager)
+        # Get new expense from user and check if they want to add another
+        # one
+        get_new_expense(trip, sheet_manager, checkpoint)
+        checkpoint.reach("summary")
+
+        # Continue when user finished adding expenses
+        # Small pause + clear screen for better UX
+        pause(2)
+        clear()
 
-    # Continue when user finished adding expenses
-    # Small pause + clear screen for better UX
-    time.sleep(2)
-    clear()
     # Check if user wants to see a list of all currently tracked expenses
     show_expenses_summary(trip)
 
     # Add an empty input forcing the app to pause before showing the
     # summary in the next step
-    input(
+    timed_input(
         Style.BRIGHT +
         "\nPress ENTER to continue to your trip summary and "
         "end the program\n"
         )
     # Small pause + clear screen for better UX
-    time.sleep(1)
+    pause(1)
     clear()
 
+    # Make sure all expenses are saved before the program ends
+    with span("run.main.flush"):
+        sheet_manager.flush()
+
     # Show trip summary and then end the program
     print(trip.summary())
     print("\n🎉  Thank you for using Wander Wallet!\n")
@@ -587,26 +839,121 @@ def main():
     return
 
 
-"""
-Entry point for the Wander Wallet application.
+def watch_exit_signals():
+    """
+    Wait for a signal that ends the session and end the app like a normal
+    exit: the exit handlers still save pending changes (e.g. the
+    write-behind store flushes its queue).
+
+    Runs in a thread of its own, with the signals blocked in all other
+    threads. A Python signal handler would only run in the main thread,
+    and not at all while it waits for input if the signal arrives just
+    before the prompt starts reading.
+    """
+    signum = signal.sigwait(EXIT_SIGNALS)
+    atexit._run_exitfuncs()
+    sys.stdout.flush()
+    os._exit(128 + signum)
+
+
+def try_again() -> bool:
+    """
+    Ask the user whether to try again after repeated errors.
+
+    Returns:
+        bool: True if the user wants to try again, False to end the
+              program (also if no more input can be read)
+    """
+    while True:
+        print(
+            Style.BRIGHT +
+            "\nThe same problem keeps happening. Do you want to try again?"
+            )
+        try:
+            yes_no_input = timed_input(
+                Style.BRIGHT +
+                "\n✏️  Enter your decision here (yes/no): "
+                )
+        except EOFError:
+            return False
+
+        # Validate input
+        if yes_no_input_valid(yes_no_input):
+            return yes_no_input.lower() == "yes"
+
+
+def run_app():
+    """
+    Run the app in the current terminal. After an unexpected error, the
+    main program is run again and picks up where it left off.
+
+    Used when run.py is launched directly and by the session server, which
+    runs one app session per terminal connection.
+
+    No return value.
+    """
+    # Save pending changes before ending if the terminal is closed. The
+    # threads started from here on inherit the blocked signals
+    signal.pthread_sigmask(signal.SIG_BLOCK, EXIT_SIGNALS)
+    threading.Thread(target=watch_exit_signals, daemon=True).start()
+
+    # In fast mode, connect to the storage while the welcome screen is shown
+    storage_setup = setup_storage_in_background() if FAST_MODE else None
 
-This ensures that the main program loop runs only when this file is executed
-directly, not when it is imported as a module elsewhere.
-"""
-# Run main loop only if the script is launched directly
-if __name__ == "__main__":
     # Clear console to remove startup output for cleaner UX
     clear()
 
+    # Progress of the session, kept across restarts after errors
+    checkpoint = SessionCheckpoint()
+    # Errors in a row at the same step of the session
+    n_errors = 0
+    error_step = None
+
     # Run the main program loop with automatic restart on unexpected errors
     while True:
         try:
-            main()
+            main(checkpoint=checkpoint, storage_setup=storage_setup)
             # Exit loop if main function finishes without error
             break
         except Exception as e:
+            # Set up the storage again (if needed) after an error
+            storage_setup = None
             print(Fore.RED + Style.NORMAL + "\nAn unexpected error occurred.")
             print(Fore.RED + Style.NORMAL + f"Details: {e}\n")
-            print(Fore.RED + Style.NORMAL + "We will restart the app for you.")
-            # Restart app if main function throws an unhandled error
+
+            # Only count errors that happen again without any progress
+            if checkpoint.step != error_step:
+                n_errors = 0
+                error_step = checkpoint.step
+            n_errors += 1
+            if n_errors > MAX_RESTARTS:
+                if not try_again():
+                    print("\nEnd of program")
+                    break
+                n_errors = 1
+
+            print(
+                Fore.RED + Style.NORMAL + "We will pick up where you left off."
+                )
+            # Wait a bit longer after every error, e.g. until the
+            # connection is back
+            time.sleep(RESTART_DELAY * 2 ** (n_errors - 1))
+            # Resume app if main function throws an unhandled error
             continue
+
+
+"""
+Entry point for the Wander Wallet application.
+
+This ensures that the main program loop runs only when this file is executed
+directly, not when it is imported as a module elsewhere.
+
+`python run.py import <file>` imports expenses from a file instead of
+running the interactive app (see bulk_import.py).
+"""
+# Run main loop only if the script is launched directly
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["import"]:
+        from bulk_import import import_main
+        sys.exit(import_main(sys.argv[2:], create_storage))
+    run_app()
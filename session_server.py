@@ -0,0 +1,315 @@
+import atexit
+import fcntl
+import os
+import pty
+import selectors
+import signal
+import socket
+import struct
+import sys
+import termios
+import time
+import colorama
+import run
+from metrics import METRICS
+from request_scheduler import ScheduledHTTPClient
+from sheet_manager import get_client
+
+# Terminal size of every session (same as the terminal in the browser)
+TERMINAL_COLS = 80
+TERMINAL_ROWS = 24
+# Max. number of bytes relayed between a connection and its terminal at once
+CHUNK_SIZE = 4096
+# Seconds a session gets to end on its own after its connection was closed
+# (e.g. to save pending changes) before its process is killed
+EXIT_GRACE_PERIOD = 10.0
+
+
+class SessionServer:
+    """
+    Long-lived server that runs one Wander Wallet session per connection.
+
+    Starting a new Python process for every terminal session means paying
+    for the interpreter startup, the imports (colorama, gspread,
+    google-auth) and the authorization with Google again and again. The
+    server does all of that once: it imports the app, authorizes the
+    gspread client and fetches its access token, and then forks a session
+    for every connection that comes in on a Unix socket. The forked
+    sessions share the warm imports and the authorized client, and each
+    one runs the app in its own pseudo terminal, exactly like
+    `python3 run.py`.
+
+    The server process relays the bytes between all connections and their
+    terminals in a single event loop, so a session only costs one forked
+    process instead of a new interpreter. The Sheets API quota is shared
+    by all sessions (see TokenBucket.share).
+
+    When a connection is closed, its session gets a SIGHUP, so the app can
+    still save pending changes, and is only killed if it hasn't ended
+    after EXIT_GRACE_PERIOD. The server keeps serving the other sessions
+    in the meantime.
+
+    Attributes:
+        address (str): Path of the Unix socket the server listens on
+        creds_file (str): Credentials file of the shared gspread client
+        sessions (dict): Connection socket -> (session pid, terminal fd)
+        ending (dict): Terminal fd -> (pid, deadline) of the sessions that
+                       were asked to end, but haven't ended yet
+    """
+    def __init__(self, address: str, creds_file: str = "creds.json"):
+        self.address = address
+        self.creds_file = creds_file
+        self.client = None
+        self.listener = None
+        self.selector = selectors.DefaultSelector()
+        self.sessions = {}
+        self.ending = {}
+
+    def warm_up(self):
+        """
+        Authorize the shared gspread client and fetch its access token, so
+        the sessions don't have to. Only needed for Google Sheets storage.
+        """
+        if os.environ.get("WANDER_WALLET_STORAGE", "sheets") != "sheets":
+            return
+        if not os.path.exists(self.creds_file):
+            print(f"{self.creds_file} not found, sessions will authorize "
+                  f"on their own.")
+            return
+        self.client = get_client(self.creds_file)
+        self.refresh_token()
+
+    def refresh_token(self):
+        """
+        Fetch a new access token for the shared client if the current one
+        has expired (or is about to), so the sessions start with a valid
+        token.
+        """
+        if self.client is None:
+            return
+        # Imported here, as it is only needed for Google Sheets storage
+        from google.auth.transport.requests import Request
+        creds = self.client.http_client.auth
+        if not creds.valid:
+            try:
+                creds.refresh(Request())
+            except Exception as e:
+                # The sessions will try again when they access the sheet
+                print(f"Could not refresh the access token: {e}")
+
+    def listen(self):
+        """
+        Open the Unix socket and wait for connections.
+        """
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.address)
+        self.listener.listen()
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        print(f"Wander Wallet session server listening on {self.address}")
+
+    def serve_forever(self):
+        """
+        Accept connections and relay data until the server is stopped.
+        """
+        self.warm_up()
+        # All sessions use the same Google account, so they have to share
+        # its quota instead of each one pacing itself to the full quota
+        ScheduledHTTPClient.scheduler.share()
+        self.listen()
+        try:
+            while True:
+                self.serve_once()
+        finally:
+            self.selector.unregister(self.listener)
+            self.listener.close()
+            os.unlink(self.address)
+            for conn in list(self.sessions):
+                self.close_session(conn)
+            # Let the sessions save their changes before the server ends
+            while self.ending:
+                self.serve_once()
+
+    def serve_once(self):
+        """
+        Wait for connections and data (or the end of a grace period) and
+        handle them.
+        """
+        timeout = None
+        if self.ending:
+            deadline = min(deadline for _, deadline in self.ending.values())
+            timeout = max(0, deadline - time.monotonic())
+        for key, _ in self.selector.select(timeout):
+            if key.fileobj is self.listener:
+                self.accept()
+            elif key.fileobj in self.sessions:
+                self.relay_input(key.fileobj)
+            elif key.data in self.sessions:
+                self.relay_output(key.fileobj, key.data)
+            elif key.fileobj in self.ending:
+                self.drain_output(key.fileobj)
+            # Otherwise the session was closed in this loop already
+        now = time.monotonic()
+        for fd, (pid, deadline) in list(self.ending.items()):
+            if now >= deadline:
+                self.kill_session(fd)
+
+    def accept(self):
+        """
+        Accept a connection and start a session for it.
+        """
+        conn, _ = self.listener.accept()
+        self.refresh_token()
+        # Don't let the session inherit (and print again) buffered output
+        sys.stdout.flush()
+        pid, fd = pty.fork()
+        if pid == 0:
+            # Forked session: the pseudo terminal is stdin/stdout/stderr
+            self.run_session()
+        # Same terminal size as node-pty used for `python3 run.py`
+        fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack(
+            "HHHH", TERMINAL_ROWS, TERMINAL_COLS, 0, 0
+            ))
+        conn.setblocking(False)
+        self.sessions[conn] = (pid, fd)
+        self.selector.register(conn, selectors.EVENT_READ)
+        self.selector.register(fd, selectors.EVENT_READ, conn)
+
+    def run_session(self):
+        """
+        Run the app in a forked session and end the process afterwards.
+        Never returns.
+        """
+        exit_code = 0
+        try:
+            # The session doesn't serve any connections itself
+            self.selector.close()
+            self.listener.close()
+            for conn, (_, fd) in self.sessions.items():
+                conn.close()
+                os.close(fd)
+            for fd in self.ending:
+                os.close(fd)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            os.environ["TERM"] = "xterm-color"
+            # Colorama decided whether to keep the colors when the server
+            # was started (without a terminal), so wrap the terminal again
+            for stream in (sys.__stdout__, sys.__stderr__):
+                stream.reconfigure(line_buffering=True)
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+            colorama.init(autoreset=True)
+            # Record the metrics of this session only, not the server's
+            METRICS.reset()
+            run.run_app()
+        except BaseException:
+            exit_code = 1
+        finally:
+            # Run exit handlers of the session (e.g. syncing a local store)
+            # and end the process without running the server's cleanup
+            atexit._run_exitfuncs()
+            sys.stdout.flush()
+            os._exit(exit_code)
+
+    def relay_input(self, conn):
+        """
+        Send data received from a connection to its terminal.
+        """
+        try:
+            data = conn.recv(CHUNK_SIZE)
+        except ConnectionError:
+            data = b""
+        if not data:
+            # Connection closed, end the session
+            self.close_session(conn)
+            return
+        os.write(self.sessions[conn][1], data)
+
+    def relay_output(self, fd, conn):
+        """
+        Send terminal output of a session to its connection.
+        """
+        try:
+            data = os.read(fd, CHUNK_SIZE)
+        except OSError:
+            # The terminal is closed when the session has ended
+            data = b""
+        if not data:
+            self.close_session(conn)
+            return
+        try:
+            conn.setblocking(True)
+            conn.sendall(data)
+            conn.setblocking(False)
+        except ConnectionError:
+            self.close_session(conn)
+
+    def close_session(self, conn):
+        """
+        End a session: close its connection and ask its process to end
+        (SIGHUP, like closing a terminal). Its terminal stays open until
+        the process has ended, see `drain_output()` and `kill_session()`.
+        """
+        pid, fd = self.sessions.pop(conn)
+        self.selector.unregister(conn)
+        conn.close()
+        self.ending[fd] = (pid, time.monotonic() + EXIT_GRACE_PERIOD)
+        # The process may have ended already (e.g. the user quit the app)
+        if os.waitpid(pid, os.WNOHANG) != (0, 0):
+            self.end_session(fd)
+            return
+        self.selector.modify(fd, selectors.EVENT_READ)
+        os.kill(pid, signal.SIGHUP)
+
+    def drain_output(self, fd):
+        """
+        Discard the terminal output of an ending session, so it doesn't
+        block writing to its terminal while it saves its changes.
+        """
+        try:
+            data = os.read(fd, CHUNK_SIZE)
+        except OSError:
+            # The terminal is closed when the session has ended
+            data = b""
+        if not data:
+            os.waitpid(self.ending[fd][0], 0)
+            self.end_session(fd)
+
+    def kill_session(self, fd):
+        """
+        Kill a session that didn't end within the grace period.
+        """
+        pid, _ = self.ending[fd]
+        print(f"Session {pid} didn't end, killing it")
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        self.end_session(fd)
+
+    def end_session(self, fd):
+        """
+        Close the terminal of a session whose process has ended.
+        """
+        del self.ending[fd]
+        self.selector.unregister(fd)
+        os.close(fd)
+
+
+"""
+Entry point for the session server.
+
+Usage: python3 session_server.py [socket path]
+The socket path defaults to the WANDER_WALLET_SERVER environment variable.
+"""
+if __name__ == "__main__":
+    address = (
+        sys.argv[1] if len(sys.argv) > 1
+        else os.environ.get("WANDER_WALLET_SERVER", "wander_wallet.sock")
+        )
+    # Stop cleanly (removing the socket file) when the dyno is stopped
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    try:
+        SessionServer(address).serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -1,18 +1,98 @@
+import os
 import gspread
+from gspread.utils import (
+    a1_to_rowcol,
+    absolute_range_name,
+    extract_id_from_url,
+    rowcol_to_a1
+)
+from google.auth.credentials import AnonymousCredentials
 from google.oauth2.service_account import Credentials
+from metrics import instrument_class
+from request_scheduler import LocalAPIHTTPClient, ScheduledHTTPClient
+from storage import (
+    FullSaveRequired,
+    WORKSHEET_HEADERS,
+    WORKSHEET_NAMES,
+    check_trip_id,
+    data_to_rows,
+    sheet_list_to_dict
+)
 
+# Worksheet that lists all trips if the spreadsheet holds several trips
+TRIP_INDEX = "trips"
 
-class SheetManager:
+# Authorized gspread clients by credentials file. They are kept for the
+# whole process, so a restart of the app reuses the client and its access
+# token instead of authorizing again
+CLIENTS = {}
+# Spreadsheet keys by spreadsheet name, so a spreadsheet only has to be
+# searched by name once per process
+SHEET_KEYS = {}
+
+
+class TripSpreadsheet(gspread.Spreadsheet):
     """
-    Manages interaction with a Google Spreadsheet.
+    gspread Spreadsheet that only requests the spreadsheet properties when
+    it is opened. gspread requests the properties of all worksheets, and
+    there is one worksheet per trip. SheetManager fetches the properties
+    of the worksheets it needs itself (see fetch_sheet_metadata).
+    """
+    def __init__(self, http_client, properties: dict):
+        self.client = http_client
+        self._properties = properties
+        metadata = self.fetch_sheet_metadata(params={
+            "includeGridData": "false", "fields": "properties"
+            })
+        self._properties.update(metadata["properties"])
 
-    This class handles authentication with the Google Sheets API and provides
-    methods to:
-    - Retrieve worksheet data as a dictionary
-    - Delete all worksheet data except headers
-    - Update worksheets with new trip or expense data
+
+class TripClient(gspread.Client):
+    """
+    gspread Client that opens spreadsheets as TripSpreadsheet.
     """
-    def __init__(self, creds_file: str, sheet_name: str):
+    def open(self, title: str, folder_id: str = None) -> TripSpreadsheet:
+        """
+        Open the first spreadsheet with the given name, like
+        gspread.Client.open.
+        """
+        for properties in self.list_spreadsheet_files(title, folder_id):
+            if properties["name"] == title:
+                # Drive calls the title "name"
+                properties["title"] = properties["name"]
+                return TripSpreadsheet(self.http_client, properties)
+        raise gspread.SpreadsheetNotFound(title)
+
+    def open_by_key(self, key: str) -> TripSpreadsheet:
+        """
+        Open a spreadsheet by its key, like gspread.Client.open_by_key.
+        """
+        try:
+            return TripSpreadsheet(self.http_client, {"id": key})
+        except gspread.exceptions.APIError as e:
+            if e.response.status_code == 404:
+                raise gspread.SpreadsheetNotFound(e.response) from e
+            if e.response.status_code == 403:
+                raise PermissionError from e
+            raise
+
+
+def get_client(creds_file: str):
+    """
+    Return an authorized gspread client for a credentials file, creating
+    it only on first use.
+
+    If WANDER_WALLET_API_URL is set, the client talks to a stand-in for
+    the Google APIs at that URL instead (e.g. fake_sheets_server.py), and
+    no credentials are needed.
+    """
+    api_url = os.environ.get("WANDER_WALLET_API_URL")
+    if api_url and creds_file not in CLIENTS:
+        LocalAPIHTTPClient.base_url = api_url.rstrip("/")
+        CLIENTS[creds_file] = TripClient(
+            AnonymousCredentials(), http_client=LocalAPIHTTPClient
+            )
+    if creds_file not in CLIENTS:
         # Define the scope of access for the Google Sheets API
         SCOPE = [
             "https://www.googleapis.com/auth/spreadsheets",
@@ -23,74 +103,876 @@ class SheetManager:
         CREDS = Credentials.from_service_account_file(creds_file)
         # Apply scope permissions to credentials
         SCOPED_CREDS = CREDS.with_scopes(SCOPE)
-        # Authorize gspread client with the scoped credentials
-        self.client = gspread.authorize(SCOPED_CREDS)
-        # Open the Google Spreadsheet by name
-        self.sheet = self.client.open(sheet_name)
+        # Authorize gspread client with the scoped credentials. Requests
+        # are paced to stay within the quota and retried if they fail
+        CLIENTS[creds_file] = TripClient(
+            SCOPED_CREDS, http_client=ScheduledHTTPClient
+            )
+    return CLIENTS[creds_file]
+
+
+def diff_rows(old_rows: list, new_rows: list):
+    """
+    Compare the data rows currently stored in a worksheet with new rows.
+
+    Values are compared as strings, because the worksheet returns every
+    value as a string (e.g. 12 is read back as "12").
+
+    Returns:
+        tuple | None: (start, changed, appended), where `changed` is a
+        block of rows that overwrites the existing data rows from index
+        `start` onwards and `appended` holds the rows to add after the last
+        data row. None if rows would have to be removed, which requires a
+        full rewrite of the worksheet.
+    """
+    if len(new_rows) < len(old_rows):
+        return None
+
+    # Find the first and last existing row that differ from the new data
+    changed_idx = [
+        i for i, old_row in enumerate(old_rows)
+        if [str(value) for value in old_row] !=
+        [str(value) for value in new_rows[i]]
+        ]
+    if changed_idx:
+        start = changed_idx[0]
+        changed = new_rows[start:changed_idx[-1] + 1]
+    else:
+        start = len(old_rows)
+        changed = []
+
+    appended = new_rows[len(old_rows):]
+    return start, changed, appended
+
+
+def rows_to_row_data(rows: list) -> list:
+    """
+    Convert rows of values into the RowData format of the Sheets API.
+    Numbers are stored as numbers and everything else as strings, which
+    matches how gspread writes raw values.
+    """
+    row_data = []
+    for row in rows:
+        cells = []
+        for value in row:
+            if isinstance(value, (int, float)):
+                cells.append({"userEnteredValue": {"numberValue": value}})
+            else:
+                cells.append({"userEnteredValue": {"stringValue": str(value)}})
+        row_data.append({"values": cells})
+    return row_data
+
+
+def update_cells_request(sheet_id: int, row_index: int, column_index: int,
+                         rows: list) -> dict:
+    """
+    Return a batchUpdate request that overwrites cells with rows of values,
+    starting at the given (0-based) grid indexes.
+    """
+    return {
+        "updateCells": {
+            "start": {
+                "sheetId": sheet_id,
+                "rowIndex": row_index,
+                "columnIndex": column_index,
+            },
+            "rows": rows_to_row_data(rows),
+            "fields": "userEnteredValue",
+        }
+    }
+
+
+def append_cells_request(sheet_id: int, rows: list) -> dict:
+    """
+    Return a batchUpdate request that adds rows of values after the last
+    row with data.
+    """
+    return {
+        "appendCells": {
+            "sheetId": sheet_id,
+            "rows": rows_to_row_data(rows),
+            "fields": "userEnteredValue",
+        }
+    }
+
+
+class SheetManager:
+    """
+    Manages interaction with a Google Spreadsheet.
 
-    def get_worksheet_dict(self, worksheet_name: str) -> dict:
+    This class handles authentication with the Google Sheets API and provides
+    methods to:
+    - Retrieve worksheet data as a dictionary
+    - Delete all worksheet data except headers
+    - Update worksheets with new trip or expense data
+    - Save trip info and expenses together in one batch request
+
+    The last known data rows of each worksheet are kept in memory, so that
+    updates only send the rows or cells that actually changed. Once the
+    expenses of a trip have been saved, later commits of the same trip
+    only send the changes logged by its expense ledger, without comparing
+    all rows again. Worksheet
+    objects and their row counts are cached as well, so the spreadsheet
+    metadata is only fetched once instead of before every read or write.
+
+    The spreadsheet is opened on first use. If its key is known (given as
+    `sheet_key`, as a spreadsheet URL or found by an earlier search by
+    name), it is opened directly instead of searching Google Drive by name.
+
+    Without a `trip_id`, the spreadsheet holds a single trip in the
+    "trip_info" and "expenses" worksheets. With a `trip_id`, it can hold
+    many trips: each trip has one row in the "trips" index worksheet
+    (trip_id + trip details) and its own "expenses_<trip_id>" worksheet,
+    and only the rows of that trip are read.
+    """
+    def __init__(self, creds_file: str, sheet_name: str,
+                 sheet_key: str = None, trip_id: str = None):
+        self.client = get_client(creds_file)
+        self.sheet_name = sheet_name
+        # Accept the spreadsheet URL as well as the key itself
+        if sheet_key and sheet_key.startswith("https://"):
+            sheet_key = extract_id_from_url(sheet_key)
+        self.sheet_key = sheet_key or SHEET_KEYS.get(sheet_name)
+        self._sheet = None
+        self.trip_id = check_trip_id(trip_id)
+        # Row of each trip in the trip index, read on first use
+        self.trip_rows = None
+        # Header row and data rows as currently stored in each worksheet
+        self.headers = {}
+        self.known_rows = {}
+        # (ledger, version) whose expenses are stored in the expenses
+        # worksheet row by row, or None if unknown
+        self.synced = None
+        # Cached worksheet objects and grid row counts by worksheet title
+        self.worksheets = {}
+        self.row_counts = {}
+
+    @property
+    def sheet(self):
         """
-        Retrieve all data from a worksheet and return it as a dictionary.
+        The Google Spreadsheet, opened on first use.
+        """
+        if self._sheet is None:
+            if self.sheet_key:
+                # Open the Google Spreadsheet by key
+                self._sheet = self.client.open_by_key(self.sheet_key)
+            else:
+                # Open the Google Spreadsheet by name and remember its key
+                self._sheet = self.client.open(self.sheet_name)
+                self.sheet_key = self._sheet.id
+                SHEET_KEYS[self.sheet_name] = self.sheet_key
+        return self._sheet
+
+    def fetch_sheet_metadata(self, titles: list = None):
+        """
+        Load worksheet objects and their row counts with a single metadata
+        request, e.g. once at startup.
+
+        Only the properties of the given worksheets (by default the
+        worksheets of the trip) are requested, so the request stays small
+        however many trips the spreadsheet holds. The API rejects the
+        request if one of the worksheets doesn't exist, the others are
+        then requested one by one and missing worksheets are skipped.
+        """
+        if titles is None:
+            titles = [self.worksheet_title(name) for name in WORKSHEET_NAMES]
+        titles = list(dict.fromkeys(titles))
+        try:
+            metadata = self.sheet.fetch_sheet_metadata(params={
+                "includeGridData": "false",
+                "ranges": [absolute_range_name(title) for title in titles],
+                "fields": "sheets.properties",
+                })
+        except gspread.exceptions.APIError as e:
+            # Invalid range, i.e. a worksheet is missing
+            if e.code != 400:
+                raise
+            if len(titles) > 1:
+                for title in titles:
+                    self.fetch_sheet_metadata([title])
+            return
+
+        for properties in metadata.get("sheets", []):
+            sheet = gspread.Worksheet(
+                self.sheet, properties["properties"], self.sheet.id,
+                self.sheet.client
+                )
+            self.worksheets[sheet.title] = sheet
+            self.row_counts[sheet.title] = sheet.row_count
+
+    def get_worksheet(self, title: str):
+        """
+        Return a worksheet object, fetching the metadata of the worksheet
+        (and of the other worksheets of the trip) from the API only if it
+        is not cached yet.
+        """
+        if title not in self.worksheets and self.trip_id is not None:
+            # Creates the worksheets of the trip if it is new
+            self.get_trip_row()
+        if title not in self.worksheets:
+            self.fetch_sheet_metadata([
+                self.worksheet_title(name) for name in WORKSHEET_NAMES
+                ] + [title])
+        if title not in self.worksheets:
+            raise gspread.WorksheetNotFound(title)
+        return self.worksheets[title]
+
+    def invalidate_worksheet(self, title: str = None):
+        """
+        Forget the cached worksheet object and row count of a worksheet
+        (or of all worksheets if no title is given), e.g. after the
+        spreadsheet structure has been changed outside of this class.
+        """
+        if title is None:
+            self.worksheets.clear()
+            self.row_counts.clear()
+            self.synced = None
+        else:
+            self.worksheets.pop(title, None)
+            self.row_counts.pop(title, None)
+
+    def track_appended_rows(self, title: str, n_data_rows: int):
+        """
+        Update the cached row count after rows have been appended.
+        Appending only adds grid rows if the data doesn't fit into the
+        existing rows below the header.
+        """
+        if title in self.row_counts:
+            self.row_counts[title] = max(
+                self.row_counts[title], n_data_rows + 1
+                )
+
+    def is_synced(self, ledger) -> bool:
+        """
+        True if the expenses worksheet holds the expenses of the ledger as
+        of its last save, so committing the ledger only has to send the
+        changes since then.
+        """
+        return self.synced is not None and self.synced[0] is ledger
+
+    # Multi-trip support: map worksheet names to the spreadsheet layout
+
+    def is_index_row(self, worksheet_name: str) -> bool:
+        """
+        True if the data is the trip's row in the trip index worksheet.
         """
-        # Open the specific worksheet by name
-        sheet = self.sheet.worksheet(worksheet_name)
-        sheet_list = sheet.get_all_values()
+        return self.trip_id is not None and worksheet_name == "trip_info"
 
+    def worksheet_title(self, worksheet_name: str) -> str:
+        """
+        Return the title of the worksheet that holds the data of a trip
+        worksheet ("trip_info" or "expenses").
+        """
+        if self.trip_id is None:
+            return worksheet_name
         if worksheet_name == "trip_info":
-            # If trip_info worksheet has exactly one row of data
-            if len(sheet_list) == 2:
-                keys, values = sheet_list
-                sheet_dict = dict(zip(keys, values))
-            else:
-                # Only headers exist: initialize dict with empty strings
-                sheet_dict = dict.fromkeys(sheet_list[0], "")
-
-        else:  # "expenses"
-            # Extract column headers ['date', 'amount']
-            keys = sheet_list[0]
-            # Extract all data rows
-            # e.g. [['2025-08-20', '12'], ['2025-08-21', '34']]
-            rows = sheet_list[1:]
-            # Create dict with list comprehensions
-            sheet_dict = {
-                key: [row[i] for row in rows] for i, key in enumerate(keys)
+            return TRIP_INDEX
+        return f"expenses_{self.trip_id}"
+
+    def data_start(self, worksheet_name: str) -> tuple:
+        """
+        Return the row and column (1-based) of the first data cell.
+        The trip index has the trip_id in the first column.
+        """
+        if self.is_index_row(worksheet_name):
+            return self.get_trip_row(), 2
+        return 2, 1
+
+    def get_trip_row(self) -> int:
+        """
+        Return the row of the trip in the trip index worksheet.
+
+        The trip ids are read once (one column of the index), so finding a
+        trip stays a single small request even with thousands of trips.
+        A trip that is not in the index yet is added, together with its
+        expenses worksheet.
+        """
+        if self.trip_rows is None:
+            try:
+                response = self.sheet.values_get(
+                    absolute_range_name(TRIP_INDEX, "A:A")
+                    )
+            except gspread.exceptions.APIError:
+                # The trip index doesn't exist yet if this is the first trip
+                self.fetch_sheet_metadata()
+                if TRIP_INDEX in self.worksheets:
+                    raise
+                response = {}
+            self.trip_rows = {
+                row[0]: i + 1
+                for i, row in enumerate(response.get("values", [])) if row
                 }
 
-        return sheet_dict
+        if self.trip_id not in self.trip_rows:
+            self.create_trip()
+        return self.trip_rows[self.trip_id]
+
+    def list_trips(self) -> dict:
+        """
+        Return the trips in the trip index as trip_id -> trip name ("" if
+        the trip has no data yet), read with one request (the trip_id and
+        trip_name columns). The rows of the trips are remembered, so
+        selecting one of them doesn't read the index again.
+        """
+        try:
+            response = self.sheet.values_get(
+                absolute_range_name(TRIP_INDEX, "A2:B")
+                )
+        except gspread.exceptions.APIError:
+            # There is no trip index before the first trip is set up
+            self.fetch_sheet_metadata([TRIP_INDEX])
+            if TRIP_INDEX in self.worksheets:
+                raise
+            response = {}
+        rows = response.get("values", [])
+        self.trip_rows = {row[0]: i + 2 for i, row in enumerate(rows) if row}
+        return {row[0]: (row[1:] or [""])[0] for row in rows if row}
+
+    def select_trip(self, trip_id: str):
+        """
+        Work on another trip of the spreadsheet. The rows read from the
+        worksheets of the previous trip are forgotten, the cached
+        worksheet objects stay valid.
+        """
+        self.trip_id = check_trip_id(trip_id)
+        self.headers = {}
+        self.known_rows = {}
+        self.synced = None
+
+    def create_trip(self):
+        """
+        Add the trip to the trip index and create its expenses worksheet.
+        """
+        print(f"⏳  Setting up trip '{self.trip_id}'...\n")
+        new_sheets = [
+            (TRIP_INDEX, ["trip_id"] + WORKSHEET_HEADERS["trip_info"]),
+            (self.worksheet_title("expenses"), WORKSHEET_HEADERS["expenses"]),
+            ]
+        # Check which of the worksheets exist already
+        missing = [
+            title for title, _ in new_sheets if title not in self.worksheets
+            ]
+        if missing:
+            self.fetch_sheet_metadata(missing)
+        for title, header in new_sheets:
+            if title not in self.worksheets:
+                sheet = self.sheet.add_worksheet(
+                    title, rows=1, cols=len(header)
+                    )
+                sheet.append_row(header)
+                self.worksheets[title] = sheet
+                self.row_counts[title] = 1
+
+        # The API returns the range the trip_id was written to,
+        # e.g. "trips!A5:A5"
+        response = self.sheet.values_append(
+            absolute_range_name(TRIP_INDEX, "A:A"),
+            params={"valueInputOption": "RAW"},
+            body={"values": [[self.trip_id]]},
+            )
+        updated_range = response["updates"]["updatedRange"]
+        self.trip_rows[self.trip_id] = a1_to_rowcol(
+            updated_range.split("!")[-1].split(":")[0]
+            )[0]
+
+    def read_ranges(self, worksheet_name: str) -> list:
+        """
+        Return the A1 ranges to read for a trip worksheet.
+        """
+        title = self.worksheet_title(worksheet_name)
+        if self.trip_id is not None:
+            # Creates the worksheets of the trip if it is new
+            trip_row = self.get_trip_row()
+        if self.is_index_row(worksheet_name):
+            return [
+                absolute_range_name(title, "1:1"),
+                absolute_range_name(title, f"{trip_row}:{trip_row}"),
+                ]
+        return [absolute_range_name(title)]
+
+    def remember_sheet_list(self, sheet_list: list, worksheet_name: str):
+        """
+        Keep the header and data rows that were read from a worksheet.
+        """
+        width = len(sheet_list[0])
+        self.headers[worksheet_name] = list(sheet_list[0])
+        # Pad rows whose trailing cells are empty to the full width
+        self.known_rows[worksheet_name] = [
+            list(row) + [""] * (width - len(row)) for row in sheet_list[1:]
+            ]
+        if self.is_index_row(worksheet_name):
+            # A trip without data only has its trip_id in the index
+            self.known_rows[worksheet_name] = [
+                row for row in self.known_rows[worksheet_name]
+                if any(value != "" for value in row)
+                ]
+
+    def read_worksheets(self, worksheet_names: list) -> dict:
+        """
+        Retrieve the data of the given trip worksheets with a single
+        values:batchGet request.
+
+        Returns:
+            dict: Worksheet name -> dictionary as returned by
+            get_worksheet_dict
+        """
+        ranges = {name: self.read_ranges(name) for name in worksheet_names}
+        response = self.sheet.values_batch_get(
+            [a1_range for name in worksheet_names for a1_range in ranges[name]]
+            )
+        return self.remember_value_ranges(worksheet_names, ranges, response)
+
+    def remember_value_ranges(self, worksheet_names: list, ranges: dict,
+                              response: dict) -> dict:
+        """
+        Keep the worksheet content of a values:batchGet response and turn
+        it into dictionaries.
+
+        Args:
+            worksheet_names (list): Trip worksheets that were read
+            ranges (dict): Worksheet name -> ranges read (see read_ranges)
+            response (dict): Response of the values:batchGet request
+
+        Returns:
+            dict: Worksheet name -> dictionary as returned by
+            get_worksheet_dict
+        """
+        value_ranges = iter(response["valueRanges"])
+
+        sheet_dicts = {}
+        for worksheet_name in worksheet_names:
+            values = [
+                next(value_ranges).get("values", [])
+                for _ in ranges[worksheet_name]
+                ]
+            if self.is_index_row(worksheet_name):
+                # Header row and trip row, without the trip_id column
+                sheet_list = [
+                    row[1:] for rows in values for row in rows[:1]
+                    ]
+            else:
+                sheet_list = values[0]
+            self.remember_sheet_list(sheet_list, worksheet_name)
+            # Use the padded rows, like get_all_values would return them
+            sheet_list = [self.headers[worksheet_name]]
+            sheet_list += self.known_rows[worksheet_name]
+            sheet_dicts[worksheet_name] = sheet_list_to_dict(
+                sheet_list, worksheet_name
+                )
+        return sheet_dicts
+
+    def get_worksheet_dict(self, worksheet_name: str,
+                           refresh: bool = True) -> dict:
+        """
+        Retrieve all data from a worksheet and return it as a dictionary.
+
+        With refresh=False the dictionary is built from the last known
+        worksheet content instead, if there is one (e.g. right after
+        del_worksheet_data, when only the headers are left).
+        """
+        if (not refresh and worksheet_name in self.headers
+                and worksheet_name in self.known_rows):
+            sheet_list = [self.headers[worksheet_name]]
+            sheet_list += self.known_rows[worksheet_name]
+            return sheet_list_to_dict(sheet_list, worksheet_name)
+
+        return self.read_worksheets([worksheet_name])[worksheet_name]
+
+    def load_all(self) -> dict:
+        """
+        Retrieve the data of all trip worksheets with a single
+        values:batchGet request.
+
+        Returns:
+            dict: Worksheet name -> dictionary as returned by
+            get_worksheet_dict
+        """
+        return self.read_worksheets(WORKSHEET_NAMES)
+
+    def plan_update(self, worksheet_name: str, row_list: list):
+        """
+        Compare new data rows with the last known worksheet content.
+
+        Returns:
+            tuple | None: (start, changed, appended) as returned by
+            diff_rows, or None if all data rows have to be rewritten
+        """
+        old_rows = self.known_rows.get(worksheet_name)
+        if self.is_index_row(worksheet_name):
+            # The trip's row in the index is always overwritten in place,
+            # a trip without data is written as a row of empty cells
+            width = len(self.headers.get(
+                worksheet_name, WORKSHEET_HEADERS[worksheet_name]
+                ))
+            new_rows = row_list or [[""] * width]
+            if old_rows is None:
+                return 0, new_rows, []
+            return diff_rows(old_rows or [[""] * width], new_rows)
+
+        if old_rows is None:
+            return None
+        return diff_rows(old_rows, row_list)
 
     def del_worksheet_data(self, worksheet_name: str):
         """
         Delete all data from a worksheet, except the headings
         """
         print(f"⏳  Deleting data from {worksheet_name} worksheet...\n")
-        sheet = self.sheet.worksheet(worksheet_name)
-        n_rows = sheet.row_count
-        # Only delete rows if there is data beyond the header
-        if n_rows >= 2:
-            sheet.delete_rows(2, n_rows)
+        if self.is_index_row(worksheet_name):
+            # Only empty the trip's row, other trips stay in the index
+            self.write_rows(worksheet_name, [])
+        else:
+            title = self.worksheet_title(worksheet_name)
+            sheet = self.get_worksheet(title)
+            n_rows = self.row_counts[title]
+            # Only delete rows if there is data beyond the header
+            if n_rows >= 2:
+                sheet.delete_rows(2, n_rows)
+                self.row_counts[title] = 1
+            self.known_rows[worksheet_name] = []
+            self.synced = None
         print(f"✅  {worksheet_name} worksheet updated successfully.\n")
 
-    def update_worksheet(self, data: dict, worksheet_name: str):
+    def update_worksheet(self, data: dict, worksheet_name: str,
+                         incremental: bool = True):
         """
         Update a worksheet with new data.
-        - For "trip_info", add one row with trip details
-        - For "expenses", add multiple rows with date/amount pairs
+        - For "trip_info", write one row with trip details
+        - For "expenses", write multiple rows with date/amount pairs
+
+        If the current worksheet content is known and `incremental` is True,
+        only the changed rows are overwritten and new rows are appended.
+        Otherwise all data rows are deleted and written again.
         """
         print(f"⏳  Updating {worksheet_name} worksheet...\n")
-        sheet = self.sheet.worksheet(worksheet_name)
-        # First delete old data
-        n_rows = sheet.row_count
-        # Delete_rows only works if the rows actually exist
-        if n_rows >= 2:
-            sheet.delete_rows(2, n_rows)
-        # Then add new data
-        if worksheet_name == "trip_info":
-            row_list = list(data.values())
-            sheet.append_row(row_list)
-        else:  # worksheet_name = "expenses"
-            dates = data.get("date", [])
-            amounts = data.get("amount", [])
-            row_list = list(zip(dates, amounts))
-            sheet.append_rows(row_list)
-
+        if not incremental and not self.is_index_row(worksheet_name):
+            self.known_rows.pop(worksheet_name, None)
+        self.write_rows(worksheet_name, data_to_rows(data, worksheet_name))
         print(f"✅  {worksheet_name} worksheet updated successfully.\n")
+
+    def write_rows(self, worksheet_name: str, row_list: list):
+        """
+        Write the data rows of a worksheet with the values API.
+        """
+        title = self.worksheet_title(worksheet_name)
+        diff = self.plan_update(worksheet_name, row_list)
+        if worksheet_name == "expenses":
+            self.synced = None
+
+        if diff is None:
+            sheet = self.get_worksheet(title)
+            # First delete old data
+            n_rows = self.row_counts[title]
+            # Delete_rows only works if the rows actually exist
+            if n_rows >= 2:
+                sheet.delete_rows(2, n_rows)
+                self.row_counts[title] = 1
+            # Then add new data
+            if row_list:
+                sheet.append_rows(row_list)
+        else:
+            start, changed, appended = diff
+            if changed:
+                # Overwrite the changed block in one request
+                first_row, first_col = self.data_start(worksheet_name)
+                first_cell = rowcol_to_a1(first_row + start, first_col)
+                last_cell = rowcol_to_a1(
+                    first_row + start + len(changed) - 1,
+                    first_col + len(changed[0]) - 1
+                    )
+                self.sheet.values_update(
+                    absolute_range_name(title, f"{first_cell}:{last_cell}"),
+                    params={"valueInputOption": "RAW"},
+                    body={"values": changed},
+                    )
+            if appended:
+                self.sheet.values_append(
+                    absolute_range_name(title),
+                    params={"valueInputOption": "RAW"},
+                    body={"values": appended},
+                    )
+        self.remember_rows(worksheet_name, row_list)
+
+    def remember_rows(self, worksheet_name: str, row_list: list):
+        """
+        Keep the data rows of a worksheet after they have been written.
+        """
+        if not self.is_index_row(worksheet_name):
+            self.track_appended_rows(
+                self.worksheet_title(worksheet_name), len(row_list)
+                )
+        self.known_rows[worksheet_name] = [list(row) for row in row_list]
+
+    def worksheet_requests(self, row_list: list,
+                           worksheet_name: str) -> list:
+        """
+        Build the spreadsheets.batchUpdate requests that bring a worksheet
+        in line with new data rows. Only changed rows are overwritten and
+        new rows appended if the current worksheet content is known,
+        otherwise all data rows are deleted and written again.
+        """
+        title = self.worksheet_title(worksheet_name)
+        diff = self.plan_update(worksheet_name, row_list)
+        sheet = self.get_worksheet(title)
+
+        requests = []
+        if diff is None:
+            # Delete all rows except the header row, then add new data
+            n_rows = self.row_counts[title]
+            if n_rows >= 2:
+                requests.append({
+                    "deleteDimension": {
+                        "range": {
+                            "sheetId": sheet.id,
+                            "dimension": "ROWS",
+                            "startIndex": 1,
+                            "endIndex": n_rows,
+                        }
+                    }
+                })
+                self.row_counts[title] = 1
+            appended = row_list
+        else:
+            start, changed, appended = diff
+            if changed:
+                first_row, first_col = self.data_start(worksheet_name)
+                # Grid indexes are 0-based
+                requests.append(update_cells_request(
+                    sheet.id, first_row - 1 + start, first_col - 1, changed
+                    ))
+
+        if appended:
+            requests.append(append_cells_request(sheet.id, appended))
+
+        return requests
+
+    def change_requests(self, changes: list) -> list:
+        """
+        Build the spreadsheets.batchUpdate requests that apply changes of
+        an expense ledger (see ExpenseLedger.changes_since) to the expenses
+        worksheet, which holds the expenses row by row in date order:
+        - A changed amount overwrites the amount cell of its row
+        - New expenses after the last row are appended
+        - A new expense between other rows is written into a row inserted
+          at its position
+
+        The requests only depend on the number of changes, not on the
+        number of expenses of the trip.
+        """
+        title = self.worksheet_title("expenses")
+        sheet_id = self.get_worksheet(title).id
+        first_row, first_col = self.data_start("expenses")
+
+        requests = []
+        appended = []
+        n_inserted = 0
+        n_rows = None
+        for row, expense_date, amount, new, n_rows in changes:
+            values = [expense_date.isoformat(), str(amount)]
+            if new and row == n_rows:
+                appended.append(values)
+                continue
+            # Keep the order of the changes, later rows depend on it
+            if appended:
+                requests.append(append_cells_request(sheet_id, appended))
+                appended = []
+            # Grid indexes are 0-based
+            row_index = first_row - 1 + row
+            if new:
+                requests.append({
+                    "insertDimension": {
+                        "range": {
+                            "sheetId": sheet_id,
+                            "dimension": "ROWS",
+                            "startIndex": row_index,
+                            "endIndex": row_index + 1,
+                        },
+                        "inheritFromBefore": True,
+                    }
+                })
+                requests.append(update_cells_request(
+                    sheet_id, row_index, first_col - 1, [values]
+                    ))
+                n_inserted += 1
+            else:
+                requests.append(update_cells_request(
+                    sheet_id, row_index, first_col, [values[1:]]
+                    ))
+        if appended:
+            requests.append(append_cells_request(sheet_id, appended))
+
+        if n_rows is not None:
+            # Every inserted row adds a grid row, appended rows only if
+            # they don't fit below the last data row
+            if title in self.row_counts:
+                self.row_counts[title] += n_inserted
+            self.track_appended_rows(title, n_rows + new)
+        return requests
+
+    def commit(self, trip, quiet: bool = False):
+        """
+        Save trip info and expenses of a trip in a single batch request.
+
+        Both worksheets are updated by one spreadsheets.batchUpdate call,
+        which the Sheets API applies completely or not at all, so the two
+        worksheets can't end up out of sync if the save fails.
+
+        If the trip's expenses were saved by an earlier commit, only the
+        changes logged by its ledger since then are sent. Otherwise the
+        expense rows are compared with the last known worksheet content.
+        A trip that only holds the ledger changes (a LocalTrip without
+        expenses) raises FullSaveRequired if that is not possible.
+
+        With quiet=True, no progress messages are printed (e.g. when saving
+        in the background).
+        """
+        state = self.commit_state(trip)
+        if not quiet:
+            print("⏳  Saving trip data...\n")
+        self.load_trip_sheets()
+        plan = self.commit_requests(trip, state)
+
+        try:
+            if plan["requests"]:
+                self.sheet.batch_update({"requests": plan["requests"]})
+        except Exception:
+            self.forget_worksheets()
+            raise
+
+        self.finish_commit(plan)
+        if not quiet:
+            print("✅  Trip data saved successfully.\n")
+
+    def load_trip_sheets(self):
+        """
+        Make sure the trip's row in the trip index (a new trip is created)
+        and both worksheet objects of the trip are known, loading the
+        worksheet objects with one metadata request if needed.
+        """
+        if self.trip_id is not None:
+            self.get_trip_row()
+        if any(self.worksheet_title(name) not in self.worksheets
+               for name in WORKSHEET_NAMES):
+            self.fetch_sheet_metadata()
+
+    def trip_sheets_loaded(self) -> bool:
+        """
+        True if the spreadsheet is open and load_trip_sheets has nothing
+        left to load, so building the requests of the trip doesn't send
+        any API requests.
+        """
+        if self._sheet is None:
+            return False
+        if self.trip_id is not None and (
+                self.trip_rows is None or self.trip_id not in self.trip_rows):
+            return False
+        return all(
+            self.worksheet_title(name) in self.worksheets
+            for name in WORKSHEET_NAMES
+            )
+
+    def adopt_trip_sheets(self, other):
+        """
+        Take over the spreadsheet, trip rows and worksheet objects of the
+        trip from another SheetManager of the same trip that loaded them
+        (see load_trip_sheets). Worksheets known already are kept, so
+        their row counts stay up to date.
+        """
+        self._sheet = other.sheet
+        self.sheet_key = other.sheet_key
+        if self.trip_id is not None and not (
+                self.trip_rows and self.trip_id in self.trip_rows):
+            self.trip_rows = other.trip_rows
+        for title, sheet in other.worksheets.items():
+            if title not in self.worksheets:
+                self.worksheets[title] = sheet
+                self.row_counts[title] = other.row_counts[title]
+
+    def commit_state(self, trip) -> tuple:
+        """
+        Return the ledger of a trip, the ledger version to save and whether
+        only the ledger changes since the last save have to be sent.
+        Raises FullSaveRequired if neither those changes nor all expenses
+        can be sent (see commit).
+        """
+        ledger = getattr(trip, "ledger", None)
+        version = None
+        if ledger is not None:
+            version = getattr(trip, "ledger_version", None)
+            if version is None:
+                version = ledger.version
+        synced = ledger is not None and self.is_synced(ledger)
+        if not synced and trip.expenses is None:
+            raise FullSaveRequired("The saved expense rows are unknown")
+        return ledger, version, synced
+
+    def commit_requests(self, trip, state: tuple) -> dict:
+        """
+        Build the spreadsheets.batchUpdate requests of a commit. The
+        worksheets of the trip must be loaded (see load_trip_sheets).
+
+        Args:
+            trip (Trip): Trip to save
+            state (tuple): As returned by commit_state
+
+        Returns:
+            dict: "requests" and what finish_commit keeps once they are
+            applied
+        """
+        ledger, version, synced = state
+        trip_rows = data_to_rows(trip.trip_info, "trip_info")
+        requests = self.worksheet_requests(trip_rows, "trip_info")
+        expense_rows = None
+        if synced:
+            requests += self.change_requests(
+                ledger.changes_since(self.synced[1], version)
+                )
+        else:
+            expense_rows = data_to_rows(trip.expenses, "expenses")
+            requests += self.worksheet_requests(expense_rows, "expenses")
+        return {
+            "requests": requests,
+            "trip_rows": trip_rows,
+            "expense_rows": expense_rows,
+            "ledger": ledger,
+            "version": version,
+        }
+
+    def finish_commit(self, plan: dict):
+        """
+        Keep the saved rows and the saved ledger version after the requests
+        of a commit (see commit_requests) have been applied.
+        """
+        self.remember_rows("trip_info", plan["trip_rows"])
+        if plan["expense_rows"] is None:
+            # The rows are no longer compared, don't keep an outdated copy
+            self.known_rows.pop("expenses", None)
+        else:
+            self.remember_rows("expenses", plan["expense_rows"])
+        ledger = plan["ledger"]
+        self.synced = (
+            (ledger, plan["version"]) if ledger is not None else None
+            )
+
+    def forget_worksheets(self, worksheet_names: list = WORKSHEET_NAMES):
+        """
+        Forget the cached worksheet objects, row counts and last known rows
+        of trip worksheets after a failed update. The update may still have
+        been applied (e.g. if the connection broke after the request was
+        sent), so the next update rewrites all data rows instead of
+        appending the same rows again.
+        """
+        for worksheet_name in worksheet_names:
+            self.invalidate_worksheet(self.worksheet_title(worksheet_name))
+            self.known_rows.pop(worksheet_name, None)
+        if "expenses" in worksheet_names:
+            self.synced = None
+
+    def flush(self):
+        """
+        Wait until all changes are saved. Changes are sent right away.
+        """
+
+
+# Record the time of every SheetManager call (if metrics are enabled)
+instrument_class(SheetManager, "sheet_manager")
@@ -0,0 +1,282 @@
+import re
+from typing import Protocol
+from dates import parse_date
+
+# Worksheets that hold the data of a trip and their header rows
+WORKSHEET_HEADERS = {
+    "trip_info": [
+        "trip_name", "start_date", "end_date", "total_budget", "duration",
+        "days_left", "total_spent", "remaining_budget", "daily_budget",
+        "avg_daily_spent", "budget_status"
+    ],
+    "expenses": ["date", "amount"],
+}
+WORKSHEET_NAMES = list(WORKSHEET_HEADERS)
+
+# Trip ids are used in worksheet titles
+TRIP_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,50}")
+
+
+class FullSaveRequired(Exception):
+    """
+    Raised by `commit()` if it was only given the changes of a trip's
+    expenses (see ExpenseLedger.changes_since), but the storage no longer
+    knows which rows are saved, e.g. after a failed save. The trip has to
+    be committed again with all of its expenses.
+    """
+
+
+def check_trip_id(trip_id):
+    """
+    Check that a trip id only contains letters, numbers, "-" and "_"
+    (max. 50 characters), so it can be used in worksheet titles.
+
+    Returns:
+        str | None: The trip id (None if no trip id is given)
+    """
+    if trip_id is not None and not TRIP_ID_PATTERN.fullmatch(trip_id):
+        raise ValueError(
+            f"Invalid trip id '{trip_id}', only letters, numbers, '-' and "
+            f"'_' are allowed (max. 50 characters)"
+            )
+    return trip_id
+
+
+def sheet_list_to_dict(sheet_list: list, worksheet_name: str) -> dict:
+    """
+    Convert worksheet values (header row + data rows) into a dictionary.
+    - For "trip_info", one value per header
+    - For "expenses", one list of values per header
+    """
+    if worksheet_name == "trip_info":
+        # If trip_info worksheet has exactly one row of data
+        if len(sheet_list) == 2:
+            keys, values = sheet_list
+            sheet_dict = dict(zip(keys, values))
+        else:
+            # Only headers exist: initialize dict with empty strings
+            sheet_dict = dict.fromkeys(sheet_list[0], "")
+
+    else:  # "expenses"
+        # Extract column headers ['date', 'amount']
+        keys = sheet_list[0]
+        # Extract all data rows
+        # e.g. [['2025-08-20', '12'], ['2025-08-21', '34']]
+        rows = sheet_list[1:]
+        # Create dict with list comprehensions
+        sheet_dict = {
+            key: [row[i] for row in rows] for i, key in enumerate(keys)
+            }
+
+    return sheet_dict
+
+
+def expense_records(rows):
+    """
+    Turn expense rows (date and amount as strings, like the worksheet
+    returns them) into (date, amount) records with a parsed date and an
+    integer amount. Rows without a date or an amount are skipped.
+
+    Yields:
+        tuple: (date, int) for every expense
+    """
+    for row in rows:
+        if len(row) < 2 or row[0] == "" or row[1] == "":
+            continue
+        yield parse_date(row[0]), int(row[1])
+
+
+def data_to_rows(data: dict, worksheet_name: str) -> list:
+    """
+    Convert trip_info or expenses data into the rows stored in a worksheet.
+    - For "trip_info", one row with all trip details
+    - For "expenses", one row per date/amount pair
+    """
+    if worksheet_name == "trip_info":
+        # Only headers exist: there is no trip to store
+        if all(value == "" for value in data.values()):
+            return []
+        return [list(data.values())]
+
+    dates = data.get("date", [])
+    amounts = data.get("amount", [])
+    return [list(row) for row in zip(dates, amounts)]
+
+
+class StorageBackend(Protocol):
+    """
+    Interface of the classes that store trip data.
+
+    Implementations:
+    - SheetManager (sheet_manager.py): Google Sheets
+    - LocalStore (local_store.py): local JSON file, optionally synced to
+      Google Sheets
+    - MemoryStore: in memory only, e.g. for tests and benchmarks
+    """
+    def load_all(self) -> dict:
+        """
+        Retrieve the data of all trip worksheets as dictionaries.
+        """
+
+    def get_worksheet_dict(self, worksheet_name: str,
+                           refresh: bool = True) -> dict:
+        """
+        Retrieve all data from a worksheet and return it as a dictionary.
+        """
+
+    def del_worksheet_data(self, worksheet_name: str):
+        """
+        Delete all data from a worksheet, except the headings
+        """
+
+    def update_worksheet(self, data: dict, worksheet_name: str):
+        """
+        Update a worksheet with new data.
+        """
+
+    def commit(self, trip, quiet: bool = False):
+        """
+        Save trip info and expenses of a trip.
+        With quiet=True, no progress messages are printed.
+        """
+
+    def flush(self):
+        """
+        Wait until all changes are saved.
+        """
+
+    def list_trips(self) -> dict:
+        """
+        Return the stored trips as trip_id -> trip name.
+        """
+
+    def select_trip(self, trip_id: str):
+        """
+        Work on the trip with the given id (a new one if it isn't stored).
+        """
+
+
+class MemoryStore:
+    """
+    Stores trip data in memory, using the same worksheet layout as
+    Google Sheets (header row + data rows per worksheet).
+
+    Nothing is sent over the network, so the whole app can run without
+    Google Sheets, e.g. in tests and benchmarks.
+
+    Several trips can be stored side by side by giving each store a
+    `trip_id`, which is added to the worksheet keys
+    (e.g. "expenses_<trip_id>").
+
+    Attributes:
+        worksheets (dict): Worksheet key -> values (header + data rows)
+        trip_id (str): Id of the trip, or None for a single trip
+    """
+    def __init__(self, worksheets: dict = None, trip_id: str = None):
+        self.trip_id = check_trip_id(trip_id)
+        if worksheets is None:
+            worksheets = {
+                self.worksheet_key(worksheet_name): [header]
+                for worksheet_name, header in WORKSHEET_HEADERS.items()
+                }
+        self.worksheets = worksheets
+
+    def worksheet_key(self, worksheet_name: str) -> str:
+        """
+        Return the key under which a worksheet of this trip is stored.
+        """
+        if self.trip_id is None:
+            return worksheet_name
+        return f"{worksheet_name}_{self.trip_id}"
+
+    def save(self):
+        """
+        Persist the worksheets. Nothing to do for data kept in memory.
+        """
+
+    def list_trips(self) -> dict:
+        """
+        Return the trips stored with a trip id as trip_id -> trip name
+        ("" if the trip has no data yet).
+        """
+        prefix = "trip_info_"
+        return {
+            key[len(prefix):]: sheet_list_to_dict(
+                values, "trip_info"
+                )["trip_name"]
+            for key, values in self.worksheets.items()
+            if key.startswith(prefix)
+            }
+
+    def select_trip(self, trip_id: str):
+        """
+        Work on the trip with the given id, adding empty worksheets for it
+        if it is new.
+        """
+        self.trip_id = check_trip_id(trip_id)
+        for worksheet_name, header in WORKSHEET_HEADERS.items():
+            self.worksheets.setdefault(
+                self.worksheet_key(worksheet_name), [header]
+                )
+
+    def load_all(self) -> dict:
+        """
+        Retrieve the data of all trip worksheets as dictionaries.
+        """
+        return {
+            worksheet_name: self.get_worksheet_dict(worksheet_name)
+            for worksheet_name in WORKSHEET_NAMES
+            }
+
+    def get_worksheet_dict(self, worksheet_name: str,
+                           refresh: bool = True) -> dict:
+        """
+        Retrieve all data from a worksheet and return it as a dictionary.
+        The data is always read from memory, so `refresh` has no effect.
+        """
+        return sheet_list_to_dict(
+            self.worksheets[self.worksheet_key(worksheet_name)],
+            worksheet_name
+            )
+
+    def set_rows(self, rows: list, worksheet_name: str):
+        """
+        Replace the data rows of a worksheet.
+        Values are stored as strings, like the worksheet returns them.
+        """
+        key = self.worksheet_key(worksheet_name)
+        header = self.worksheets[key][0]
+        self.worksheets[key] = [header] + [
+            [str(value) for value in row] for row in rows
+            ]
+
+    def del_worksheet_data(self, worksheet_name: str):
+        """
+        Delete all data from a worksheet, except the headings
+        """
+        self.set_rows([], worksheet_name)
+        self.save()
+        print(f"✅  {worksheet_name} worksheet updated successfully.\n")
+
+    def update_worksheet(self, data: dict, worksheet_name: str):
+        """
+        Update a worksheet with new data.
+        """
+        self.set_rows(data_to_rows(data, worksheet_name), worksheet_name)
+        self.save()
+        print(f"✅  {worksheet_name} worksheet updated successfully.\n")
+
+    def commit(self, trip, quiet: bool = False):
+        """
+        Save trip info and expenses of a trip.
+        """
+        self.set_rows(data_to_rows(trip.trip_info, "trip_info"), "trip_info")
+        self.set_rows(data_to_rows(trip.expenses, "expenses"), "expenses")
+        self.save()
+        if not quiet:
+            print("✅  Trip data saved successfully.\n")
+
+    def flush(self):
+        """
+        Wait until all changes are saved. Changes are saved right away.
+        """
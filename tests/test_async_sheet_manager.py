@@ -0,0 +1,122 @@
+import asyncio
+import os
+import time
+import unittest
+from datetime import date
+from unittest import mock
+import sheet_manager
+from async_sheet_manager import AsyncSheetManager
+from fake_sheets_server import FakeSheetsServer
+from request_scheduler import RequestScheduler, ScheduledHTTPClient
+from storage import WORKSHEET_HEADERS
+from trip import Trip
+
+# Seconds every request of the Sheets API stand-in takes
+LATENCY = 0.3
+
+
+class AsyncSheetManagerTest(unittest.TestCase):
+    """
+    AsyncSheetManager against the Sheets API stand-in, with two trips that
+    are set up already.
+    """
+    def setUp(self):
+        self.server = FakeSheetsServer(("127.0.0.1", 0), latency=LATENCY)
+        header = ["trip_id"] + WORKSHEET_HEADERS["trip_info"]
+        self.spreadsheet = self.server.create_spreadsheet("wander_wallet", {
+            "trips": [header, ["paris"], ["rome"]],
+            "expenses_paris": [WORKSHEET_HEADERS["expenses"]],
+            "expenses_rome": [WORKSHEET_HEADERS["expenses"]],
+        })
+        self.server.start()
+        # A new client for the stand-in and a quota of its own per test
+        patches = [
+            mock.patch.dict(
+                os.environ, {"WANDER_WALLET_API_URL": self.server.url}
+                ),
+            mock.patch.dict(sheet_manager.CLIENTS, clear=True),
+            mock.patch.object(
+                ScheduledHTTPClient, "scheduler", RequestScheduler()
+                ),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def manager(self, trip_id: str) -> AsyncSheetManager:
+        return AsyncSheetManager(
+            "creds.json", "wander_wallet", self.spreadsheet.id, trip_id
+            )
+
+    def values(self, title: str) -> list:
+        return self.spreadsheet.worksheet(title).get_values("").get("values")
+
+    def new_trip(self, name: str) -> Trip:
+        trip = Trip({
+            "trip_name": name, "start_date": "2026-10-01",
+            "end_date": "2026-10-10", "total_budget": "500",
+        }, {"date": [], "amount": []})
+        trip.add_expense(date(2026, 10, 2), 20)
+        trip.update_trip_info()
+        return trip
+
+    def test_commit_and_load(self):
+        async def save_and_load():
+            manager = self.manager("paris")
+            trip = self.new_trip("Paris")
+            await manager.commit(trip, quiet=True)
+            # Only the ledger changes are sent: an inserted row and an
+            # updated amount
+            trip.add_expense(date(2026, 10, 1), 5)
+            trip.add_expense(date(2026, 10, 2), 30)
+            trip.update_trip_info()
+            await manager.commit(trip, quiet=True)
+            return await self.manager("paris").load_all()
+
+        sheet_data = asyncio.run(save_and_load())
+        self.assertEqual(sheet_data["trip_info"]["trip_name"], "Paris")
+        self.assertEqual(sheet_data["trip_info"]["total_spent"], "35")
+        self.assertEqual(sheet_data["expenses"], {
+            "date": ["2026-10-01", "2026-10-02"], "amount": ["5", "30"],
+        })
+        self.assertEqual(self.values("expenses_paris"), [
+            ["date", "amount"],
+            ["2026-10-01", "5"],
+            ["2026-10-02", "30"],
+        ])
+
+    def test_delete_worksheets_concurrently(self):
+        async def delete():
+            manager = self.manager("paris")
+            await manager.commit(self.new_trip("Paris"), quiet=True)
+            start = time.perf_counter()
+            await manager.del_all_worksheet_data()
+            return time.perf_counter() - start
+
+        with mock.patch("builtins.print"):
+            elapsed = asyncio.run(delete())
+        # Both worksheets are changed by requests sent at the same time
+        self.assertLess(elapsed, 2 * LATENCY)
+        self.assertEqual(self.values("expenses_paris"), [["date", "amount"]])
+        # Only the trip details are deleted from the trip index
+        trip_row = self.values("trips")[1]
+        self.assertEqual(trip_row[0], "paris")
+        self.assertTrue(all(value == "" for value in trip_row[1:]))
+
+    def test_trips_saved_concurrently(self):
+        async def save(trip_id: str, name: str):
+            await self.manager(trip_id).commit(self.new_trip(name), quiet=True)
+
+        async def save_both():
+            await asyncio.gather(save("paris", "Paris"), save("rome", "Rome"))
+
+        asyncio.run(save_both())
+        trips = {row[0]: row[1] for row in self.values("trips")[1:]}
+        self.assertEqual(trips, {"paris": "Paris", "rome": "Rome"})
+        for title in ("expenses_paris", "expenses_rome"):
+            self.assertEqual(self.values(title), [
+                ["date", "amount"], ["2026-10-02", "20"],
+            ])
@@ -0,0 +1,97 @@
+import unittest
+import requests
+from fake_sheets_server import SHEETS_PATH, FakeSheetsServer
+
+
+class FakeSheetsServerTest(unittest.TestCase):
+    """
+    Requests to the Sheets API stand-in, sent over HTTP like gspread does.
+    """
+    def setUp(self):
+        self.server = FakeSheetsServer(("127.0.0.1", 0))
+        self.spreadsheet = self.server.create_spreadsheet("test", {
+            "expenses": [
+                ["date", "amount"],
+                ["2026-10-01", "5"],
+            ],
+        })
+        self.worksheet = self.spreadsheet.worksheet("expenses")
+        # Empty rows below the data
+        self.worksheet.resize(rows=5)
+        self.server.start()
+        self.url = f"{self.server.url}{SHEETS_PATH}{self.spreadsheet.id}"
+
+    def tearDown(self):
+        self.server.stop()
+
+    def values(self) -> list:
+        return self.worksheet.get_values("A1:B10").get("values")
+
+    def test_append_insert_rows(self):
+        response = requests.post(
+            f"{self.url}/values/expenses!A1:B2:append",
+            params={"valueInputOption": "RAW",
+                    "insertDataOption": "INSERT_ROWS"},
+            json={"values": [["2026-10-02", "7"], ["2026-10-03", "9"]]}
+            )
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(
+            response.json()["updates"]["updatedRange"], "expenses!A3:B4"
+            )
+        self.assertEqual(self.values(), [
+            ["date", "amount"],
+            ["2026-10-01", "5"],
+            ["2026-10-02", "7"],
+            ["2026-10-03", "9"],
+        ])
+        # New rows are inserted instead of filling the empty rows
+        self.assertEqual(self.worksheet.grid["rowCount"], 7)
+
+    def test_append_overwrite(self):
+        response = requests.post(
+            f"{self.url}/values/expenses!A1:B2:append",
+            params={"valueInputOption": "RAW"},
+            json={"values": [["2026-10-02", "7"]]}
+            )
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(self.values(), [
+            ["date", "amount"],
+            ["2026-10-01", "5"],
+            ["2026-10-02", "7"],
+        ])
+        self.assertEqual(self.worksheet.grid["rowCount"], 5)
+
+    def test_insert_dimension(self):
+        sheet_id = self.worksheet.properties["sheetId"]
+        response = requests.post(f"{self.url}:batchUpdate", json={
+            "requests": [{
+                "insertDimension": {
+                    "range": {"sheetId": sheet_id, "dimension": "ROWS",
+                              "startIndex": 1, "endIndex": 2},
+                    "inheritFromBefore": True,
+                },
+            }],
+        })
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(self.values(), [
+            ["date", "amount"],
+            [],
+            ["2026-10-01", "5"],
+        ])
+        self.assertEqual(self.worksheet.grid["rowCount"], 6)
+
+    def test_insert_dimension_invalid_range(self):
+        sheet_id = self.worksheet.properties["sheetId"]
+        response = requests.post(f"{self.url}:batchUpdate", json={
+            "requests": [{
+                "insertDimension": {
+                    "range": {"sheetId": sheet_id, "dimension": "ROWS",
+                              "startIndex": 3, "endIndex": 1},
+                },
+            }],
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
 from datetime import datetime
+from dates import parse_date
 from colorama import Style, init
+from expense_ledger import ExpenseLedger
 
 # Initialize Colorama (colors reset automatically after each print)
 init(autoreset=True)
@@ -9,10 +11,14 @@ class Trip:
     """
     Trip class that stores trip details (name, dates, budget, expenses),
     calculates key trip statistics and provides a formatted summary of them.
+    The statistics are calculated together and cached until the expenses,
+    the trip dates or the current date change.
 
     Attributes:
         trip_info (dict): Dictionary containing trip details
-        expenses (dict): Dictionary containing expense details
+        ledger (ExpenseLedger): All expenses, with parsed dates and amounts
+        expenses (dict): Dictionary containing expense details, in the
+                         format of the expenses worksheet
         trip_name (str): Name of the trip
         start_date (date): Trip start date
         end_date (date): Trip end date
@@ -20,55 +26,142 @@ class Trip:
     """
     def __init__(self, trip_info: dict, expenses: dict):
         self.trip_info = trip_info
-        self.expenses = expenses
         # Get trip info input fields (for calculations)
         self.trip_name = trip_info["trip_name"]
-        self.start_date = datetime.strptime(
-            trip_info["start_date"], "%Y-%m-%d"
-            ).date()
-        self.end_date = datetime.strptime(
-            trip_info["end_date"], "%Y-%m-%d"
-            ).date()
+        self.start_date = parse_date(trip_info["start_date"])
+        self.end_date = parse_date(trip_info["end_date"])
         self.total_budget = int(trip_info["total_budget"])
+        # Expenses stored by day of the trip
+        self.ledger = ExpenseLedger(self.start_date, self.end_date, expenses)
+        # Cached trip statistics (see `stats()`)
+        self.invalidate_stats()
+        # Cached expenses dictionary and the ledger version it belongs to
+        self._expenses = None
+        self._expenses_version = None
+
+    @property
+    def expenses(self):
+        """
+        Expenses as a dictionary with a list of dates and a list of amounts
+        (as strings), like they are stored in the expenses worksheet.
+        """
+        if self._expenses_version != self.ledger.version:
+            self._expenses = self.ledger.to_dict()
+            self._expenses_version = self.ledger.version
+        return self._expenses
+
+    def add_expense(self, expense_date, amount: int) -> bool:
+        """
+        Add an expense for a date, or update it if the date already has one.
+
+        Returns:
+            bool: True if an existing expense was updated,
+                  False if a new expense was added
+        """
+        return self.ledger.add(expense_date, amount)
 
     # Calculate different properties for trip info
+    def invalidate_stats(self):
+        """
+        Forget the cached trip statistics.
+        Changes to the expenses are detected automatically via the
+        ledger version.
+        """
+        self._stats = None
+        self._stats_key = None
+
+    def stats(self, today=None):
+        """
+        Calculate all trip statistics at once and cache them.
+
+        All values are based on the same date for "today", and they are only
+        recalculated if that date, the trip dates or the budget changed, or
+        after `invalidate_stats()` has been called.
+
+        Args:
+            today (date): Date to calculate the statistics for
+                          (default: current date)
+
+        Returns:
+            dict: duration, daily_budget, total_spent, remaining_budget,
+                  days_left, avg_daily_spent and budget_status
+        """
+        if today is None:
+            today = datetime.now().date()
+        key = (today, self.start_date, self.end_date, self.total_budget,
+               self.ledger.version)
+        if self._stats_key == key:
+            return self._stats
+
+        # Add 1 to include the first and last days both
+        duration = (self.end_date-self.start_date).days + 1
+        daily_budget = round(self.total_budget/duration)
+
+        # The ledger keeps a running total of all expenses
+        total_spent = self.ledger.total
+
+        if today > self.start_date and today < self.end_date:
+            days_left = (self.end_date - today).days
+        elif today > self.end_date:
+            # Trip is over
+            days_left = 0
+        else:
+            # Trip hasn't started yet
+            days_left = duration
+
+        days_spent = duration - days_left
+        # If trip hasn't started yet days_spent is 0
+        if days_spent == 0:
+            avg_daily_spent = 0
+        else:
+            avg_daily_spent = round(total_spent/days_spent)
+
+        if avg_daily_spent > daily_budget:
+            budget_status = "over"
+        elif avg_daily_spent < daily_budget:
+            budget_status = "under"
+        else:
+            budget_status = "on"
+
+        self._stats = {
+            "duration": duration,
+            "days_left": days_left,
+            "total_spent": total_spent,
+            "remaining_budget": self.total_budget - total_spent,
+            "daily_budget": daily_budget,
+            "avg_daily_spent": avg_daily_spent,
+            "budget_status": budget_status,
+        }
+        self._stats_key = key
+        return self._stats
+
     @property
     def duration(self):
         """
         Total duration of the trip in days (including start and end dates).
         """
-        # Add 1 to include the first and last days both
-        return (self.end_date-self.start_date).days + 1
+        return self.stats()["duration"]
 
     @property
     def daily_budget(self):
         """
         Average budget per day.
         """
-        return round(self.total_budget/self.duration)
+        return self.stats()["daily_budget"]
 
     @property
     def total_spent(self):
         """
         Total expenses recorded for the trip.
-        Handles both single expense values and lists of expenses.
-        """
-        # If there are no expenses or max. 1 expense tracked, the
-        # "amount" is a single value instead of a list
-        if not isinstance(self.expenses["amount"], list):
-            if self.expenses["amount"] == "":
-                return 0
-            else:
-                return int(self.expenses["amount"])
-        else:
-            return sum(int(num) for num in self.expenses["amount"])
+        """
+        return self.stats()["total_spent"]
 
     @property
     def remaining_budget(self):
         """
         Remaining budget
         """
-        return self.total_budget - self.total_spent
+        return self.stats()["remaining_budget"]
 
     @property
     def days_left(self):
@@ -79,16 +172,7 @@ class Trip:
         - If the trip is finished: 0
         - If the trip hasn’t started yet: full duration
         """
-        today = datetime.now().date()
-        if today > self.start_date and today < self.end_date:
-            days_left_val = (self.end_date - today).days
-        elif today > self.end_date:
-            # Trip is over
-            days_left_val = 0
-        else:
-            # Trip hasn't started yet
-            days_left_val = self.duration
-        return days_left_val
+        return self.stats()["days_left"]
 
     @property
     def avg_daily_spent(self):
@@ -96,12 +180,7 @@ class Trip:
         Average daily expenses so far (rounded).
         Returns 0 if the trip hasn’t started yet.
         """
-        days_spent = self.duration - self.days_left
-        # If trip hasn't started yet days_spent is 0
-        if days_spent == 0:
-            return 0
-
-        return round(self.total_spent/days_spent)
+        return self.stats()["avg_daily_spent"]
 
     @property
     def budget_status(self):
@@ -113,14 +192,7 @@ class Trip:
             "under" if underspending,
             "on" if exactly on budget
         """
-        if self.avg_daily_spent > self.daily_budget:
-            budget_status = "over"
-        elif self.avg_daily_spent < self.daily_budget:
-            budget_status = "under"
-        else:
-            budget_status = "on"
-
-        return budget_status
+        return self.stats()["budget_status"]
 
     # Methods to update and display trip info
 
@@ -131,13 +203,15 @@ class Trip:
         Returns:
             dict: Updated trip_info dictionary.
         """
-        self.trip_info["duration"] = self.duration
-        self.trip_info["days_left"] = self.days_left
-        self.trip_info["total_spent"] = self.total_spent
-        self.trip_info["remaining_budget"] = self.remaining_budget
-        self.trip_info["daily_budget"] = self.daily_budget
-        self.trip_info["avg_daily_spent"] = self.avg_daily_spent
-        self.trip_info["budget_status"] = self.budget_status
+        # Calculate all values for the same day
+        stats = self.stats()
+        self.trip_info["duration"] = stats["duration"]
+        self.trip_info["days_left"] = stats["days_left"]
+        self.trip_info["total_spent"] = stats["total_spent"]
+        self.trip_info["remaining_budget"] = stats["remaining_budget"]
+        self.trip_info["daily_budget"] = stats["daily_budget"]
+        self.trip_info["avg_daily_spent"] = stats["avg_daily_spent"]
+        self.trip_info["budget_status"] = stats["budget_status"]
 
         return self.trip_info
 
@@ -145,10 +219,13 @@ class Trip:
         """
         Return a formatted summary of the trip’s current status.
         """
+        # Calculate all values for the same day
+        stats = self.stats()
+
         # Adjust how budget status is display in summary
-        if self.budget_status == "over":
+        if stats["budget_status"] == "over":
             status_msg = "Over budget — try to slow down spending!"
-        elif self.budget_status == "under":
+        elif stats["budget_status"] == "under":
             status_msg = "Under budget — great job managing your expenses!"
         else:
             status_msg = "On track — keep spending balanced."
@@ -160,15 +237,15 @@ class Trip:
         return (
             f"{'Trip Name:':20} {self.trip_name}\n"
             f"{'Dates:':20} {self.start_date} - {self.end_date} "
-            f"({self.duration} days)\n"
-            f"{'Days Left:':20} {self.days_left} days\n"
+            f"({stats['duration']} days)\n"
+            f"{'Days Left:':20} {stats['days_left']} days\n"
 
             f"{'Total Budget:':20} {self.total_budget} €\n"
-            f"{'Total Expenses:':20} {self.total_spent} €\n"
-            f"{'Remaining Budget:':20} {self.remaining_budget} €\n"
+            f"{'Total Expenses:':20} {stats['total_spent']} €\n"
+            f"{'Remaining Budget:':20} {stats['remaining_budget']} €\n"
 
-            f"{'Daily Budget:':20} {self.daily_budget} €\n"
-            f"{'Avg. Daily Expenses:':20} {self.avg_daily_spent} €\n"
+            f"{'Daily Budget:':20} {stats['daily_budget']} €\n"
+            f"{'Avg. Daily Expenses:':20} {stats['avg_daily_spent']} €\n"
             f"{'Budget Status:':20} {status_msg}\n"
             f"\n(All € values rounded to the nearest possible integer)\n"
             )
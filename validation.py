@@ -1,10 +1,15 @@
 from datetime import datetime
 import re
 from colorama import Fore, Style, init
+from dates import parse_date
+from storage import check_trip_id
 
 # Initialize Colorama (colors reset automatically after each print)
 init(autoreset=True)
 
+# Allowed characters of a trip name
+TRIP_NAME_PATTERN = re.compile(r"[A-Za-z0-9 ]+")
+
 
 def handle_validation_error(e):
     """
@@ -54,7 +59,7 @@ def new_trip_info_valid(data_input, data_type):
                     f"Min. 1 and not more than 30 characters allowed,\n"
                     f"you provided {len(data_input)}"
                 )
-            if not re.fullmatch(r"[A-Za-z0-9 ]+", data_input):
+            if not TRIP_NAME_PATTERN.fullmatch(data_input):
                 raise ValueError(
                     "Trip name can only contain letters (A–Z), numbers (0–9)\n"
                     "and spaces"
@@ -70,9 +75,7 @@ def new_trip_info_valid(data_input, data_type):
             datetime_input = []
             for date_str in data_input:
                 try:
-                    datetime_input.append(
-                        datetime.strptime(date_str, "%Y-%m-%d").date()
-                        )
+                    datetime_input.append(parse_date(date_str))
                 except ValueError:
                     # Custom message for invalid date format
                     # Set up custom message because "YYYY-MM-DDD" triggers a
@@ -132,25 +135,40 @@ def int_input_valid(data_input):
               False otherwise
     """
     try:
-        # Check if provided string can be transformed to an int object
-        try:
-            int_input = int(data_input)
-        except ValueError:
-            raise ValueError(
-                f"Your input '{data_input}' is not a whole number"
-                )
-
-        # Check if provided integer is positive
-        if int_input <= 0:
-            raise ValueError(
-                "The value must be larger than 0"
-            )
+        check_int(data_input)
     except ValueError as e:
         return handle_validation_error(e)
 
     return True
 
 
+def check_int(data_input):
+    """
+    Check if the given input is a positive integer, without printing.
+
+    Returns:
+        int: The input as an integer
+
+    Raises:
+        ValueError: If the input is not a positive integer
+    """
+    # Check if provided string can be transformed to an int object
+    try:
+        int_input = int(data_input)
+    except ValueError:
+        raise ValueError(
+            f"Your input '{data_input}' is not a whole number"
+            )
+
+    # Check if provided integer is positive
+    if int_input <= 0:
+        raise ValueError(
+            "The value must be larger than 0"
+        )
+
+    return int_input
+
+
 def yes_no_input_valid(data_input):
     """
     Validate user input for yes/no questions.
@@ -197,31 +215,148 @@ def expense_date_valid(date_input, trip):
         bool: True if the date is valid, False otherwise
     """
     try:
-        # Check if provided string can be transformed to a datetime object
-        try:
-            expense_date = datetime.strptime(date_input, "%Y-%m-%d").date()
-        except ValueError:
-            # Custom message for invalid date format
-            # Set up custom message because "YYYY-MM-DDD" triggers a
-            # different warning than e.g. "YYYY-MMM-DD" or "hello"
-            raise ValueError(
-                f"'{date_input}'. "
-                f"Date must exist and be in the format\nYYYY-MM-DD"
-                )
+        check_expense_date(date_input, trip, datetime.now().date())
+    except ValueError as e:
+        return handle_validation_error(e)
 
-        # Check if date is within travel period
-        if expense_date < trip.start_date or expense_date > trip.end_date:
-            raise ValueError(
-                f"Your expense date needs to be within your travel "
-                f"period\n{trip.start_date} - {trip.end_date}"
+    return True
+
+
+def check_expense_date(date_input, trip, today):
+    """
+    Check if an expense date is valid (see `expense_date_valid`), without
+    printing.
+
+    Args:
+        date_input (str): The date string
+        trip (Trip): The Trip object
+        today (date): The current date
+
+    Returns:
+        date: The parsed expense date
+
+    Raises:
+        ValueError: If the date is invalid
+    """
+    # Check if provided string can be transformed to a date object
+    try:
+        expense_date = parse_date(date_input)
+    except ValueError:
+        # Custom message for invalid date format
+        # Set up custom message because "YYYY-MM-DDD" triggers a
+        # different warning than e.g. "YYYY-MMM-DD" or "hello"
+        raise ValueError(
+            f"'{date_input}'. "
+            f"Date must exist and be in the format\nYYYY-MM-DD"
             )
 
-        # Check if date is not in the future
+    # Check if date is within travel period
+    if expense_date < trip.start_date or expense_date > trip.end_date:
+        raise ValueError(
+            f"Your expense date needs to be within your travel "
+            f"period\n{trip.start_date} - {trip.end_date}"
+        )
+
+    # Check if date is not in the future
+    if expense_date > today:
+        raise ValueError(
+            "Your expense date cannot be a future date"
+        )
+
+    return expense_date
+
+
+def validate_expense_rows(rows, trip, today=None):
+    """
+    Validate many expenses at once, e.g. for a bulk import.
+
+    Every row is checked with the same rules as `expense_date_valid` and
+    `int_input_valid`, but nothing is printed. All rows are checked against
+    the same current date, and repeated dates are taken from the cache of
+    `parse_date`. A date can only have one expense, so a date that was
+    already given in an earlier row is an error as well.
+
+    Args:
+        rows (iterable): (date, amount) pairs as strings
+        trip (Trip): The Trip object
+        today (date): The current date (default: today)
+
+    Returns:
+        tuple: (expenses, errors)
+            expenses (list): (date, int amount) for every valid row
+            errors (list): One dictionary per error, with the keys
+                           "row" (0-based index), "field" ("date" or
+                           "amount"), "value" and "message"
+    """
+    if today is None:
         today = datetime.now().date()
-        if expense_date > today:
-            raise ValueError(
-                "Your expense date cannot be a future date"
-            )
+    expenses = []
+    errors = []
+    # Date -> index of the first row with that date
+    first_rows = {}
+
+    for i, (date_input, amount_input) in enumerate(rows):
+        row_errors = []
+        try:
+            expense_date = check_expense_date(date_input, trip, today)
+            first_row = first_rows.setdefault(expense_date, i)
+            if first_row != i:
+                raise ValueError(
+                    f"{expense_date} is given more than once. Please "
+                    f"combine the expenses of a day into one."
+                    )
+        except ValueError as e:
+            row_errors.append(("date", date_input, e))
+        try:
+            amount = check_int(amount_input)
+        except ValueError as e:
+            row_errors.append(("amount", amount_input, e))
+
+        if row_errors:
+            errors += [
+                {
+                    "row": i,
+                    "field": field,
+                    "value": value,
+                    # Messages are formatted for the terminal
+                    "message": str(e).replace("\n", " "),
+                }
+                for field, value, e in row_errors
+                ]
+        else:
+            expenses.append((expense_date, amount))
+
+    return expenses, errors
+
+
+def trip_choice_valid(data_input, n_trips):
+    """
+    Validate the choice of a trip: the number of a listed trip, or the id
+    of a trip (an existing one or a new one).
+
+    Checks performed:
+    1. A number must be between 1 and the number of listed trips
+    2. A trip id can only contain letters, numbers, "-" and "_" (max. 50
+       characters)
+
+    Args:
+        data_input (str): The user input string
+        n_trips (int): Number of listed trips
+
+    Returns:
+        bool: True if the input is valid, False otherwise
+    """
+    try:
+        if data_input.isdigit():
+            if not 1 <= int(data_input) <= n_trips:
+                raise ValueError(
+                    f"Trip number between 1 and {n_trips} expected, "
+                    f"you provided {data_input}"
+                    if n_trips else
+                    "No trips stored yet, enter a trip id for a new trip"
+                    )
+        else:
+            check_trip_id(data_input)
     except ValueError as e:
         return handle_validation_error(e)
 
@@ -0,0 +1,219 @@
+import atexit
+import threading
+import time
+from local_store import LocalTrip
+from metrics import instrument_class
+from storage import FullSaveRequired
+
+
+class WriteBehindStore:
+    """
+    Saves trip data in the background, so the app doesn't have to wait for
+    Google Sheets after every expense.
+
+    The class provides the same methods as the storage it wraps:
+    - `commit()` only takes a copy of the trip data and returns right away.
+      A worker thread saves it with the wrapped storage, retrying failed
+      saves with increasing delays. If the trip is committed again before
+      the previous save has started, only the latest data is saved, so
+      several quick changes are sent in one request. If the storage already
+      holds the trip's expenses (see SheetManager.is_synced), the copy only
+      refers to the trip's expense ledger and its version instead of
+      copying all expenses, and the storage saves the logged changes
+    - All other methods first wait until pending changes are saved, so
+      reads and destructive changes (e.g. deleting the data for a new trip)
+      always see the latest data
+    - `flush()` waits until pending changes are saved and raises the error
+      of the last save if it failed even after retrying. It tells the user
+      when changes committed without `quiet` have been saved
+
+    Attributes:
+        storage (StorageBackend): The storage that saves the data
+        retries (int): Number of retries of a failed save
+        retry_delay (float): Seconds before the first retry, doubled for
+                             every further retry
+        pending (LocalTrip): Trip data that still has to be saved, or None
+        trip (Trip): The last committed trip, copied in full if the storage
+                     can't save only the changes of its expenses
+        error (Exception): Error of the last save, or None if it succeeded
+        unreported (bool): True if the user was told that data is being
+                           saved, but not yet that it was saved
+    """
+    def __init__(self, storage, retries: int = 3, retry_delay: float = 1.0):
+        self.storage = storage
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.pending = None
+        self.trip = None
+        self.busy = False
+        self.error = None
+        self.unreported = False
+        self.condition = threading.Condition()
+        self.worker = threading.Thread(target=self.run_worker, daemon=True)
+        self.worker.start()
+        # Don't lose pending changes if the program ends without flushing
+        atexit.register(self.flush_at_exit)
+
+    def run_worker(self):
+        """
+        Save pending trip data whenever there is some, until the program
+        ends.
+        """
+        while True:
+            with self.condition:
+                # After a failed save, wait until the next commit or flush
+                while self.pending is None or self.error is not None:
+                    self.condition.wait()
+                trip, self.pending = self.pending, None
+                self.busy = True
+
+            error = self.save(trip)
+
+            with self.condition:
+                self.busy = False
+                if error is not None:
+                    # Keep the data for the next attempt, unless it has
+                    # already been replaced by newer data
+                    if self.pending is None:
+                        self.pending = trip
+                    self.error = error
+                self.condition.notify_all()
+
+    def save(self, trip):
+        """
+        Save trip data with the wrapped storage, retrying if it fails.
+
+        Returns:
+            Exception | None: The error of the last attempt, or None if the
+            data was saved
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                self.storage.commit(trip, quiet=True)
+                return None
+            except FullSaveRequired as e:
+                # Retrying doesn't help, the next commit or flush copies
+                # all expenses
+                return e
+            except Exception as e:
+                if attempt == self.retries:
+                    return e
+                time.sleep(self.retry_delay * 2 ** attempt)
+
+    def flush(self):
+        """
+        Wait until all pending changes are saved.
+        """
+        with self.condition:
+            # Try again to save changes that could not be saved before
+            self.error = None
+            self.condition.notify_all()
+            while self.busy or self.pending is not None:
+                if isinstance(self.error, FullSaveRequired):
+                    # Save all expenses instead of the changes
+                    self.pending = self.snapshot(self.trip)
+                    self.error = None
+                    self.condition.notify_all()
+                elif self.error is not None:
+                    raise self.error
+                self.condition.wait()
+            saved, self.unreported = self.unreported, False
+        if saved:
+            print("✅  Trip data saved successfully.\n")
+
+    def flush_at_exit(self):
+        """
+        Save pending changes when the program ends.
+        """
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠️  Trip data could not be saved: {e}")
+
+    def commit(self, trip, quiet: bool = False):
+        """
+        Queue trip info and expenses of a trip to be saved in the
+        background. Whether saving succeeded is reported by `flush()`.
+        """
+        trip_data = self.snapshot(trip)
+        with self.condition:
+            self.trip = trip
+            self.pending = trip_data
+            self.error = None
+            if not quiet:
+                self.unreported = True
+            self.condition.notify_all()
+        if not quiet:
+            print("⏳  Saving trip data in the background...\n")
+
+    def snapshot(self, trip) -> LocalTrip:
+        """
+        Copy the data of a trip that has to be saved. The expenses are
+        only copied if the storage doesn't already hold the trip's
+        expenses as of an earlier version of its ledger.
+        """
+        ledger = getattr(trip, "ledger", None)
+        is_synced = getattr(self.storage, "is_synced", None)
+        expenses = None
+        if ledger is None or is_synced is None or not is_synced(ledger):
+            expenses = {
+                key: list(values) for key, values in trip.expenses.items()
+                }
+        version = ledger.version if ledger is not None else None
+        return LocalTrip(dict(trip.trip_info), expenses, ledger, version)
+
+    @property
+    def trip_id(self):
+        """
+        Id of the trip the wrapped storage works on.
+        """
+        return self.storage.trip_id
+
+    def list_trips(self) -> dict:
+        """
+        Return the stored trips as trip_id -> trip name.
+        """
+        self.flush()
+        return self.storage.list_trips()
+
+    def select_trip(self, trip_id: str):
+        """
+        Work on the trip with the given id, after the changes of the
+        current trip are saved.
+        """
+        self.flush()
+        self.trip = None
+        self.storage.select_trip(trip_id)
+
+    def load_all(self) -> dict:
+        """
+        Retrieve the data of all trip worksheets as dictionaries.
+        """
+        self.flush()
+        return self.storage.load_all()
+
+    def get_worksheet_dict(self, worksheet_name: str,
+                           refresh: bool = True) -> dict:
+        """
+        Retrieve all data from a worksheet and return it as a dictionary.
+        """
+        self.flush()
+        return self.storage.get_worksheet_dict(worksheet_name, refresh)
+
+    def del_worksheet_data(self, worksheet_name: str):
+        """
+        Delete all data from a worksheet, except the headings
+        """
+        self.flush()
+        self.storage.del_worksheet_data(worksheet_name)
+
+    def update_worksheet(self, data: dict, worksheet_name: str):
+        """
+        Update a worksheet with new data.
+        """
+        self.flush()
+        self.storage.update_worksheet(data, worksheet_name)
+
+
+# Record the time of every call, e.g. how long the user waits for flush()
+instrument_class(WriteBehindStore, "write_behind")